@@ -1,5 +1,5 @@
 # app/core/dependencies.py
-from fastapi import Depends, Header
+from fastapi import Depends, Header, HTTPException
 from app.utils.auth_utils import decode_token
 
 async def get_current_user(Authorization: str = Header(None)):
@@ -17,3 +17,11 @@ def role_required(roles: list):
             return {"status": "error", "detail": "Access denied"}
         return user
     return guard
+
+# raising guard for admin-only endpoints (role_required only reports)
+def admin_required(roles: tuple = ("DA",)):
+    async def guard(user=Depends(get_current_user)):
+        if not user or user.get("role") not in roles:
+            raise HTTPException(status_code=403, detail="Access denied")
+        return user
+    return guard
@@ -17,11 +17,26 @@ from app.routers import biodiversity_routes
 from app.routers import biodiversity_two_routes
 from app.routers import ocean_box_routes
 from app.routers import demo_ocean_routes
+from app.routers import ocean_cube_routes
+from app.routers import metrics_routes
+from app.routers import profiler_routes
+from app.utils.concurrency import configure_threadpool
+from app.utils.http import close_http_client
+from app.utils.metrics import MetricsMiddleware
+from contextlib import asynccontextmanager
 import os
 import uvicorn
 
 
-app = FastAPI(title="CMLRE Marine Data Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_threadpool()
+    yield
+    # pooled HTTP/2 connections to Supabase / external APIs
+    await close_http_client()
+
+
+app = FastAPI(title="CMLRE Marine Data Platform", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -30,8 +45,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# per-route latency / stage timings -> /metrics and Server-Timing
+app.add_middleware(MetricsMiddleware)
+
 
 # Routers
 app.include_router(upload_routes.router)
@@ -51,6 +70,9 @@ app.include_router(biodiversity_routes.router)
 app.include_router(biodiversity_two_routes.router)
 app.include_router(ocean_box_routes.router)
 app.include_router(demo_ocean_routes.router)
+app.include_router(ocean_cube_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(profiler_routes.router)
 
 
 @app.get("/")
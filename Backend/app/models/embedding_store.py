@@ -0,0 +1,313 @@
+# embedding_store.py
+"""
+On-disk format for the otolith retrieval index.
+
+A store is a directory:
+
+    manifest.json              format, rows, dim, dtype, column kinds
+    embeddings.npy             (rows, dim) float32|float16, memory-mapped read-only
+    meta_<col>.codes.npy       int32 row -> string id (-1 = missing)    [string columns]
+    meta_<col>.offsets.npy     int64 string id -> byte offset in blob
+    meta_<col>.strings.npy     uint8 utf-8 blob of the unique strings
+    meta_<col>.values.npy      float32 per row (NaN = missing)          [float columns]
+
+Everything is plain .npy (no pickle) and opened with mmap_mode="r", so all
+uvicorn workers share the same page-cache copy instead of each holding their own.
+"""
+import os
+import json
+import shutil
+import argparse
+import numpy as np
+
+STRING_COLUMNS = [
+    "image", "otolith_id", "scientific_name", "family",
+    "locality", "water_body", "detail_url",
+]
+FLOAT_COLUMNS = ["collection_depth_m"]
+
+# query filter -> string column matched through a precomputed mask
+FILTER_COLUMNS = ["family", "locality", "water_body", "scientific_name"]
+
+SCORE_BLOCK = 65536  # rows scored per block (float16 stores are upcast block-wise)
+
+# bump when stored rows change meaning; older stores are rebuilt by upgrade_store
+#   2: reference rows enriched with water_body / depth from the otolith dataset CSV
+STORE_FORMAT = 2
+
+
+class StringColumn:
+    def __init__(self, codes, offsets, blob):
+        self.codes = codes
+        self.offsets = offsets
+        self.blob = blob
+        self._ids = None
+        self._masks = None
+        self._lower_ids = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def string(self, sid):
+        if sid < 0:
+            return ""
+        return bytes(self.blob[self.offsets[sid]:self.offsets[sid + 1]]).decode("utf-8")
+
+    def value(self, row):
+        return self.string(int(self.codes[row]))
+
+    def strings(self):
+        return [self.string(i) for i in range(len(self))]
+
+    def id_of(self, text):
+        """String id of `text` (-1 if absent); the lookup table is built on first use."""
+        if self._ids is None:
+            self._ids = {s: i for i, s in enumerate(self.strings())}
+        return self._ids.get(text, -1)
+
+    def mask(self, text):
+        """Boolean row mask for a case-insensitive exact match, cached per value."""
+        key = text.strip().lower()
+        if self._masks is None:
+            self._masks = {}
+            lower = {}
+            for i, s in enumerate(self.strings()):
+                lower.setdefault(s.lower(), []).append(i)
+            self._lower_ids = {k: np.array(v, dtype=np.int32) for k, v in lower.items()}
+        m = self._masks.get(key)
+        if m is None:
+            ids = self._lower_ids.get(key)
+            m = np.isin(self.codes, ids) if ids is not None else np.zeros(len(self.codes), dtype=bool)
+            self._masks[key] = m
+        return m
+
+
+class FloatColumn:
+    def __init__(self, values):
+        self.values = values
+
+    def value(self, row):
+        v = float(self.values[row])
+        return None if v != v else v
+
+    def range_mask(self, low=None, high=None):
+        m = ~np.isnan(self.values)
+        if low is not None:
+            m &= self.values >= low
+        if high is not None:
+            m &= self.values <= high
+        return m
+
+
+class EmbeddingStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as fh:
+            self.manifest = json.load(fh)
+
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.columns = {}
+        for name, kind in self.manifest["columns"].items():
+            base = os.path.join(path, f"meta_{name}")
+            if kind == "string":
+                self.columns[name] = StringColumn(
+                    np.load(base + ".codes.npy", mmap_mode="r"),
+                    np.load(base + ".offsets.npy", mmap_mode="r"),
+                    np.load(base + ".strings.npy", mmap_mode="r"),
+                )
+            else:
+                self.columns[name] = FloatColumn(np.load(base + ".values.npy", mmap_mode="r"))
+
+        self.stamp = os.stat(os.path.join(path, "manifest.json")).st_mtime_ns
+
+    def __len__(self):
+        return int(self.manifest["rows"])
+
+    def row(self, i):
+        return {name: col.value(i) for name, col in self.columns.items()}
+
+    def filter_rows(self, filters):
+        """
+        Row indices matching every filter (None when nothing is filtered).
+        filters: {family, locality, water_body, scientific_name, min_depth, max_depth}
+        """
+        if not filters:
+            return None
+        mask = None
+        for name in FILTER_COLUMNS:
+            if filters.get(name):
+                m = self.columns[name].mask(filters[name])
+                mask = m if mask is None else mask & m
+        if filters.get("min_depth") is not None or filters.get("max_depth") is not None:
+            m = self.columns["collection_depth_m"].range_mask(filters.get("min_depth"), filters.get("max_depth"))
+            mask = m if mask is None else mask & m
+        return None if mask is None else np.flatnonzero(mask)
+
+    def score(self, q, rows=None):
+        """Dot product of every (or the selected) row with unit query `q`."""
+        q = np.asarray(q, dtype=np.float32)
+        embs = self.embeddings
+        if rows is not None:
+            return embs[rows].astype(np.float32, copy=False) @ q
+        out = np.empty(len(embs), dtype=np.float32)
+        for start in range(0, len(embs), SCORE_BLOCK):
+            block = embs[start:start + SCORE_BLOCK]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ q
+        return out
+
+
+# ============================
+# WRITING
+# ============================
+
+def _encode_strings(values):
+    table, codes = {}, np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is None or v == "" or (isinstance(v, float) and v != v):
+            codes[i] = -1
+            continue
+        codes[i] = table.setdefault(str(v), len(table))
+
+    encoded = [s.encode("utf-8") for s in table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return codes, offsets, blob
+
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def write_store(path, embeddings, rows, dtype="float32", replace=False):
+    """
+    Write a store directory atomically (built in a temp dir, then renamed into place).
+    replace=True swaps out an existing store; otherwise a store already there wins.
+    """
+    embeddings = np.asarray(embeddings)
+    if len(embeddings) != len(rows):
+        raise ValueError("embeddings and metadata rows differ in length")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, "embeddings.npy"), embeddings.astype(dtype))
+
+    columns = {}
+    for name in STRING_COLUMNS:
+        codes, offsets, blob = _encode_strings([r.get(name) for r in rows])
+        np.save(os.path.join(tmp, f"meta_{name}.codes.npy"), codes)
+        np.save(os.path.join(tmp, f"meta_{name}.offsets.npy"), offsets)
+        np.save(os.path.join(tmp, f"meta_{name}.strings.npy"), blob)
+        columns[name] = "string"
+    for name in FLOAT_COLUMNS:
+        values = np.array([_to_float(r.get(name)) for r in rows], dtype=np.float32)
+        np.save(os.path.join(tmp, f"meta_{name}.values.npy"), values)
+        columns[name] = "float"
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as fh:
+        json.dump({
+            "format": STORE_FORMAT,
+            "rows": int(len(rows)),
+            "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+            "dtype": str(np.dtype(dtype)),
+            "columns": columns,
+        }, fh)
+
+    if replace and os.path.exists(path):
+        old = tmp + ".old"
+        try:
+            os.replace(path, old)
+        except FileNotFoundError:
+            old = None  # another worker is swapping it right now
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        if old:
+            # open memory maps of the old files stay valid after unlinking
+            shutil.rmtree(old, ignore_errors=True)
+        return path
+
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # another worker published the same store first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            raise
+    return path
+
+
+def _otolith_id(row):
+    url = row.get("detail_url") or ""
+    return row.get("otolith_id") or (url.split("otolithID=", 1)[1] if "otolithID=" in url else None)
+
+
+def _enrich_rows(rows, metadata_csv):
+    """Fill water_body / depth from the otolith dataset CSV, joined on otolith_id."""
+    import pandas as pd
+    from app.utils.column_standardizer import standardize_df
+
+    df = standardize_df(pd.read_csv(metadata_csv, dtype=str), "otolith")
+    df = df.loc[:, ~df.columns.duplicated()]
+    if "otolith_id" not in df.columns:
+        return rows
+    keep = [c for c in STRING_COLUMNS + FLOAT_COLUMNS if c in df.columns and c != "otolith_id"]
+    lookup = df.drop_duplicates("otolith_id").set_index("otolith_id")[keep].to_dict(orient="index")
+
+    for r in rows:
+        extra = lookup.get(r["otolith_id"]) or {}
+        for k, v in extra.items():
+            if r.get(k) in (None, "") and isinstance(v, str):
+                r[k] = v
+    return rows
+
+
+def convert_npz(npz_path, out_dir, dtype="float32", metadata_csv=None):
+    """One-off migration of a legacy pickled embeddings.npz into a store directory."""
+    data = np.load(npz_path, allow_pickle=True)
+    rows = [dict(m) for m in data["meta"]]
+    for r in rows:
+        r["otolith_id"] = _otolith_id(r)
+    if metadata_csv and os.path.exists(metadata_csv):
+        rows = _enrich_rows(rows, metadata_csv)
+    embs = data["embeddings"].astype(np.float32)
+    # unit rows, so the dot product in EmbeddingStore.score is the cosine similarity
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True) + 1e-10
+    return write_store(out_dir, embs, rows, dtype=dtype)
+
+
+def store_format(path):
+    try:
+        with open(os.path.join(path, "manifest.json")) as fh:
+            return int(json.load(fh).get("format", 1))
+    except (OSError, ValueError):
+        return 0
+
+
+def upgrade_store(path, metadata_csv=None):
+    """Rebuild an older-format store in place: same embeddings, metadata re-enriched."""
+    store = EmbeddingStore(path)
+    rows = [store.row(i) for i in range(len(store))]
+    for r in rows:
+        r["otolith_id"] = _otolith_id(r)
+    if metadata_csv and os.path.exists(metadata_csv):
+        rows = _enrich_rows(rows, metadata_csv)
+    return write_store(path, np.asarray(store.embeddings), rows, dtype=store.manifest["dtype"], replace=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert embeddings.npz to a memory-mapped store")
+    parser.add_argument("npz")
+    parser.add_argument("out_dir")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--metadata_csv", help="Otolith dataset CSV used to fill water_body / depth")
+    args = parser.parse_args()
+    print(convert_npz(args.npz, args.out_dir, args.dtype, args.metadata_csv))
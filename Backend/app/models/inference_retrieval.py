@@ -1,12 +1,29 @@
 # inference_retrieval.py
-import numpy as np, json, os, argparse
+import numpy as np, json, os, io, time, threading, argparse
 from PIL import Image
 import torchvision.transforms as T
 import timm, torch
-from sklearn.metrics.pairwise import cosine_similarity
+from app.models.embedding_store import (
+    STORE_FORMAT, EmbeddingStore, convert_npz, store_format, upgrade_store, write_store,
+)
 
 BASE_DIR = os.path.dirname(__file__)  # directory where inference file lives
+# legacy pickled artifact; converted once into the memory-mapped store below
 EMB_PATH = os.path.join(BASE_DIR, "saved_artifacts", "embeddings.npz")
+STORE_PATH = os.getenv("OTOLITH_INDEX_DIR", os.path.join(BASE_DIR, "saved_artifacts", "index"))
+EMB_DTYPE = os.getenv("OTOLITH_EMB_DTYPE", "float32")  # float32 | float16
+# source of water_body / depth for the reference specimens (used when building the store)
+OTOLITH_CSV = os.getenv(
+    "OTOLITH_METADATA_CSV",
+    os.path.join(BASE_DIR, "..", "..", "..", "Datasets", "Otolith.csv")
+)
+# incremental shards appended by the background indexer (app/services/otolith_index_service.py)
+SHARD_DIR = os.getenv("OTOLITH_SHARD_DIR", os.path.join(BASE_DIR, "saved_artifacts", "shards"))
+SHARD_POLL_S = float(os.getenv("OTOLITH_SHARD_POLL_S", "5"))
+
+MODEL_NAME = "resnet50"
+# bump when the backbone or preprocessing changes (invalidates cached embeddings)
+MODEL_VERSION = os.getenv("OTOLITH_MODEL_VERSION", f"timm/{MODEL_NAME}/224")
 
 
 # --------------------
@@ -15,22 +32,106 @@ EMB_PATH = os.path.join(BASE_DIR, "saved_artifacts", "embeddings.npz")
 # --------------------
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = timm.create_model("resnet50", pretrained=True)
+model = timm.create_model(MODEL_NAME, pretrained=True)
 model.reset_classifier(0)
 model = model.to(device)
 model.eval()
 
 trans = T.Compose([T.Resize((224,224)), T.ToTensor()])
 
-# embeddings and metadata must load only once globally
-data = np.load(EMB_PATH, allow_pickle=True)
-embs = data['embeddings']
-meta = data['meta']
+def _open_base():
+    if not os.path.exists(os.path.join(STORE_PATH, "manifest.json")):
+        convert_npz(EMB_PATH, STORE_PATH, EMB_DTYPE, OTOLITH_CSV)
+    elif store_format(STORE_PATH) < STORE_FORMAT:
+        # converted before the metadata join existed: water_body / depth are empty
+        upgrade_store(STORE_PATH, OTOLITH_CSV)
+    return EmbeddingStore(STORE_PATH)
+
+
+def _list_shards():
+    if not os.path.isdir(SHARD_DIR):
+        return []
+    names = os.listdir(SHARD_DIR)
+    # shards written before the store format existed
+    for f in names:
+        if f.startswith("shard_") and f.endswith(".npz"):
+            legacy = os.path.join(SHARD_DIR, f)
+            try:
+                convert_npz(legacy, legacy[:-4], EMB_DTYPE)
+                os.remove(legacy)
+            except FileNotFoundError:
+                pass  # migrated by another worker
+    return sorted(
+        f for f in os.listdir(SHARD_DIR)
+        if f.startswith("shard_") and os.path.isdir(os.path.join(SHARD_DIR, f))
+    )
+
+
+def _build_index(shards, segments=None):
+    segments = segments or [_base] + [EmbeddingStore(os.path.join(SHARD_DIR, f)) for f in shards]
+    return {
+        "segments": segments,
+        "rows": int(sum(len(s) for s in segments)),
+        "shards": tuple(shards),
+        "checked_at": time.monotonic(),
+    }
 
 
-def embed_image(path):
-    img = Image.open(path).convert('RGB')
-    x = trans(img).unsqueeze(0).to(device)
+# embeddings and metadata must load only once globally (memory-mapped, shared by workers);
+# the whole index is swapped as one object, so readers never see half an update
+_base = _open_base()
+_index = _build_index(_list_shards())
+_index_lock = threading.Lock()
+
+
+def current_index():
+    """Current index; picks up shards written by other workers every SHARD_POLL_S."""
+    global _index
+    idx = _index
+    if time.monotonic() - idx["checked_at"] < SHARD_POLL_S:
+        return idx
+    with _index_lock:
+        idx = _index
+        shards = _list_shards()
+        if tuple(shards) != idx["shards"]:
+            _index = _build_index(shards)
+        else:
+            idx["checked_at"] = time.monotonic()
+        return _index
+
+
+def index_version():
+    """Identifies the reference index currently loaded (base store stamp + shards)."""
+    idx = current_index()
+    return f"{os.path.basename(STORE_PATH)}:{_base.stamp}:{len(idx['shards'])}:{idx['rows']}"
+
+
+def indexed_images():
+    images = set()
+    for seg in current_index()["segments"]:
+        images.update(seg.columns["image"].strings())
+    return images
+
+
+def append_shard(new_embs, new_meta):
+    """
+    Persist a batch of embeddings as a new shard store (atomic rename) and
+    hot-swap it into the running index.
+    """
+    global _index
+    os.makedirs(SHARD_DIR, exist_ok=True)
+
+    with _index_lock:
+        name = f"shard_{time.time_ns()}_{os.getpid()}"
+        path = write_store(os.path.join(SHARD_DIR, name), new_embs, list(new_meta), dtype=EMB_DTYPE)
+
+        idx = _index
+        _index = _build_index(idx["shards"] + (name,), idx["segments"] + [EmbeddingStore(path)])
+    return name
+
+
+def embed_pil(img):
+    x = trans(img.convert('RGB')).unsqueeze(0).to(device)
     with torch.no_grad():
         feat = model.forward_features(x)
         feat = torch.nn.functional.adaptive_avg_pool2d(feat,1).squeeze().cpu().numpy()
@@ -38,29 +139,73 @@ def embed_image(path):
     return feat
 
 
-def inference_retrieval(query_path, topk=5):
-    q = embed_image(query_path)
+def embed_batch(images):
+    x = torch.stack([trans(img.convert('RGB')) for img in images]).to(device)
+    with torch.no_grad():
+        feat = model.forward_features(x)
+        feat = torch.nn.functional.adaptive_avg_pool2d(feat,1).flatten(1).cpu().numpy()
+    return feat / (np.linalg.norm(feat, axis=1, keepdims=True) + 1e-10)
 
-    from sklearn.metrics.pairwise import cosine_similarity
-    sims = cosine_similarity(q.reshape(1, -1), embs).squeeze()
 
-    idx = sims.argsort()[::-1][:topk]
+def embed_image(path):
+    return embed_pil(Image.open(path))
+
+
+def embed_bytes(content):
+    return embed_pil(Image.open(io.BytesIO(content)))
+
+
+def search_embedding(q, topk=5, filters=None):
+    """
+    Top-k cosine matches. `filters` (family, locality, water_body, scientific_name,
+    min_depth, max_depth) narrow the candidates via precomputed masks before scoring,
+    so only matching rows are read and scored.
+    """
+    idx = current_index()
+    seg_ids, rows, sims = [], [], []
+    for s, seg in enumerate(idx["segments"]):
+        sel = seg.filter_rows(filters)
+        if sel is None:
+            sel = np.arange(len(seg))
+            scores = seg.score(q)
+        elif len(sel):
+            scores = seg.score(q, sel)
+        else:
+            continue
+        seg_ids.append(np.full(len(sel), s, dtype=np.int32))
+        rows.append(sel)
+        sims.append(scores)
+
+    if not sims:
+        return []
+    seg_ids, rows, sims = np.concatenate(seg_ids), np.concatenate(rows), np.concatenate(sims)
+
+    k = min(topk, len(sims))
+    top = np.argpartition(-sims, k - 1)[:k]
+    top = top[np.argsort(-sims[top])]
 
     preds = []
-    for i in idx:
-        m = meta[int(i)]
+    for i in top:
+        m = idx["segments"][seg_ids[i]].row(int(rows[i]))
         preds.append({
             'image': m['image'],
             'scientific_name': m.get('scientific_name', ''),
             'family': m.get('family', ''),
             'locality': m.get('locality', ''),
+            'water_body': m.get('water_body', ''),
+            'collection_depth_m': m.get('collection_depth_m'),
             'detail_url': m.get('detail_url', ''),
-            'score': float(sims[int(i)])
+            'score': float(sims[i])
         })
+    return preds
+
+
+def inference_retrieval(query_path, topk=5):
+    q = embed_image(query_path)
 
     return {
         'query_image': os.path.basename(query_path),
-        'results': preds
+        'results': search_embedding(q, topk)
     }
 
 
@@ -2,6 +2,7 @@
 import argparse
 import os
 import json
+import threading
 import pandas as pd
 
 # ML imports (only needed if running image mode)
@@ -25,9 +26,13 @@ except Exception:
 BASE_DIR = os.path.dirname(__file__)
 META_PATH = os.path.join(BASE_DIR, "saved_artifacts", "metadata.csv")
 # rename your CSV accordingly if needed
+MODEL_PATH = os.getenv("OTOLITH_CLASSIFIER_PATH", os.path.join(BASE_DIR, "saved_artifacts", "model.pt"))
 
-# Load metadata once (for FastAPI reuse)
-meta_df = pd.read_csv(META_PATH, dtype=str)
+# Load metadata once (for FastAPI reuse); an absent CSV only disables the lookups
+if os.path.exists(META_PATH):
+    meta_df = pd.read_csv(META_PATH, dtype=str)
+else:
+    meta_df = pd.DataFrame(columns=["scientific_name", "family", "locality", "detail_url"])
 meta_indexed = meta_df.drop_duplicates(subset=['scientific_name']).set_index('scientific_name')
 
 
@@ -45,43 +50,80 @@ def lookup_by_locality(locality):
     return results
 
 
-def image_mode(image_path, model_path, topk=3):
+# ---------------------------------------
+# CLASSIFIER CACHE: one load per (path, mtime)
+# ---------------------------------------
+_classifiers = {}
+_classifier_lock = threading.Lock()
+
+
+def load_classifier(model_path):
+    """Return (model, classes, transform) for a checkpoint, reloading only when the file changes."""
     if torch is None:
         raise RuntimeError("PyTorch/timm not available. Install requirements.")
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found: {model_path}")
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
 
-    ckpt = torch.load(model_path, map_location='cpu')
-    classes = ckpt.get('classes')
-    if classes is None:
-        raise RuntimeError("Checkpoint missing 'classes'")
+    key = os.path.abspath(model_path)
+    mtime = os.path.getmtime(key)
+    cached = _classifiers.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with _classifier_lock:
+        cached = _classifiers.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        ckpt = torch.load(key, map_location='cpu')
+        classes = ckpt.get('classes')
+        if classes is None:
+            raise RuntimeError("Checkpoint missing 'classes'")
+
+        model = timm.create_model('resnet50', pretrained=False, num_classes=len(classes))
+        model.load_state_dict(ckpt['model_state'])
+        model.eval()
 
-    model = timm.create_model('resnet50', pretrained=False, num_classes=len(classes))
-    model.load_state_dict(ckpt['model_state'])
-    model.eval()
+        trans = T.Compose([T.Resize((224,224)), T.ToTensor()])
+        entry = (model, classes, trans)
+        _classifiers[key] = (mtime, entry)
+        return entry
 
-    trans = T.Compose([T.Resize((224,224)), T.ToTensor()])
-    img = Image.open(image_path).convert('RGB')
-    x = trans(img).unsqueeze(0)
+
+def classify_images(images, model_path=MODEL_PATH, topk=3):
+    """Classify a batch of PIL images with a single forward pass."""
+    model, classes, trans = load_classifier(model_path)
+    x = torch.stack([trans(img.convert('RGB')) for img in images])
 
     with torch.no_grad():
-        out = model(x)
-        probs = torch.softmax(out, dim=1).squeeze().tolist()
-
-    topk_idx = sorted(enumerate(probs), key=lambda ip: -ip[1])[:topk]
-    preds = []
-    for i, p in topk_idx:
-        name = classes[i]
-        meta = lookup_by_scientific(name)
-        preds.append({
-            "scientific_name": name,
-            "confidence": float(p),
-            "family": meta.get('family','') if meta else '',
-            "locality": meta.get('locality','') if meta else '',
-            "detail_url": meta.get('detail_url','') if meta else ''
-        })
+        probs = torch.softmax(model(x), dim=1)
+        top_p, top_i = probs.topk(min(topk, len(classes)), dim=1)
+
+    batch = []
+    for ps, ids in zip(top_p.tolist(), top_i.tolist()):
+        preds = []
+        for i, p in zip(ids, ps):
+            name = classes[i]
+            meta = lookup_by_scientific(name)
+            preds.append({
+                "scientific_name": name,
+                "confidence": float(p),
+                "family": meta.get('family','') if meta else '',
+                "locality": meta.get('locality','') if meta else '',
+                "detail_url": meta.get('detail_url','') if meta else ''
+            })
+        batch.append(preds)
+    return batch
+
+
+def image_mode(image_path, model_path, topk=3):
+    if torch is None:
+        raise RuntimeError("PyTorch/timm not available. Install requirements.")
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    img = Image.open(image_path)
+    preds = classify_images([img], model_path, topk=topk)[0]
     return {"input_image": os.path.basename(image_path), "predictions": preds}
 
 
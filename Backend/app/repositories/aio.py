@@ -0,0 +1,89 @@
+# app/repositories/aio.py
+"""
+Awaitable counterparts of app.repositories.base, for async handlers.
+
+AsyncBackend has the Backend interface as coroutines. Backends without a
+native async driver (sqlite) are wrapped in ThreadedBackend, which runs
+each call through run_blocking. The async repositories are the sync
+classes with an awaiting _call (async_repository), so every query is
+still defined once, in base.py.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from app.repositories.base import (
+    Backend, MetadataRepository, OtolithRepository, ProfileRepository, Row, TableRepository, UserRepository,
+)
+from app.utils.concurrency import run_blocking
+
+
+class AsyncBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def select(self, table: str, columns: str = "*", **filters) -> List[Row]:
+        ...
+
+    @abstractmethod
+    async def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        ...
+
+    @abstractmethod
+    async def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        ...
+
+    @abstractmethod
+    async def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        ...
+
+    async def frame(self, table: str, columns: str = "*") -> pd.DataFrame:
+        return pd.DataFrame(await self.select(table, columns))
+
+
+class ThreadedBackend(AsyncBackend):
+    """A sync Backend run in the shared threadpool."""
+
+    def __init__(self, backend: Backend):
+        self.sync = backend
+        self.name = backend.name
+
+    async def select(self, table: str, columns: str = "*", **filters) -> List[Row]:
+        return await run_blocking(self.sync.select, table, columns, **filters)
+
+    async def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        return await run_blocking(self.sync.insert, table, rows)
+
+    async def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        return await run_blocking(self.sync.update, table, values, eq)
+
+    async def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        return await run_blocking(self.sync.upsert, table, rows, on_conflict)
+
+    async def frame(self, table: str, columns: str = "*") -> pd.DataFrame:
+        return await run_blocking(self.sync.frame, table, columns)
+
+
+# ============================
+# TABLE REPOSITORIES
+# ============================
+
+class AsyncCalls:
+    """Repository mixin: backend calls are awaited, so every query method returns a coroutine."""
+
+    async def _call(self, method: str, *args, then=None, **kwargs):
+        result = await getattr(self.backend, method)(*args, **kwargs)
+        return then(result) if then else result
+
+
+def async_repository(cls: type) -> type:
+    """Awaitable variant of a base.py repository class, bound to an AsyncBackend."""
+    return type(f"Async{cls.__name__}", (AsyncCalls, cls), {"__module__": __name__})
+
+
+AsyncTableRepository = async_repository(TableRepository)
+AsyncOtolithRepository = async_repository(OtolithRepository)
+AsyncUserRepository = async_repository(UserRepository)
+AsyncMetadataRepository = async_repository(MetadataRepository)
+AsyncProfileRepository = async_repository(ProfileRepository)
@@ -0,0 +1,40 @@
+# app/repositories/async_tables.py
+"""
+Awaitable repository singletons for async handlers, same names as
+app.repositories.tables. With DATA_BACKEND=supabase they talk PostgREST
+over the shared HTTP/2 client; sqlite runs the sync backend in the
+threadpool.
+"""
+from app.repositories.aio import (
+    AsyncBackend, AsyncMetadataRepository, AsyncOtolithRepository, AsyncProfileRepository,
+    AsyncTableRepository, AsyncUserRepository, ThreadedBackend,
+)
+from app.repositories.tables import DATA_BACKEND, backend as sync_backend
+
+
+def get_async_backend(name: str = DATA_BACKEND) -> AsyncBackend:
+    if name == "supabase":
+        from app.repositories.postgrest_backend import AsyncPostgrestBackend
+        return AsyncPostgrestBackend()
+    return ThreadedBackend(sync_backend)
+
+
+backend = get_async_backend()
+
+ocean_repo = AsyncTableRepository(backend, "ocean_data")
+ocean_demo_repo = AsyncTableRepository(backend, "oceandemo_data")
+taxonomy_repo = AsyncTableRepository(backend, "taxonomy_data")
+otolith_repo = AsyncOtolithRepository(backend, "otolith_data")
+edna_repo = AsyncTableRepository(backend, "edna_data")
+metadata_repo = AsyncMetadataRepository(backend, "dataset_metadata")
+users_repo = AsyncUserRepository(backend, "users")
+data_info_repo = AsyncTableRepository(backend, "data_info")
+profile_repo = AsyncProfileRepository(backend, "species_profile")
+
+
+def repo_for(table: str) -> AsyncTableRepository:
+    for r in (ocean_repo, ocean_demo_repo, taxonomy_repo, otolith_repo, edna_repo,
+              metadata_repo, users_repo, data_info_repo, profile_repo):
+        if r.table == table:
+            return r
+    return AsyncTableRepository(backend, table)
@@ -0,0 +1,155 @@
+# app/repositories/base.py
+"""
+Storage backend interface and table repositories.
+
+A backend knows how to run one filtered select / insert / update /
+upsert against a named table; repositories wrap a table with the queries
+the routes and services actually use. Filters:
+
+    eq        {col: value}            col = value          (AND)
+    any_eq    {col: value}            col = value          (OR over the dict)
+    in_       (col, [values])         col IN values
+    null      [cols]                  col IS NULL
+    not_null  [cols]                  col IS NOT NULL
+    lte / gte {col: value}            col <= / >= value
+
+limit=None means every matching row (backends page internally).
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+Row = Dict[str, Any]
+
+
+class Backend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: Optional[Dict[str, Any]] = None,
+        any_eq: Optional[Dict[str, Any]] = None,
+        in_: Optional[Tuple[str, Sequence[Any]]] = None,
+        null: Iterable[str] = (),
+        not_null: Iterable[str] = (),
+        lte: Optional[Dict[str, Any]] = None,
+        gte: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Row]:
+        ...
+
+    @abstractmethod
+    def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        ...
+
+    @abstractmethod
+    def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        ...
+
+    @abstractmethod
+    def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        ...
+
+    def frame(self, table: str, columns: str = "*") -> pd.DataFrame:
+        """Whole table as a DataFrame (analytical reads)."""
+        return pd.DataFrame(self.select(table, columns))
+
+    def sql(self, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        """Raw SQL; only local backends support it."""
+        raise NotImplementedError(f"{self.name} backend does not run raw SQL")
+
+
+# ============================
+# TABLE REPOSITORIES
+# ============================
+
+def _first_row(rows: List[Row]) -> Optional[Row]:
+    return rows[0] if rows else None
+
+
+class TableRepository:
+    """
+    Each query is one backend call plus optional post-processing, routed
+    through _call. The async repositories (app.repositories.aio) override
+    _call only, so every query is defined once, here.
+    """
+
+    def __init__(self, backend: Backend, table: str):
+        self.backend = backend
+        self.table = table
+
+    def _call(self, method: str, *args, then=None, **kwargs):
+        result = getattr(self.backend, method)(*args, **kwargs)
+        return then(result) if then else result
+
+    def all(self, columns: str = "*") -> List[Row]:
+        return self._call("select", self.table, columns)
+
+    def frame(self, columns: str = "*") -> pd.DataFrame:
+        return self._call("frame", self.table, columns)
+
+    def page(self, offset: int = 0, limit: int = 1000, columns: str = "*",
+             order: Optional[str] = None, desc: bool = False) -> List[Row]:
+        return self._call("select", self.table, columns, order=order, desc=desc, limit=limit, offset=offset)
+
+    def find(self, columns: str = "*", limit: Optional[int] = None, **eq) -> List[Row]:
+        return self._call("select", self.table, columns, eq=eq, limit=limit)
+
+    def first(self, columns: str = "*", **eq) -> Optional[Row]:
+        return self._call("select", self.table, columns, eq=eq, limit=1, then=_first_row)
+
+    def find_in(self, column: str, values: Sequence[Any], columns: str = "*") -> List[Row]:
+        return self._call("select", self.table, columns, in_=(column, list(values)))
+
+    def insert(self, rows) -> List[Row]:
+        return self._call("insert", self.table, rows if isinstance(rows, list) else [rows])
+
+    def update(self, values: Row, **eq) -> List[Row]:
+        return self._call("update", self.table, values, eq)
+
+    def upsert(self, rows: List[Row], on_conflict: str) -> List[Row]:
+        return self._call("upsert", self.table, rows, on_conflict)
+
+
+class OtolithRepository(TableRepository):
+
+    def unlabeled(self, limit: int) -> List[Row]:
+        return self._call("select", self.table, null=["label"], limit=limit)
+
+    def with_storage(self, limit: int) -> List[Row]:
+        return self._call("select", self.table, not_null=["storage_path"], limit=limit)
+
+
+class UserRepository(TableRepository):
+
+    def find_username_or_email(self, username: str, email: str, columns: str = "id") -> List[Row]:
+        return self._call("select", self.table, columns, any_eq={"username": username, "email": email})
+
+
+class MetadataRepository(TableRepository):
+
+    def latest(self, dataset_type: str) -> Optional[Row]:
+        return self._call("select", self.table, eq={"dataset_type": dataset_type},
+                          order="created_at", desc=True, limit=1, then=_first_row)
+
+    def types(self) -> List[str]:
+        return self._call("select", self.table, "dataset_type",
+                          then=lambda rows: sorted({r["dataset_type"] for r in rows}))
+
+
+class ProfileRepository(TableRepository):
+
+    def overlapping(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> List[Row]:
+        """Profiles whose occurrence bounding box intersects the given box."""
+        return self._call(
+            "select", self.table, "scientific_name,lat_min,lat_max,lon_min,lon_max",
+            lte={"lat_min": lat_max, "lon_min": lon_max},
+            gte={"lat_max": lat_min, "lon_max": lon_min},
+        )
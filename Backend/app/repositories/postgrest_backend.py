@@ -0,0 +1,183 @@
+# app/repositories/postgrest_backend.py
+"""
+Async PostgREST backend: the same filtered select / insert / update /
+upsert as SupabaseBackend, but spoken directly over the shared httpx
+client (app.utils.http), so awaiting handlers do not hold a threadpool
+thread while the database answers. Unbounded selects read the row count
+with the first page and fetch the remaining pages concurrently.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from app.repositories.aio import AsyncBackend
+from app.repositories.base import Row
+from app.repositories.supabase_backend import IN_CHUNK, PAGE_SIZE
+from app.utils import http
+from app.utils.metrics import span
+
+PAGE_CONCURRENCY = 4
+
+
+def _value(v) -> str:
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    return str(v)
+
+
+def _quoted(v) -> str:
+    """Value inside an in.() / or=() list; strings are double-quoted."""
+    if isinstance(v, str):
+        return '"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return _value(v)
+
+
+class AsyncPostgrestBackend(AsyncBackend):
+
+    name = "postgrest"
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+        self._url = url
+        self._key = key
+
+    def _endpoint(self, table: str) -> str:
+        if self._url is None:
+            from app.database import SUPABASE_URL, SUPABASE_SERVICE_KEY
+            self._url, self._key = SUPABASE_URL, self._key or SUPABASE_SERVICE_KEY
+        return f"{self._url.rstrip('/')}/rest/v1/{table}"
+
+    def _headers(self, prefer: Optional[str] = None) -> Dict[str, str]:
+        h = {"apikey": self._key, "Authorization": f"Bearer {self._key}"}
+        if prefer:
+            h["Prefer"] = prefer
+        return h
+
+    @staticmethod
+    def _filters(eq=None, any_eq=None, in_=None, null=(), not_null=(), lte=None, gte=None):
+        params: List[Tuple[str, str]] = []
+        for col, v in (eq or {}).items():
+            params.append((col, "is.null" if v is None else f"eq.{_value(v)}"))
+        if any_eq:
+            params.append(("or", "(" + ",".join(f"{c}.eq.{_quoted(v)}" for c, v in any_eq.items()) + ")"))
+        if in_ is not None:
+            params.append((in_[0], "in.(" + ",".join(_quoted(v) for v in in_[1]) + ")"))
+        params.extend((col, "is.null") for col in null)
+        params.extend((col, "not.is.null") for col in not_null)
+        params.extend((col, f"lte.{_value(v)}") for col, v in (lte or {}).items())
+        params.extend((col, f"gte.{_value(v)}") for col, v in (gte or {}).items())
+        return params
+
+    async def _call(self, method: str, table: str, params, prefer=None, body=None, idempotent=None):
+        url = self._endpoint(table)
+        resp = await http.request(
+            method, url, idempotent=idempotent, params=params, service="supabase",
+            headers={**self._headers(prefer), **({"Content-Type": "application/json"} if body is not None else {})},
+            content=None if body is None else json.dumps(body, default=str),
+        )
+        resp.raise_for_status()
+        return resp
+
+    # ---------- reads ----------
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: Optional[Dict[str, Any]] = None,
+        any_eq: Optional[Dict[str, Any]] = None,
+        in_: Optional[Tuple[str, Sequence[Any]]] = None,
+        null=(),
+        not_null=(),
+        lte: Optional[Dict[str, Any]] = None,
+        gte: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Row]:
+        with span("db_fetch"):
+            return await self._select(table, columns, eq, any_eq, in_, null, not_null, lte, gte,
+                                      order, desc, limit, offset)
+
+    async def _select(self, table, columns, eq, any_eq, in_, null, not_null, lte, gte, order, desc, limit, offset):
+        base = [("select", columns.replace(" ", ""))]
+        if order:
+            base.append(("order", f"{order}.{'desc' if desc else 'asc'}"))
+
+        if in_ is not None:
+            values = sorted({v for v in in_[1] if v is not None})
+            chunks = [values[i:i + IN_CHUNK] for i in range(0, len(values), IN_CHUNK)]
+            parts = await asyncio.gather(*(
+                self._pages(table, base + self._filters(eq, any_eq, (in_[0], c), null, not_null, lte, gte), None, 0)
+                for c in chunks
+            ))
+            rows = [r for part in parts for r in part]
+            return rows[offset:] if limit is None else rows[offset:offset + limit]
+        return await self._pages(table, base + self._filters(eq, any_eq, None, null, not_null, lte, gte),
+                                 limit, offset)
+
+    async def _page(self, table, params, offset, size, count=False):
+        resp = await self._call("GET", table, params + [("offset", str(offset)), ("limit", str(size))],
+                                prefer="count=exact" if count else None)
+        total = None
+        if count:
+            # Content-Range: 0-999/12345 (or */0)
+            tail = resp.headers.get("content-range", "").rpartition("/")[2]
+            total = int(tail) if tail.isdigit() else None
+        return resp.json() or [], total
+
+    async def _pages(self, table, params, limit, offset) -> List[Row]:
+        if limit is not None and limit <= PAGE_SIZE:
+            return (await self._page(table, params, offset, limit))[0]
+
+        rows, total = await self._page(table, params, offset, PAGE_SIZE, count=True)
+        if len(rows) < PAGE_SIZE:
+            return rows
+        if total is None:
+            # no count: fall back to reading page after page
+            while True:
+                page = (await self._page(table, params, offset + len(rows), PAGE_SIZE))[0]
+                rows.extend(page)
+                if len(page) < PAGE_SIZE or (limit is not None and len(rows) >= limit):
+                    return rows if limit is None else rows[:limit]
+
+        end = total if limit is None else min(total, offset + limit)
+        starts = range(offset + PAGE_SIZE, end, PAGE_SIZE)
+        gate = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+        async def fetch(start):
+            async with gate:
+                return (await self._page(table, params, start, min(PAGE_SIZE, end - start)))[0]
+
+        for page in await asyncio.gather(*(fetch(s) for s in starts)):
+            rows.extend(page)
+        return rows
+
+    async def frame(self, table: str, columns: str = "*") -> pd.DataFrame:
+        return pd.DataFrame(await self.select(table, columns))
+
+    # ---------- writes ----------
+
+    async def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        if not rows:
+            return []
+        with span("db_write"):
+            resp = await self._call("POST", table, [], prefer="return=representation", body=rows)
+        return resp.json() or []
+
+    async def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        with span("db_write"):
+            resp = await self._call("PATCH", table, self._filters(eq), prefer="return=representation",
+                                    body=values, idempotent=True)
+        return resp.json() or []
+
+    async def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        if not rows:
+            return []
+        with span("db_write"):
+            resp = await self._call("POST", table, [("on_conflict", on_conflict)],
+                                    prefer="resolution=merge-duplicates,return=representation",
+                                    body=rows, idempotent=True)
+        return resp.json() or []
@@ -0,0 +1,271 @@
+# app/repositories/sqlite_backend.py
+"""
+Embedded SQLite backend (stdlib sqlite3), for offline runs, tests and
+benchmarks.
+
+Tables are schemaless on the way in: each table gets an integer `id` key
+and any new column is added on first write, so upload rows go in as the
+Supabase tables receive them. dict / list values are stored as JSON text
+and decoded on read (tracked in `_json_columns`). Index definitions for
+the known tables are applied as soon as their columns exist.
+"""
+import os
+import json
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.repositories.base import Backend, Row
+from app.utils.metrics import span
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH", os.path.join(BASE_DIR, "models", "saved_artifacts", "local.sqlite3")
+)
+
+# (columns, unique) per table; created once all columns exist
+INDEXES: Dict[str, List[Tuple[Tuple[str, ...], bool]]] = {
+    "ocean_data": [(("datetime",), False), (("lat", "lon"), False), (("station_id",), False)],
+    "taxonomy_data": [(("scientific_name",), False), (("family",), False)],
+    "otolith_data": [(("otolith_id",), False), (("scientific_name",), False),
+                     (("label",), False), (("storage_path",), False)],
+    "edna_data": [],
+    "dataset_metadata": [(("dataset_type", "created_at"), False)],
+    "users": [(("username",), False), (("email",), False)],
+    "data_info": [(("dataset_domain",), False)],
+    "species_profile": [(("scientific_name",), True), (("lat_min", "lat_max", "lon_min", "lon_max"), False)],
+}
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteBackend(Backend):
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()          # one writer at a time
+        self._columns: Dict[str, Set[str]] = {}
+        self._json: Dict[str, Set[str]] = {}
+        self._indexed: Set[Tuple[str, Tuple[str, ...]]] = set()
+
+    # ---------- connection / schema ----------
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS _json_columns (tbl TEXT, col TEXT, PRIMARY KEY (tbl, col))")
+            self._local.conn = conn
+        return conn
+
+    def _table_columns(self, table: str) -> Set[str]:
+        cols = self._columns.get(table)
+        if cols is None:
+            cols = {r["name"] for r in self.conn.execute(f"PRAGMA table_info({_q(table)})")}
+            if cols:
+                self._columns[table] = cols
+                self._json[table] = {r["col"] for r in self.conn.execute(
+                    "SELECT col FROM _json_columns WHERE tbl = ?", (table,))}
+        return cols
+
+    def _ensure(self, table: str, columns: Sequence[str], json_cols: Sequence[str] = ()):
+        """Create the table / add missing columns and due indexes. Caller holds _lock."""
+        conn = self.conn
+        cols = self._table_columns(table)
+        if not cols:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            cols = self._columns[table] = {"id"}
+            self._json[table] = set()
+        for c in columns:
+            if c not in cols:
+                conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(c)}")
+                cols.add(c)
+        for c in json_cols:
+            if c not in self._json[table]:
+                conn.execute("INSERT OR IGNORE INTO _json_columns VALUES (?, ?)", (table, c))
+                self._json[table].add(c)
+        for idx_cols, unique in INDEXES.get(table, []):
+            self._index(table, idx_cols, unique)
+
+    def _index(self, table: str, idx_cols: Tuple[str, ...], unique: bool = False):
+        if (table, idx_cols) in self._indexed or not set(idx_cols) <= self._columns.get(table, set()):
+            return
+        name = f"ix_{table}_{'_'.join(idx_cols)}"
+        self.conn.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {_q(name)} "
+            f"ON {_q(table)} ({', '.join(_q(c) for c in idx_cols)})"
+        )
+        self._indexed.add((table, idx_cols))
+
+    # ---------- values ----------
+
+    @staticmethod
+    def _encode(v):
+        if isinstance(v, (dict, list, tuple)):
+            return json.dumps(v, default=str)
+        if isinstance(v, np.generic):
+            v = v.item()
+        if v is pd.NaT or (isinstance(v, float) and math.isnan(v)):
+            return None
+        if hasattr(v, "isoformat"):
+            return v.isoformat()
+        return v
+
+    def _decode(self, table: str, rows) -> List[Row]:
+        json_cols = self._json.get(table, set())
+        out = []
+        for r in rows:
+            d = dict(r)
+            for c in json_cols & d.keys():
+                if isinstance(d[c], str):
+                    d[c] = json.loads(d[c])
+            out.append(d)
+        return out
+
+    # ---------- queries ----------
+
+    def _where(self, table, eq, any_eq, in_, null, not_null, lte, gte):
+        known = self._table_columns(table)
+        clauses, params = [], []
+
+        def col(c):
+            # filters on a column the table never had behave as NULL
+            return _q(c) if c in known else "NULL"
+
+        for c, v in (eq or {}).items():
+            clauses.append(f"{col(c)} = ?")
+            params.append(self._encode(v))
+        if any_eq:
+            clauses.append("(" + " OR ".join(f"{col(c)} = ?" for c in any_eq) + ")")
+            params.extend(self._encode(v) for v in any_eq.values())
+        if in_ is not None:
+            values = [self._encode(v) for v in in_[1] if v is not None]
+            if not values:
+                clauses.append("0")
+            else:
+                clauses.append(f"{col(in_[0])} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        clauses.extend(f"{col(c)} IS NULL" for c in null)
+        clauses.extend(f"{col(c)} IS NOT NULL" for c in not_null)
+        for c, v in (lte or {}).items():
+            clauses.append(f"{col(c)} <= ?")
+            params.append(self._encode(v))
+        for c, v in (gte or {}).items():
+            clauses.append(f"{col(c)} >= ?")
+            params.append(self._encode(v))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _select_list(self, table: str, columns: str) -> str:
+        if columns.strip() == "*":
+            return "*"
+        known = self._table_columns(table)
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        return ", ".join(_q(c) if c in known else f"NULL AS {_q(c)}" for c in names)
+
+    def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: Optional[Dict[str, Any]] = None,
+        any_eq: Optional[Dict[str, Any]] = None,
+        in_: Optional[Tuple[str, Sequence[Any]]] = None,
+        null=(),
+        not_null=(),
+        lte: Optional[Dict[str, Any]] = None,
+        gte: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Row]:
+        if not self._table_columns(table):
+            return []
+        where, params = self._where(table, eq, any_eq, in_, null, not_null, lte, gte)
+        sql = f"SELECT {self._select_list(table, columns)} FROM {_q(table)}{where}"
+        if order:
+            sql += f" ORDER BY {_q(order) if order in self._columns[table] else 'NULL'} {'DESC' if desc else 'ASC'}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        with span("db_fetch"):
+            return self._decode(table, self.conn.execute(sql, params).fetchall())
+
+    def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        if not rows:
+            return []
+        columns = list(dict.fromkeys(c for r in rows for c in r))
+        json_cols = {c for r in rows for c, v in r.items() if isinstance(v, (dict, list, tuple))}
+        with span("db_write"), self._lock, self.conn:
+            self._ensure(table, columns, json_cols)
+            last = self.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_q(table)}").fetchone()[0]
+            self.conn.executemany(
+                f"INSERT INTO {_q(table)} ({', '.join(_q(c) for c in columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [[self._encode(r.get(c)) for c in columns] for r in rows],
+            )
+            out = self.conn.execute(f"SELECT * FROM {_q(table)} WHERE id > ? ORDER BY id", (last,)).fetchall()
+        return self._decode(table, out)
+
+    def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        if not self._table_columns(table) or not values:
+            return []
+        json_cols = {c for c, v in values.items() if isinstance(v, (dict, list, tuple))}
+        with span("db_write"), self._lock, self.conn:
+            self._ensure(table, list(values), json_cols)
+            where, params = self._where(table, eq, None, None, (), (), None, None)
+            ids = [r[0] for r in self.conn.execute(f"SELECT id FROM {_q(table)}{where}", params)]
+            if not ids:
+                return []
+            sets = ", ".join(f"{_q(c)} = ?" for c in values)
+            marks = ", ".join("?" * len(ids))
+            self.conn.execute(f"UPDATE {_q(table)} SET {sets} WHERE id IN ({marks})",
+                              [self._encode(v) for v in values.values()] + ids)
+            out = self.conn.execute(f"SELECT * FROM {_q(table)} WHERE id IN ({marks})", ids).fetchall()
+        return self._decode(table, out)
+
+    def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        if not rows:
+            return []
+        columns = list(dict.fromkeys(c for r in rows for c in r))
+        json_cols = {c for r in rows for c, v in r.items() if isinstance(v, (dict, list, tuple))}
+        keys = [r.get(on_conflict) for r in rows]
+        with span("db_write"), self._lock, self.conn:
+            self._ensure(table, columns + [on_conflict], json_cols)
+            self._index(table, (on_conflict,), unique=True)
+            updates = ", ".join(f"{_q(c)} = excluded.{_q(c)}" for c in columns if c != on_conflict)
+            self.conn.executemany(
+                f"INSERT INTO {_q(table)} ({', '.join(_q(c) for c in columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT ({_q(on_conflict)}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING"),
+                [[self._encode(r.get(c)) for c in columns] for r in rows],
+            )
+        return self.select(table, in_=(on_conflict, keys))
+
+    # ---------- analytical ----------
+
+    def frame(self, table: str, columns: str = "*") -> pd.DataFrame:
+        if not self._table_columns(table):
+            return pd.DataFrame()
+        with span("db_fetch"):
+            df = pd.read_sql_query(f"SELECT {self._select_list(table, columns)} FROM {_q(table)}", self.conn)
+        for c in self._json.get(table, set()) & set(df.columns):
+            df[c] = df[c].map(lambda v: json.loads(v) if isinstance(v, str) else v)
+        return df
+
+    def sql(self, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        return pd.read_sql_query(query, self.conn, params=list(params))
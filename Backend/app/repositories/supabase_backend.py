@@ -0,0 +1,103 @@
+# app/repositories/supabase_backend.py
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.repositories.base import Backend, Row
+from app.utils.metrics import outbound, span
+
+PAGE_SIZE = 1000  # PostgREST returns at most this many rows per request
+IN_CHUNK = 200    # values per in_() filter, keeps the PostgREST URL short
+
+
+class SupabaseBackend(Backend):
+    """PostgREST through the shared supabase client (app.database)."""
+
+    name = "supabase"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.database import supabase   # needs SUPABASE_URL / SUPABASE_SERVICE_KEY
+            self._client = supabase
+        return self._client
+
+    def _query(self, table, columns, eq, any_eq, in_, null, not_null, lte, gte, order, desc):
+        q = self.client.table(table).select(columns)
+        for col, v in (eq or {}).items():
+            q = q.eq(col, v)
+        if any_eq:
+            q = q.or_(",".join(f"{col}.eq.{v}" for col, v in any_eq.items()))
+        if in_ is not None:
+            q = q.in_(in_[0], list(in_[1]))
+        for col in null:
+            q = q.is_(col, None)
+        for col in not_null:
+            q = q.not_.is_(col, None)
+        for col, v in (lte or {}).items():
+            q = q.lte(col, v)
+        for col, v in (gte or {}).items():
+            q = q.gte(col, v)
+        if order:
+            q = q.order(order, desc=desc)
+        return q
+
+    def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: Optional[Dict[str, Any]] = None,
+        any_eq: Optional[Dict[str, Any]] = None,
+        in_: Optional[Tuple[str, Sequence[Any]]] = None,
+        null=(),
+        not_null=(),
+        lte: Optional[Dict[str, Any]] = None,
+        gte: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Row]:
+        with span("db_fetch"):
+            return self._select(table, columns, eq, any_eq, in_, null, not_null, lte, gte,
+                                order, desc, limit, offset)
+
+    def _select(self, table, columns, eq, any_eq, in_, null, not_null, lte, gte, order, desc, limit, offset):
+        if in_ is not None:
+            values = sorted({v for v in in_[1] if v is not None})
+            rows: List[Row] = []
+            for i in range(0, len(values), IN_CHUNK):
+                rows.extend(self._pages(table, columns, eq, any_eq, (in_[0], values[i:i + IN_CHUNK]),
+                                        null, not_null, lte, gte, order, desc, None, 0))
+            return rows[offset:] if limit is None else rows[offset:offset + limit]
+        return self._pages(table, columns, eq, any_eq, None, null, not_null, lte, gte,
+                           order, desc, limit, offset)
+
+    def _pages(self, table, columns, eq, any_eq, in_, null, not_null, lte, gte, order, desc, limit, offset):
+        """Read page by page; a bare select() is capped by the API row limit."""
+        rows: List[Row] = []
+        while True:
+            size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(rows))
+            q = self._query(table, columns, eq, any_eq, in_, null, not_null, lte, gte, order, desc)
+            with outbound("supabase"):
+                page = q.range(offset, offset + size - 1).execute().data or []
+            rows.extend(page)
+            offset += len(page)
+            if len(page) < size or (limit is not None and len(rows) >= limit):
+                return rows
+
+    def insert(self, table: str, rows: List[Row]) -> List[Row]:
+        with span("db_write"), outbound("supabase"):
+            return self.client.table(table).insert(rows).execute().data or []
+
+    def update(self, table: str, values: Row, eq: Dict[str, Any]) -> List[Row]:
+        q = self.client.table(table).update(values)
+        for col, v in eq.items():
+            q = q.eq(col, v)
+        with span("db_write"), outbound("supabase"):
+            return q.execute().data or []
+
+    def upsert(self, table: str, rows: List[Row], on_conflict: str) -> List[Row]:
+        with span("db_write"), outbound("supabase"):
+            return self.client.table(table).upsert(rows, on_conflict=on_conflict).execute().data or []
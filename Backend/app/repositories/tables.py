@@ -0,0 +1,45 @@
+# app/repositories/tables.py
+"""
+Repository singletons. DATA_BACKEND picks the store:
+  supabase (default)  PostgREST via app.database
+  sqlite              embedded file at SQLITE_PATH, no network
+"""
+import os
+
+from app.repositories.base import (
+    Backend, MetadataRepository, OtolithRepository, ProfileRepository, TableRepository, UserRepository,
+)
+
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").lower()
+
+
+def get_backend(name: str = DATA_BACKEND) -> Backend:
+    if name == "sqlite":
+        from app.repositories.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    if name == "supabase":
+        from app.repositories.supabase_backend import SupabaseBackend
+        return SupabaseBackend()
+    raise ValueError(f"Unknown DATA_BACKEND '{name}' (supabase | sqlite)")
+
+
+backend = get_backend()
+
+ocean_repo = TableRepository(backend, "ocean_data")
+ocean_demo_repo = TableRepository(backend, "oceandemo_data")
+taxonomy_repo = TableRepository(backend, "taxonomy_data")
+otolith_repo = OtolithRepository(backend, "otolith_data")
+edna_repo = TableRepository(backend, "edna_data")
+metadata_repo = MetadataRepository(backend, "dataset_metadata")
+users_repo = UserRepository(backend, "users")
+data_info_repo = TableRepository(backend, "data_info")
+profile_repo = ProfileRepository(backend, "species_profile")
+
+
+def repo_for(table: str) -> TableRepository:
+    """Repository by table name, for code that is table-generic (uploads, batch lookups)."""
+    for r in (ocean_repo, ocean_demo_repo, taxonomy_repo, otolith_repo, edna_repo,
+              metadata_repo, users_repo, data_info_repo, profile_repo):
+        if r.table == table:
+            return r
+    return TableRepository(backend, table)
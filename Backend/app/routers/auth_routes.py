@@ -5,7 +5,8 @@ from passlib.context import CryptContext
 from jose import jwt
 import os
 
-from app.database import supabase
+from app.repositories.async_tables import users_repo
+from app.utils.concurrency import run_blocking
 from app.schemas.user_schema import UserCreate, LoginRequest, UserPublic, TokenResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -78,17 +79,15 @@ ROLE_LABELS = {
 # 1) REGISTER
 # ---------------------------------------------------------
 @router.post("/register")
-def register_user(payload: UserCreate):
+async def register_user(payload: UserCreate):
 
-    existing = supabase.table("users").select("id").or_(
-        f"username.eq.{payload.username},email.eq.{payload.email}"
-    ).execute()
+    existing = await users_repo.find_username_or_email(payload.username, payload.email)
 
-    if existing.data:
+    if existing:
         return {"status": "error", "detail": "Username or email already exists"}
 
     try:
-        hashed = hash_password(payload.password)
+        hashed = await run_blocking(hash_password, payload.password)   # bcrypt is deliberately slow
     except Exception as e:
         return {"status": "error", "detail": f"Password invalid: {str(e)}"}
 
@@ -102,11 +101,11 @@ def register_user(payload: UserCreate):
         "drive_link": payload.drive_link
     }
 
-    res = supabase.table("users").insert(row).execute()
-    if not res.data:
+    inserted = await users_repo.insert(row)
+    if not inserted:
         return {"status": "error", "detail": "Insert failed"}
 
-    user_row = res.data[0]
+    user_row = inserted[0]
     user_public = UserPublic(
         id=user_row["id"],
         username=user_row["username"],
@@ -124,23 +123,20 @@ def register_user(payload: UserCreate):
 # 2) LOGIN
 # ---------------------------------------------------------
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest):
+async def login(payload: LoginRequest):
 
     if not payload.username and not payload.email:
         return {"status": "error", "access_token": "", "token_type": "bearer", "user": None}
 
-    query = supabase.table("users").select("*")
     if payload.email:
-        res = query.eq("email", payload.email).execute()
+        user_row = await users_repo.first(email=payload.email)
     else:
-        res = query.eq("username", payload.username).execute()
+        user_row = await users_repo.first(username=payload.username)
 
-    if not res.data:
+    if not user_row:
         return {"status": "error", "access_token": "", "token_type": "bearer", "user": None}
 
-    user_row = res.data[0]
-
-    if not verify_password(payload.password, user_row["password_hash"]):
+    if not await run_blocking(verify_password, payload.password, user_row["password_hash"]):
         return {"status": "error", "access_token": "", "token_type": "bearer", "user": None}
 
     token = create_access_token({
@@ -9,7 +9,9 @@ import seaborn as sns
 import pandas as pd
 import io
 from enum import Enum
-from app.database import supabase
+from matplotlib.collections import PolyCollection
+from app.repositories.tables import otolith_repo
+from app.services.richness_grid_service import richness_grid, cell_vertices
 
 router = APIRouter(prefix="/biodiversity", tags=["Biodiversity Plots"])
 
@@ -24,15 +26,70 @@ class PlotType(str, Enum):
     locality_diversity = "locality_diversity"
 
 
+class GridType(str, Enum):
+    square = "square"
+    hex = "hex"
+
+
 def load_oto_data():
-    res = supabase.table("otolith_data").select("*").execute()
-    if not res.data:
+    rows = otolith_repo.all()
+    if not rows:
         return None
-    return pd.DataFrame(res.data)
+    return pd.DataFrame(rows)
+
+
+@router.get("/richness/grid")
+def richness_grid_data(
+    grid: GridType = GridType.square,
+    cell: float = Query(1.0, gt=0, le=45, description="Cell size in degrees (hex: circumradius)"),
+):
+    """Distinct species per spatial cell as JSON."""
+    cells = richness_grid.records(grid.value, cell)
+    if not cells:
+        return {"error": "No georeferenced Otolith records found"}
+    return {"grid": grid.value, "cell_deg": cell, "cells": cells}
+
+
+def _png():
+    buf = io.BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format="png", dpi=220)
+    plt.close()
+    buf.seek(0)
+    return Response(content=buf.getvalue(), media_type="image/png")
+
+
+def _plot_richness_grid(g, grid: GridType, cell: float):
+    polys = PolyCollection(
+        cell_vertices(grid.value, g["lat"], g["lon"], cell),
+        array=g["richness"], cmap="viridis", edgecolors="face",
+    )
+    ax = plt.gca()
+    ax.add_collection(polys)
+    ax.autoscale_view()
+    ax.set_aspect("equal", adjustable="datalim")
+    plt.colorbar(polys, ax=ax, label="Unique Species")
+    plt.xlabel("Longitude")
+    plt.ylabel("Latitude")
+    plt.title(f"Species Richness per {cell:g}° {grid.value} cell")
 
 
 @router.get("/plots")
-def biodiversity_plots(plot: PlotType):
+def biodiversity_plots(
+    plot: PlotType,
+    grid: GridType = GridType.square,
+    cell: float = Query(1.0, gt=0, le=45, description="richness_heatmap cell size in degrees"),
+):
+    # served from the cached grid; needs neither the otolith table nor locality/family
+    if plot == PlotType.richness_heatmap:
+        g = richness_grid.compute(grid.value, cell)
+        if not len(g["cell_id"]):
+            return {"error": "No georeferenced Otolith records found"}
+        plt.figure(figsize=(10, 6), dpi=200)
+        sns.set_style("whitegrid")
+        _plot_richness_grid(g, grid, cell)
+        return _png()
+
     df = load_oto_data()
     if df is None:
         return {"error": "No Otolith biodiversity data found"}
@@ -46,17 +103,7 @@ def biodiversity_plots(plot: PlotType):
     plt.figure(figsize=(10, 6), dpi=200)
     sns.set_style("whitegrid")
 
-    if plot == PlotType.richness_heatmap:
-        pivot = df.pivot_table(
-            index="lat",
-            columns="lon",
-            values="scientific_name",
-            aggfunc="nunique"
-        )
-        sns.heatmap(pivot, cmap="viridis")
-        plt.title("Species Richness Heatmap (Lat vs Lon)")
-
-    elif plot == PlotType.family_composition:
+    if plot == PlotType.family_composition:
         fam_counts = df["family"].value_counts()
         plt.pie(
             fam_counts.values,
@@ -80,11 +127,4 @@ def biodiversity_plots(plot: PlotType):
         plt.ylabel("Unique Species Count")
         plt.title("Species Richness per Locality")
 
-
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png", dpi=220)
-    plt.close()
-    buf.seek(0)
-
-    return Response(content=buf.getvalue(), media_type="image/png")
+    return _png()
@@ -1,4 +1,4 @@
-# app/routers/biodiversity_routes.py
+# app/routers/biodiversity_two_routes.py
 
 from fastapi import APIRouter, Query
 from fastapi.responses import Response
@@ -7,10 +7,10 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import pandas as pd
 import io
 from enum import Enum
-from app.database import supabase
+from app.services.biodiversity_service import biodiversity_engine
+from app.services.rarefaction_service import rarefaction_curve, diversity_report
 
 router = APIRouter(prefix="/biodiversity", tags=["Biodiversity Diversity Metrics"])
 
@@ -23,48 +23,62 @@ class DiversityPlot(str, Enum):
     simpson_dominance = "simpson_dominance"
     evenness_scatter = "evenness_scatter"
     diversity_rank = "diversity_rank"
+    rarefaction = "rarefaction"
 
 
-def load_oto_data():
-    res = supabase.table("otolith_data").select("*").execute()
-    if not res.data:
-        return None
-    return pd.DataFrame(res.data)
+def _json_safe(v):
+    return None if isinstance(v, float) and not np.isfinite(v) else v
+
+
+@router.get("/indices/data")
+def diversity_indices_data():
+    """Per-locality Shannon / Simpson / evenness as JSON (from the running counts)."""
+    idx = biodiversity_engine.indices()
+    if idx.empty:
+        return {"error": "No Otolith biodiversity data found"}
+
+    records = [
+        {k: _json_safe(v) for k, v in row.items()}
+        for row in idx.reset_index().to_dict(orient="records")
+    ]
+    return {
+        "localities": len(records),
+        "total_abundance": int(idx["abundance"].sum()),
+        "total_richness": int(len(biodiversity_engine.species_abundance())),
+        "indices": records,
+    }
+
+
+@router.get("/rarefaction/data")
+def rarefaction_data(
+    locality: str = Query(None),
+    points: int = Query(40, ge=2, le=500),
+    n_boot: int = Query(1000, ge=50, le=20000),
+    ci: float = Query(0.95, gt=0, lt=1),
+):
+    """Rarefaction curves, Chao1 and bootstrap CIs per locality."""
+    report = diversity_report(locality, points=points, n_boot=n_boot, ci=ci)
+    if not report["localities"]:
+        return {"error": "No Otolith biodiversity data found"}
+    return report
 
 
 @router.get("/indices")
 def diversity_indices(plot: DiversityPlot):
-    df = load_oto_data()
-    if df is None:
+    idx = biodiversity_engine.indices()
+    if idx.empty:
         return {"error": "No Otolith biodiversity data found"}
 
-    df = df[["scientific_name", "locality"]].dropna()
-    if df.empty:
-        return {"error": "Dataset missing required fields"}
-
     sns.set_style("whitegrid")
     plt.figure(figsize=(10, 6), dpi=200)
 
     # =======================
-    # SAFE Diversity Calculation
+    # Diversity metrics from the running (locality, species) counts
     # =======================
-    counts = df.groupby(["locality", "scientific_name"]).size().reset_index(name="n")
-
-    # transform ensures perfect index alignment (fix)
-    loc_totals = counts.groupby("locality")["n"].transform("sum")
-    counts["p"] = counts["n"] / loc_totals
-
-    # Shannon
-    counts["H"] = -(counts["p"] * np.log(counts["p"]))
-    shannon = counts.groupby("locality")["H"].sum()
-
-    # Simpson Dominance
-    counts["p2"] = counts["p"] ** 2
-    simpson = counts.groupby("locality")["p2"].sum()
-
-    # Evenness
-    richness = counts.groupby("locality")["scientific_name"].nunique()
-    evenness = shannon / np.log(richness)
+    shannon = idx["shannon"]
+    simpson = idx["simpson"]
+    richness = idx["richness"]
+    evenness = idx["evenness"]
 
     # ===========================
     # 1️⃣ Shannon Diversity Index
@@ -101,13 +115,27 @@ def diversity_indices(plot: DiversityPlot):
     # 4️⃣ Diversity Rank Curve
     # ===========================
     elif plot == DiversityPlot.diversity_rank:
-        overall = df["scientific_name"].value_counts()
+        overall = biodiversity_engine.species_abundance()
         plt.plot(range(1, len(overall) + 1), overall.values, marker="o", color="#6A4C93")
         plt.yscale("log")
         plt.xlabel("Species Rank")
         plt.ylabel("Abundance (log)")
         plt.title("Global Diversity Rank-Abundance Curve")
 
+    # ===========================
+    # 5️⃣ Rarefaction Curves
+    # ===========================
+    elif plot == DiversityPlot.rarefaction:
+        for loc in richness.sort_values(ascending=False).index:
+            sizes, expected = rarefaction_curve(biodiversity_engine.abundances(loc))
+            plt.plot(sizes, expected, label=loc)
+        plt.axvline(idx["abundance"].min(), color="grey", linestyle="--", linewidth=1)
+        plt.xlabel("Individuals Sampled (n)")
+        plt.ylabel("Expected Species E[S_n]")
+        plt.title("Rarefaction Curves by Locality (dashed = common depth)")
+        if len(idx) <= 15:
+            plt.legend(fontsize=7)
+
     # ===========================
     # Return Plot
     # ===========================
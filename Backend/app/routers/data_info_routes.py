@@ -1,12 +1,12 @@
 from fastapi import APIRouter
-from app.database import supabase
+from app.repositories.async_tables import data_info_repo
 from app.schemas.data_info_schema import DataInfoCreate
 
 router = APIRouter(prefix="/data-info", tags=["Data Info"])
 
 
 @router.post("/add")
-def add_data_info(payload: DataInfoCreate):
+async def add_data_info(payload: DataInfoCreate):
 
     row = {
         "dataset_name": payload.dataset_name,
@@ -17,13 +17,13 @@ def add_data_info(payload: DataInfoCreate):
         "raw_data": payload.raw_data
     }
 
-    res = supabase.table("data_info").insert(row).execute()
+    inserted = await data_info_repo.insert(row)
 
-    if not res.data:
+    if not inserted:
         return {"status": "error", "detail": "Insert failed"}
 
     return {
         "status": "ok",
-        "inserted_id": res.data[0]["id"],
+        "inserted_id": inserted[0]["id"],
         "dataset_name": payload.dataset_name
     }
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from app.database import supabase
+from app.repositories.async_tables import ocean_demo_repo
 from datetime import datetime
 
 router = APIRouter(prefix="/ocean-entry", tags=["Ocean Data Entry"])
@@ -24,7 +24,7 @@ class OceanEntry(BaseModel):
 
 
 @router.post("/add")
-def insert_ocean_data(entry: OceanEntry):
+async def insert_ocean_data(entry: OceanEntry):
     payload = entry.dict()
 
     # 🔥 Fix datetime conversion
@@ -32,8 +32,8 @@ def insert_ocean_data(entry: OceanEntry):
         payload["datetime"] = payload["datetime"].isoformat()
 
     try:
-        res = supabase.table("oceandemo_data").insert(payload).execute()
+        inserted = await ocean_demo_repo.insert(payload)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return {"status": "success", "inserted": res.data}
+    return {"status": "success", "inserted": inserted}
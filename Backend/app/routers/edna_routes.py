@@ -1,7 +1,8 @@
 # THIS FILE HAS E-DNA ENDPOINTS WHICH IS IMPORTED IN MAIN.PY
 
 from fastapi.responses import JSONResponse
-from app.database import supabase
+from app.repositories.async_tables import edna_repo
+from app.utils.concurrency import run_blocking
 from fastapi import APIRouter, requests, Body, File, UploadFile
 from fastapi.responses import JSONResponse
 from app.services.edna_service import (
@@ -30,7 +31,8 @@ async def analyze_raw_edna(
         lines = seq_text.splitlines()
         seq_text = "".join(lines[1:]).strip()
 
-    result = analyze_sequence_and_store(seq_text)
+    # BLAST submit + polling blocks for minutes; run it in the threadpool
+    result = await run_blocking(analyze_sequence_and_store, seq_text)
     return JSONResponse(result)
 
 
@@ -49,30 +51,23 @@ async def upload_fasta(file: UploadFile = File(...)):
     lines = [l.strip() for l in text.splitlines() if l.strip() and not l.startswith(">")]
     sequence = "".join(lines)
     seq_clean = clean_sequence(sequence)
-    result = analyze_sequence_and_store(seq_clean)
+    result = await run_blocking(analyze_sequence_and_store, seq_clean)
     return JSONResponse(result)
 
 
 # ---------------------------------------------------------
-# 3) GET HISTORY STORED IN SUPABASE (latest to oldest)
+# 3) GET STORED HISTORY (latest to oldest)
 # ---------------------------------------------------------
 
 @router.get("/history")
-def edna_history(limit: int = 20, offset: int = 0):
+async def edna_history(limit: int = 20, offset: int = 0):
     """List past EDNA runs with pagination."""
-    res = (
-        supabase.table("edna_data")
-        .select("*")
-        .order("id", desc=True)  # latest first
-        .limit(limit)
-        .offset(offset)
-        .execute()
-    )
-
-    if not res.data:
+    rows = await edna_repo.page(offset, limit, order="id", desc=True)  # latest first
+
+    if not rows:
         return {"count": 0, "results": []}
 
     return {
-        "count": len(res.data),
-        "results": res.data
+        "count": len(rows),
+        "results": rows
     }
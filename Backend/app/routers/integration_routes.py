@@ -1,10 +1,16 @@
 # app/routers/integration_routes.py
-from fastapi import APIRouter, Query, requests, Body
+from fastapi import APIRouter, Query, HTTPException, Body, Depends
+from fastapi.responses import StreamingResponse
+import json
 from app.services.integration_service import (
-    integrate_by_species,
     integrate_by_otolith_id,
     integrate_by_edna,
+    integrate_batch,
 )
+from app.services.ocean_service import ocean_index
+from app.services.species_profile_service import get_profile, integrate_by_species, rebuild_all
+from app.core.dependencies import admin_required
+from app.schemas.integration_schema import OceanNearestBatch, IntegrationBatchRequest
 
 router = APIRouter(prefix="/integrate", tags=["Integration"])
 
@@ -12,20 +18,85 @@ router = APIRouter(prefix="/integrate", tags=["Integration"])
 # 1) Integration by scientific name
 @router.get("/species")
 def integration_by_species(name: str = Query(..., description="Scientific Name")):
-    result = integrate_by_species(name)
-    return result
+    return integrate_by_species(name)
+
+
+# 1b) The materialized species profile (single key lookup)
+@router.get("/species/profile")
+def species_profile(name: str = Query(..., description="Scientific Name")):
+    profile = get_profile(name)
+    if not profile:
+        raise HTTPException(404, "Species not found")
+    return profile
+
+
+@router.post("/species/profile/rebuild", dependencies=[Depends(admin_required())])
+def species_profile_rebuild():
+    """Backfill / full rebuild of every species profile."""
+    return {"status": "ok", "profiles": rebuild_all()}
 
 
 # 2) Integration by otolith original ID (slash-safe through query param)
 @router.get("/otolith")
-def integration_by_otolith(oid: str = Query(..., description="Otolith ID like CMLRE/OTL/00027")):
-    result = integrate_by_otolith_id(oid)
+async def integration_by_otolith(oid: str = Query(..., description="Otolith ID like CMLRE/OTL/00027")):
+    result = await integrate_by_otolith_id(oid)
     if not result:
-        raise requests.get(404, "Otolith ID not found")
+        raise HTTPException(404, "Otolith ID not found")
     return result
 
 
 # 3) EDNA integration (direct raw string)
 @router.post("/edna")
-def integrate_edna_route(sequence: str = Body(..., embed=False)):
-    return integrate_by_edna(sequence)
+async def integrate_edna_route(sequence: str = Body(..., embed=False)):
+    return await integrate_by_edna(sequence)
+
+
+# 4) Bulk integration for many species / otolith IDs, streamed as NDJSON
+@router.post("/batch")
+def integration_batch(payload: IntegrationBatchRequest):
+    lines = (
+        json.dumps(item, default=str) + "\n"
+        for item in integrate_batch(payload.scientific_names, payload.otolith_ids)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+# 5) Nearest ocean environment (k-nearest, optional time window / max distance)
+@router.get("/ocean/nearest")
+def ocean_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, gt=0, le=100),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    max_km: float | None = Query(None, gt=0)
+):
+    rows = ocean_index.nearest(lat, lon, k=k, start=start_date, end=end_date, max_km=max_km)
+    return {"count": len(rows), "results": rows}
+
+
+# 6) Ocean rows within a radius (km), nearest first
+@router.get("/ocean/within")
+def ocean_within(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=5000),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    limit: int = Query(1000, gt=0, le=10000)
+):
+    rows = ocean_index.within(lat, lon, radius_km, start=start_date, end=end_date, limit=limit)
+    return {"count": len(rows), "results": rows}
+
+
+# 7) Batch nearest lookup for many points in one call
+@router.post("/ocean/nearest/batch")
+def ocean_nearest_batch(payload: OceanNearestBatch):
+    results = ocean_index.nearest_batch(
+        [(p.lat, p.lon) for p in payload.points],
+        k=payload.k,
+        start=payload.start_date,
+        end=payload.end_date,
+        max_km=payload.max_km,
+    )
+    return {"count": len(results), "results": results}
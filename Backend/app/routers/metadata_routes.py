@@ -1,30 +1,21 @@
 from fastapi import APIRouter, requests
-from app.database import supabase
+from app.repositories.async_tables import metadata_repo
 
 router = APIRouter(prefix="/metadata", tags=["Metadata"])
 
 
 @router.get("/latest/{dtype}")
-def get_latest_by_type(dtype: str):
+async def get_latest_by_type(dtype: str):
     """Return the latest metadata for ocean | taxonomy | otolith"""
-    res = (
-        supabase.table("dataset_metadata")
-        .select("*")
-        .eq("dataset_type", dtype)
-        .order("created_at", desc=True)
-        .limit(1)
-        .execute()
-    )
+    row = await metadata_repo.latest(dtype)
 
-    if not res.data:
+    if not row:
         raise requests.get(404, f"No metadata found for type '{dtype}'")
 
-    return res.data[0]
+    return row
 
 
 @router.get("/types")
-def list_dataset_types():
+async def list_dataset_types():
     """List all dataset types present in metadata table."""
-    res = supabase.table("dataset_metadata").select("dataset_type").execute()
-    types = sorted({r["dataset_type"] for r in res.data})
-    return {"dataset_types": types}
+    return {"dataset_types": await metadata_repo.types()}
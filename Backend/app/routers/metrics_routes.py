@@ -0,0 +1,13 @@
+# app/routers/metrics_routes.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils import metrics
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request latency, per-stage timings and outbound call counts (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -10,28 +10,24 @@ import pandas as pd
 import numpy as np
 import io
 from enum import Enum
-from app.database import supabase
+from matplotlib.collections import PolyCollection
+from app.services.ocean_grid_service import hex_merge
+from app.services.ocean_pyramid_service import ocean_pyramid
+from app.services.ocean_service import ocean_index
+from app.services.ocean_stats_service import ocean_stats
+from app.services.richness_grid_service import cell_vertices
+from app.utils.columnar import FORMATS, table_response
+from app.utils.pairplot import pairplot_png
+from app.utils.constants import OCEAN_EXTENT, RANGE_LIMITS, Y_PARAMETERS
 
 router = APIRouter(prefix="/ocean-dist", tags=["Ocean Statistical Plots"])
 
-Y_PARAMETERS = [
-    "dic", "mld", "pco2_original", "chl",
-    "no3", "sss", "sst", "deviant_uncertainty"
-]
-
-RANGE_LIMITS = {
-    "dic": (1950, 2100),
-    "mld": (0, 100),
-    "pco2_original": (250, 550),
-    "chl": (5e-8, 4e-7),
-    "no3": (0.00, 0.06),
-    "sss": (30, 40),
-    "sst": (20, 35),
-    "deviant_uncertainty": (0, 5)
-}
-
 LOG_ALLOWED = ["chl", "no3"]
 
+HEX_GRIDSIZE = 35  # hexagons across the map extent
+MAX_DATA_POINTS = 5_000  # rows sent to the client for pair plots
+MAX_FLIERS = 200  # outliers drawn / returned per box
+
 
 class DistPlot(str, Enum):
     violin = "violin"
@@ -42,15 +38,71 @@ class DistPlot(str, Enum):
     hexbin = "hexbin"   # <-- ADDED ONLY
 
 
-def load_ocean_data():
-    res = supabase.table("ocean_data").select("*").execute()
-    if not res.data:
+def load_core():
+    """Rows with every parameter present, trimmed to the catalog's 1-99% range (pair plots)."""
+    df = ocean_index.frame()
+    if df is None or df.empty:
         return None
-    
-    df = pd.DataFrame(res.data)
-    if "datetime" in df.columns:
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-    return df
+    core = df[Y_PARAMETERS].apply(pd.to_numeric, errors="coerce").dropna()
+    core = core[(core > -1e10).all(axis=1)]
+    for p in Y_PARAMETERS:
+        rng = ocean_stats.clip_range(p)
+        if rng is not None:  # no catalog data for p yet: leave the column untrimmed
+            core[p] = core[p].where(core[p].between(*rng))
+    return core
+
+
+def load_hexes(param: str):
+    """Hexagons as wide as the old hexbin(gridsize=35), from the matching pyramid level."""
+    size = (OCEAN_EXTENT["lon_max"] - OCEAN_EXTENT["lon_min"]) / HEX_GRIDSIZE / np.sqrt(3)
+    cells = ocean_pyramid.cells(param, size)
+    if cells is None or not len(cells["count"]):
+        return size, None
+    return size, hex_merge(cells, size)
+
+
+def _box_stats(s: dict) -> dict:
+    """
+    ax.bxp() input from catalog quantiles; whiskers at 1.5 IQR inside the 1-99% range.
+    Fliers are the digest centroids beyond the whiskers (the tails are kept
+    near single values) plus the exact min / max, thinned to MAX_FLIERS.
+    """
+    q = s["quantiles"]
+    iqr = q["0.75"] - q["0.25"]
+    lo = max(q["0.01"], q["0.25"] - 1.5 * iqr)
+    hi = min(q["0.99"], q["0.75"] + 1.5 * iqr)
+    tail = np.append(s["_digest"]["mean"], [s["min"], s["max"]])
+    fliers = np.unique(tail[(tail < lo) | (tail > hi)])
+    if len(fliers) > MAX_FLIERS:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, MAX_FLIERS).astype(int)]
+    return {
+        "med": q["0.5"], "q1": q["0.25"], "q3": q["0.75"], "mean": s["mean"],
+        "whislo": lo, "whishi": hi,
+        "fliers": [float(v) for v in fliers],
+    }
+
+
+# Catalog summary for one parameter, optionally per region box / month window
+@router.get("/stats")
+def ocean_stats_summary(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    lat_min: float = Query(None, ge=-90, le=90),
+    lat_max: float = Query(None, ge=-90, le=90),
+    lon_min: float = Query(None, ge=-180, le=360),
+    lon_max: float = Query(None, ge=-180, le=360),
+    start: str = None,
+    end: str = None,
+    corr: bool = False,
+):
+    cells = ocean_stats.cells_in(lat_min, lat_max, lon_min, lon_max)
+    s = {k: v for k, v in ocean_stats.summary(param, cells, start, end).items() if not k.startswith("_")}
+    if corr:
+        c = ocean_stats.correlation(cells, start, end).round(4)
+        s["correlation"] = {
+            "params": Y_PARAMETERS,
+            "matrix": c.where(c.notna(), None).values.tolist(),
+        }
+    return s
 
 
 @router.get("/plot")
@@ -58,18 +110,10 @@ def ocean_stats_plot(
     plot: DistPlot = Query(...),
     y: list[str] = Query(None)
 ):
-    df = load_ocean_data()
-    if df is None:
-        return {"error": "No data found"}
-
-    core = df[Y_PARAMETERS].apply(pd.to_numeric, errors="coerce").dropna()
-    core = core[(core > -1e10).all(axis=1)]
-    core = core[(core >= core.quantile(0.01)) & (core <= core.quantile(0.99))]
-
     sns.set_style("whitegrid")
 
     # ==========================================================
-    # 1️⃣ VIOLIN & BOX (single param)
+    # 1️⃣ VIOLIN & BOX (single param, from the stats catalog)
     # ==========================================================
     if plot in ["violin", "box"]:
         if not y or len(y) != 1:
@@ -78,13 +122,33 @@ def ocean_stats_plot(
         if param not in Y_PARAMETERS:
             return {"error": f"Invalid param {param}"}
 
+        s = ocean_stats.summary(param)
+        if not s["count"]:
+            return {"error": f"No valid data for {param}"}
+        box = _box_stats(s)
+
         fig, ax = plt.subplots(figsize=(7, 5), dpi=240)
 
         if plot == "violin":
-            sns.violinplot(y=core[param], inner="quartile", ax=ax, color="#0077B6")
+            coords, dens = ocean_stats.density(param)
+            parts = ax.violin(
+                [{"coords": coords, "vals": dens, "mean": s["mean"], "median": box["med"],
+                  "min": coords[0], "max": coords[-1]}],
+                widths=0.8, showextrema=False,
+            )
+            for body in parts["bodies"]:
+                body.set_facecolor("#0077B6")
+                body.set_edgecolor("#333333")
+                body.set_alpha(1.0)
+            for v, style in ((box["q1"], "--"), (box["med"], "-"), (box["q3"], "--")):
+                half = 0.4 * np.interp(v, coords, dens) / dens.max()
+                ax.plot([1 - half, 1 + half], [v, v], color="#333333", linestyle=style, linewidth=1)
+            ax.set_xticks([])
             ax.set_title(f"Violin Distribution of {param.upper()}")
         else:
-            sns.boxplot(y=core[param], ax=ax, color="#6A4C93", fliersize=2)
+            ax.bxp([box], widths=0.6, patch_artist=True, showfliers=True,
+                   boxprops={"facecolor": "#6A4C93"}, medianprops={"color": "#333333"})
+            ax.set_xticks([])
             ax.set_title(f"Box Spread of {param.upper()}")
 
         ymin, ymax = RANGE_LIMITS[param]
@@ -95,7 +159,7 @@ def ocean_stats_plot(
     # ==========================================================
     elif plot == "corr":
         fig, ax = plt.subplots(figsize=(9, 7), dpi=240)
-        corr = core.corr()
+        corr = ocean_stats.correlation()
         sns.heatmap(corr, annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
         ax.set_title("Parameter Correlation Matrix")
 
@@ -103,12 +167,13 @@ def ocean_stats_plot(
     # 3️⃣ SCATTER MATRIX
     # ==========================================================
     elif plot == "scatter_matrix":
-        g = sns.pairplot(core, diag_kind="hist", plot_kws={"alpha": 0.6, "s": 35})
-        buf = io.BytesIO()
-        g.fig.savefig(buf, format="png", dpi=230)
-        plt.close()
-        buf.seek(0)
-        return Response(content=buf.getvalue(), media_type="image/png")
+        core = load_core()
+        if core is None:
+            return {"error": "No data found"}
+        png = pairplot_png(core, Y_PARAMETERS, dpi=230)
+        if png is None:
+            return {"error": "No data found"}
+        return Response(content=png, media_type="image/png")
 
     # ==========================================================
     # 4️⃣ RELATION GRID (multi scatter)
@@ -116,14 +181,17 @@ def ocean_stats_plot(
     elif plot == "relation":
         if not y or len(y) < 2:
             return {"error": "Select at least 2 parameters"}
+        invalid = [p for p in y if p not in Y_PARAMETERS]
+        if invalid:
+            return {"error": f"Invalid params {invalid}"}
 
-        sel = core[y]
-        g = sns.pairplot(sel, kind="scatter", diag_kind="hist", plot_kws={"s": 30})
-        buf = io.BytesIO()
-        g.fig.savefig(buf, format="png", dpi=230)
-        plt.close()
-        buf.seek(0)
-        return Response(content=buf.getvalue(), media_type="image/png")
+        core = load_core()
+        if core is None:
+            return {"error": "No data found"}
+        png = pairplot_png(core, y, dpi=230)
+        if png is None:
+            return {"error": "No data found"}
+        return Response(content=png, media_type="image/png")
 
     # ==========================================================
     # 5️⃣ HEXBIN HEAT DENSITY (ADDED NO LOGIC CHANGE)
@@ -136,14 +204,20 @@ def ocean_stats_plot(
         if param not in Y_PARAMETERS:
             return {"error": f"Invalid param {param}"}
 
+        size, hexes = load_hexes(param)
+        if hexes is None:
+            return {"error": f"No valid data for {param}"}
+
         fig, ax = plt.subplots(figsize=(8, 6), dpi=240)
-        im = ax.hexbin(
-            df["lon"], df["lat"], C=df[param],
-            gridsize=35, cmap="viridis",
-            vmin=RANGE_LIMITS[param][0], vmax=RANGE_LIMITS[param][1]
+        im = PolyCollection(
+            cell_vertices("hex", hexes["lat"], hexes["lon"], size),
+            array=hexes["mean"], cmap="viridis", edgecolors="face",
         )
+        im.set_clim(*RANGE_LIMITS[param])
+        ax.add_collection(im)
+        ax.autoscale_view()
 
-        cbar = plt.colorbar(im)
+        cbar = plt.colorbar(im, ax=ax)
         cbar.set_label(param.upper())
 
         ax.set_title(f"{param.upper()} Spatial Hexbin Density")
@@ -159,3 +233,57 @@ def ocean_stats_plot(
     plt.close()
     buf.seek(0)
     return Response(content=buf.getvalue(), media_type="image/png")
+
+
+# Data behind /plot for client-side rendering
+@router.get("/plot/data")
+def ocean_stats_plot_data(
+    plot: DistPlot = Query(...),
+    y: list[str] = Query(None),
+    fmt: str = Query("json", alias="format", enum=FORMATS),
+):
+    if y and any(p not in Y_PARAMETERS for p in y):
+        return {"error": f"Invalid params {[p for p in y if p not in Y_PARAMETERS]}"}
+
+    if plot in ["violin", "box", "hexbin"]:
+        if not y or len(y) != 1:
+            return {"error": "Select exactly 1 parameter"}
+        param = y[0]
+
+    if plot in ["violin", "box"]:
+        s = ocean_stats.summary(param)
+        if not s["count"]:
+            return {"error": f"No valid data for {param}"}
+        coords, dens = ocean_stats.density(param)
+        meta = {
+            "plot": plot.value, "param": param, "y_range": RANGE_LIMITS[param],
+            "box": _box_stats(s),
+            "stats": {k: v for k, v in s.items() if not k.startswith("_")},
+        }
+        return table_response({"coords": coords, "density": dens}, meta, fmt)
+
+    if plot == "corr":
+        corr = ocean_stats.correlation()
+        return table_response({p: corr[p].to_numpy() for p in Y_PARAMETERS},
+                              {"plot": "corr", "params": Y_PARAMETERS}, fmt)
+
+    if plot == "hexbin":
+        size, hexes = load_hexes(param)
+        if hexes is None:
+            return {"error": f"No valid data for {param}"}
+        meta = {"plot": "hexbin", "param": param, "hex_size": size, "color_range": RANGE_LIMITS[param]}
+        return table_response({"lat": hexes["lat"], "lon": hexes["lon"], "mean": hexes["mean"],
+                               "count": hexes["count"]}, meta, fmt)
+
+    # scatter_matrix / relation: clipped rows, uniformly sampled
+    cols = Y_PARAMETERS if plot == "scatter_matrix" else y
+    if plot == "relation" and (not y or len(y) < 2):
+        return {"error": "Select at least 2 parameters"}
+    core = load_core()
+    if core is None:
+        return {"error": "No data found"}
+    rows = len(core)
+    if rows > MAX_DATA_POINTS:
+        core = core.sample(MAX_DATA_POINTS, random_state=0)
+    meta = {"plot": plot.value, "params": cols, "rows": rows, "points": len(core)}
+    return table_response({p: core[p].to_numpy() for p in cols}, meta, fmt)
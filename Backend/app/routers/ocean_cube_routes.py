@@ -0,0 +1,94 @@
+# app/routers/ocean_cube_routes.py
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+import numpy as np
+from app.services.ocean_cube_service import ocean_cube
+from app.utils.constants import Y_PARAMETERS
+
+router = APIRouter(prefix="/ocean-cube", tags=["Ocean Grid Cube"])
+
+
+def _values(a: np.ndarray):
+    """NaN -> None, rounded, for JSON."""
+    a = np.round(a.astype(np.float64), 6)
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+# 1) Available time steps, variables and grid extent
+@router.get("/catalog")
+def cube_catalog():
+    return ocean_cube.catalog()
+
+
+# 2) Ingest LAS grid exports (DATETIME,TIME,LON,LAT,<VAR>)
+@router.post("/ingest")
+async def cube_ingest(files: list[UploadFile] = File(...)):
+    done = []
+    for f in files:
+        try:
+            done.append({"file": f.filename, **await run_in_threadpool(ocean_cube.ingest_csv, f.file)})
+        except ValueError as e:
+            raise HTTPException(400, f"{f.filename}: {e}")
+    return {"status": "ok", "ingested": done}
+
+
+# 3) 2-D grid slice at one time step
+@router.get("/grid")
+def cube_grid(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    time: str = Query(..., description="Date; the nearest stored step is used"),
+    lat_min: float = Query(None, ge=-90, le=90),
+    lat_max: float = Query(None, ge=-90, le=90),
+    lon_min: float = Query(None, ge=-180, le=360),
+    lon_max: float = Query(None, ge=-180, le=360),
+    stride: int = Query(1, ge=1, le=50, description="Keep every n-th cell"),
+):
+    da = ocean_cube.grid(param, time, lat_min, lat_max, lon_min, lon_max, stride)
+    if da is None:
+        raise HTTPException(404, f"No cube data for {param}")
+    return {
+        "param": param,
+        "time": str(np.datetime_as_string(da["time"].values, unit="D")),
+        "lat": _values(da["lat"].values),
+        "lon": _values(da["lon"].values),
+        "values": _values(da.values),
+    }
+
+
+# 4) Time series at the grid cell nearest to a point
+@router.get("/series")
+def cube_series(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=360),
+    start: str = None,
+    end: str = None,
+):
+    s = ocean_cube.point_series(param, lat, lon, start, end)
+    return {
+        "param": param,
+        "time": [t.strftime("%Y-%m-%d") for t in s.index],
+        "values": _values(s.to_numpy()),
+    }
+
+
+# 5) Area-weighted regional mean per time step
+@router.get("/regional-mean")
+def cube_regional_mean(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    lat_min: float = Query(..., ge=-90, le=90),
+    lat_max: float = Query(..., ge=-90, le=90),
+    lon_min: float = Query(..., ge=-180, le=360),
+    lon_max: float = Query(..., ge=-180, le=360),
+    start: str = None,
+    end: str = None,
+):
+    if lat_min >= lat_max or lon_min >= lon_max:
+        raise HTTPException(400, "Empty box: min must be below max")
+    df = ocean_cube.regional_mean(param, lat_min, lat_max, lon_min, lon_max, start, end)
+    return {
+        "param": param,
+        "time": [t.strftime("%Y-%m-%d") for t in df["time"]],
+        "mean": [None if v is None or v != v else round(v, 6) for v in df["mean"]],
+        "cells": df["cells"].astype(int).tolist(),
+    }
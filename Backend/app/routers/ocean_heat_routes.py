@@ -1,107 +1,102 @@
 # --------------------------
 # app/routers/ocean_heatmap_routes.py
 # --------------------------
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
-import pandas as pd
 import numpy as np
 import io
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-import seaborn as sns
-from app.database import supabase
+from app.core.dependencies import admin_required
+from app.services.ocean_grid_service import ocean_points, grid_edges, grid_stats, grid_merge
+from app.services.ocean_pyramid_service import month_window, ocean_pyramid
+from app.utils.columnar import FORMATS, table_response
+from app.utils.constants import OCEAN_EXTENT, Y_PARAMETERS
 
 router = APIRouter(prefix="/ocean-heatmap", tags=["Heatmap Visualization"])
 
-Y_PARAMETERS = [
-    "dic", "mld", "pco2_original", "chl",
-    "no3", "sss", "sst", "deviant_uncertainty"
-]
-
-# valid scientific ranges for cleaning
-RANGE_LIMITS = {
-    "dic": (1950, 2100),
-    "mld": (0, 100),
-    "pco2_original": (250, 550),
-    "chl": (5e-8, 4e-7),
-    "no3": (0.00, 0.06),
-    "sss": (30, 40),
-    "sst": (20, 35),
-    "deviant_uncertainty": (0, 5)
-}
-
-def load_heatmap_data():
-    res = supabase.table("ocean_data").select("*").execute()
-    if not res.data:
-        return None
-    df = pd.DataFrame(res.data)
-
-    # convert datetime safely
-    if "datetime" in df.columns:
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-    return df
+# rendering budget: 0.05° over the default extent is ~480k cells
+MAX_CELLS = 1_000_000
 
 
-@router.get("/plot")
-def heatmap_plot(
-    param: str = Query(..., enum=Y_PARAMETERS)
-):
-    df = load_heatmap_data()
-    if df is None:
-        return {"error": "No ocean data available"}
-
-    # --------------------------------------
-    # STRICT FLATTEN & NUMERIC CONVERSION
-    # --------------------------------------
-    for col in ["lat", "lon", param]:
-        df[col] = df[col].apply(lambda v: v[0] if isinstance(v, (list, tuple)) else v)
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    df = df.dropna(subset=["lat", "lon", param])
-
-    if df.empty:
-        return {"error": "No valid lat/lon grid for heatmap"}
+def _extent(lat_min, lat_max, lon_min, lon_max):
+    given = {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max}
+    return {k: v for k, v in given.items() if v is not None}
 
-    # --------------------------------------
-    # SCIENTIFIC VALID RANGE FILTER
-    # --------------------------------------
-    low, high = RANGE_LIMITS[param]
-    df = df[(df[param] >= low) & (df[param] <= high)]
 
-    if df.empty:
-        return {"error": f"No valid scientific-range data for {param}"}
+def select_grid(param, stat, cell, lat_min=None, lat_max=None, lon_min=None, lon_max=None,
+                start=None, end=None):
+    """Validated extent -> (lat_edges, lon_edges, grid, z) or an error dict."""
+    extent = _extent(lat_min, lat_max, lon_min, lon_max)
+    full = {**OCEAN_EXTENT, **extent}
+    if full["lat_min"] >= full["lat_max"] or full["lon_min"] >= full["lon_max"]:
+        raise HTTPException(400, "Empty extent: min must be below max")
+    lat_edges, lon_edges = grid_edges(cell, extent)
+    if len(lat_edges) * len(lon_edges) > MAX_CELLS:
+        raise HTTPException(400, "Grid too fine for this extent; increase cell size")
 
     # --------------------------------------
-    # GRID BINNING (STABLE 2D HEATMAP)
+    # GRID AGGREGATION over fixed regional edges: from a pyramid level whose
+    # cells tile the requested grid exactly, otherwise from raw points
     # --------------------------------------
-    lat_bins = np.linspace(df["lat"].min(), df["lat"].max(), 70)
-    lon_bins = np.linspace(df["lon"].min(), df["lon"].max(), 70)
+    in_pyramid = (
+        full["lat_min"] >= OCEAN_EXTENT["lat_min"] and full["lat_max"] <= OCEAN_EXTENT["lat_max"]
+        and full["lon_min"] >= OCEAN_EXTENT["lon_min"] and full["lon_max"] <= OCEAN_EXTENT["lon_max"]
+    )
+    cells = ocean_pyramid.cells(
+        param, cell, start, end, origin=(full["lat_min"], full["lon_min"])
+    ) if in_pyramid else None
+    if cells is not None:
+        if not len(cells["count"]):
+            return {"error": f"No valid scientific-range data for {param}"}
+        grid = grid_merge(cells["lat"], cells["lon"], cells, lat_edges, lon_edges)
+    else:
+        # same whole-month window the pyramid applies
+        lo, hi = month_window(start, end)
+        lat, lon, values = ocean_points(param, start=lo, end=hi)
+        if not len(values):
+            return {"error": f"No valid scientific-range data for {param}"}
+        grid = grid_stats(lat, lon, values, lat_edges, lon_edges)
+
+    z = np.where(grid["count"] > 0, grid[stat], np.nan)
+    if np.isnan(z).all():
+        return {"error": "No data inside the requested extent"}
+    return {"lat_edges": lat_edges, "lon_edges": lon_edges, "grid": grid, "z": z}
 
-    df["lat_bin"] = pd.cut(df["lat"], bins=lat_bins)
-    df["lon_bin"] = pd.cut(df["lon"], bins=lon_bins)
 
-    pivot = df.pivot_table(
-        index="lat_bin",
-        columns="lon_bin",
-        values=param,
-        aggfunc="mean"
-    )
+@router.get("/plot")
+def heatmap_plot(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    stat: str = Query("mean", enum=["mean", "count", "min", "max"]),
+    cell: float = Query(0.5, gt=0, le=10, description="Grid cell size in degrees"),
+    lat_min: float = Query(None, ge=-90, le=90),
+    lat_max: float = Query(None, ge=-90, le=90),
+    lon_min: float = Query(None, ge=-180, le=360),
+    lon_max: float = Query(None, ge=-180, le=360),
+    start: str = Query(None, description="First month, YYYY-MM"),
+    end: str = Query(None, description="Last month, YYYY-MM"),
+):
+    sel = select_grid(param, stat, cell, lat_min, lat_max, lon_min, lon_max, start, end)
+    if "error" in sel:
+        return sel
+    lat_edges, lon_edges, z = sel["lat_edges"], sel["lon_edges"], sel["z"]
 
     # --------------------------------------
     # HEATMAP VISUALIZATION
     # --------------------------------------
+    vmin, vmax = np.nanpercentile(z, [2, 98])  # robust colour limits
+    label = "Samples" if stat == "count" else f"{param.upper()} ({stat})"
+
     plt.figure(figsize=(12, 6))
-    sns.heatmap(
-        pivot,
-        cmap="turbo",
-        cbar_kws={"label": f"{param.upper()}"},
-        robust=True
-    )
+    mesh = plt.pcolormesh(lon_edges, lat_edges, np.ma.masked_invalid(z),
+                          cmap="turbo", vmin=vmin, vmax=vmax, shading="flat")
+    plt.colorbar(mesh, label=label)
 
-    plt.title(f"{param.upper()} Spatial Heatmap", fontsize=14)
-    plt.ylabel("Latitude Bins")
-    plt.xlabel("Longitude Bins")
+    plt.title(f"{param.upper()} Spatial Heatmap ({cell:g}° grid, {stat})", fontsize=14)
+    plt.ylabel("Latitude")
+    plt.xlabel("Longitude")
+    plt.gca().set_aspect("equal")
 
     plt.tight_layout()
 
@@ -110,3 +105,39 @@ def heatmap_plot(
     plt.close()
     buf.seek(0)
     return Response(content=buf.getvalue(), media_type="image/png")
+
+
+# Same grid as /plot, as data: non-empty cells only (row / col index into the edges)
+@router.get("/plot/data")
+def heatmap_data(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    stat: str = Query("mean", enum=["mean", "count", "min", "max"]),
+    cell: float = Query(0.5, gt=0, le=10, description="Grid cell size in degrees"),
+    lat_min: float = Query(None, ge=-90, le=90),
+    lat_max: float = Query(None, ge=-90, le=90),
+    lon_min: float = Query(None, ge=-180, le=360),
+    lon_max: float = Query(None, ge=-180, le=360),
+    start: str = Query(None, description="First month, YYYY-MM"),
+    end: str = Query(None, description="Last month, YYYY-MM"),
+    fmt: str = Query("json", alias="format", enum=FORMATS),
+):
+    sel = select_grid(param, stat, cell, lat_min, lat_max, lon_min, lon_max, start, end)
+    if "error" in sel:
+        return sel
+    z, count = sel["z"], sel["grid"]["count"]
+    row, col = np.nonzero(count > 0)
+    meta = {
+        "param": param, "stat": stat, "cell": cell,
+        "lat_edges": sel["lat_edges"], "lon_edges": sel["lon_edges"],
+        "color_range": np.nanpercentile(z, [2, 98]),
+    }
+    return table_response({
+        "row": row, "col": col, "value": z[row, col], "count": count[row, col],
+    }, meta, fmt)
+
+
+@router.post("/pyramid/rebuild", dependencies=[Depends(admin_required())])
+def rebuild_pyramid():
+    """Recompute every pyramid level from the full ocean table."""
+    rows = ocean_pyramid.build()
+    return {"status": "ok", "rows": rows, "levels": ocean_pyramid.levels}
@@ -3,51 +3,32 @@
 from fastapi import APIRouter, Query
 from fastapi.responses import Response
 import pandas as pd
+import numpy as np
 import io
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
-from app.database import supabase
+from app.services.ocean_service import ocean_index
+from app.utils.columnar import FORMATS, table_response
+from app.utils.downsample import downsample, target_points
+from app.utils.constants import RANGE_LIMITS, X_OPTIONS, Y_PARAMETERS
 
 router = APIRouter(prefix="/ocean-overlay", tags=["LAS Overlay"])
 
-Y_PARAMETERS = [
-    "dic", "mld", "pco2_original", "chl",
-    "no3", "sss", "sst", "deviant_uncertainty"
-]
-
-X_OPTIONS = ["lat", "lon", "datetime"]
-
-RANGE_LIMITS = {
-    "dic": (1950, 2100),
-    "mld": (0, 100),
-    "pco2_original": (250, 550),
-    "chl": (5e-8, 4e-7),
-    "no3": (0.00, 0.06),
-    "sss": (30, 40),
-    "sst": (20, 35),
-    "deviant_uncertainty": (0, 5)
-}
+FIG_WIDTH_IN, FIG_DPI = 12, 250
 
 
 def load_overlay_data():
-    res = supabase.table("ocean_data").select("*").execute()
-    if not res.data:
+    """Whole ocean table from the shared in-memory index, datetimes parsed."""
+    st = ocean_index.state()
+    if st["df"].empty:
         return None
-    df = pd.DataFrame(res.data)
-    if "datetime" in df.columns:
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-    return df
+    return st["df"].assign(datetime=st["times"])
 
 
-@router.get("/multi")
-def las_overlay(
-    x: str = Query(..., enum=X_OPTIONS),
-    y: list[str] = Query(...),
-    start_date: str | None = None,
-    end_date: str | None = None
-):
+def select_overlay(x, y, start_date=None, end_date=None, points=None):
+    """Filtered selection -> per-parameter in-range stats and LTTB series."""
     df = load_overlay_data()
     if df is None:
         return {"error": "No ocean data available"}
@@ -62,24 +43,21 @@ def las_overlay(
         if end_date:
             df = df[df["datetime"] <= pd.to_datetime(end_date)]
 
-    df = df[[x] + y].dropna()
+    df = df[[x] + y].copy()
+    numeric = y if x == "datetime" else [x] + y
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce")
+    df = df.dropna()
     if df.empty:
         return {"error": "No valid data for selected range"}
 
-    # =====================================
-    # LIMIT STATS CALCULATION TO FIRST 1000
-    # (NO change in overlay visualization)
-    # =====================================
     # ===============================
-    # Filter only for stats (not plot)
+    # Stats over the full selection (in-range values only)
     # ===============================
-    stat_df = df.head(1000)  # limit first 1000 rows
-
     cleansed_stats = {}
     for param in y:
         low, high = RANGE_LIMITS.get(param, (None, None))
 
-        valid = stat_df[(stat_df[param] >= low) & (stat_df[param] <= high)]
+        valid = df[(df[param] >= low) & (df[param] <= high)]
 
         cleansed_stats[param] = {
             "min": valid[param].min() if not valid.empty else None,
@@ -87,17 +65,35 @@ def las_overlay(
             "avg": valid[param].mean() if not valid.empty else None
         }
 
+    # each series LTTB-downsampled to ~1 vertex per output pixel
+    n_points = points or target_points(FIG_WIDTH_IN, FIG_DPI)
+    series = {param: downsample(df[x], df[param], n_points, "lttb") for param in y}
+    return {"series": series, "stats": cleansed_stats, "rows": len(df)}
+
+
+@router.get("/multi")
+def las_overlay(
+    x: str = Query(..., enum=X_OPTIONS),
+    y: list[str] = Query(...),
+    start_date: str | None = None,
+    end_date: str | None = None
+):
+    sel = select_overlay(x, y, start_date, end_date)
+    if "error" in sel:
+        return sel
+    series, cleansed_stats = sel["series"], sel["stats"]
+
     # ===============================
-    # LAS STYLE MULTI AXIS OVERLAY (unchanged)
+    # LAS STYLE MULTI AXIS OVERLAY
     # ===============================
-    plt.figure(figsize=(12, 6))
+    plt.figure(figsize=(FIG_WIDTH_IN, 6))
     ax = plt.gca()
 
     colors = sns.color_palette("tab10", len(y))
     ax.set_xlabel(x.upper())
 
     base = y[0]
-    ax.plot(df[x], df[base], color=colors[0], linewidth=2, label=base.upper())
+    ax.plot(*series[base], color=colors[0], linewidth=2, label=base.upper())
     ax.set_ylabel(base.upper(), color=colors[0])
     ax.set_ylim(RANGE_LIMITS[base])
 
@@ -108,7 +104,7 @@ def las_overlay(
         axes.append(twin)
 
         twin.spines["right"].set_position(("axes", 1 + 0.15 * i))
-        twin.plot(df[x], df[param], color=colors[i], linewidth=2, label=param.upper())
+        twin.plot(*series[param], color=colors[i], linewidth=2, label=param.upper())
         twin.set_ylabel(param.upper(), color=colors[i])
         twin.set_ylim(RANGE_LIMITS[param])
 
@@ -133,8 +129,8 @@ def las_overlay(
     )
 
     # ==============================
-    # STATS TEXT BELOW LEGEND (NEW)
-    # using only first 1000 rows, no visual disruption
+    # STATS TEXT BELOW LEGEND
+    # computed over every selected row, not the downsampled series
     # ==============================
     stats_text = "\n".join([
         f"{param.upper()} → Min: {v['min']:.3f} | Max: {v['max']:.3f} | Avg: {v['avg']:.3f}"
@@ -154,7 +150,33 @@ def las_overlay(
     )
 
     buf = io.BytesIO()
-    plt.savefig(buf, format="png", dpi=250, bbox_inches="tight")
+    plt.savefig(buf, format="png", dpi=FIG_DPI, bbox_inches="tight")
     plt.close()
     buf.seek(0)
     return Response(content=buf.getvalue(), media_type="image/png")
+
+
+# Same selection as /multi, as data: one long table, `series` indexes meta["params"]
+@router.get("/multi/data")
+def las_overlay_data(
+    x: str = Query(..., enum=X_OPTIONS),
+    y: list[str] = Query(...),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    points: int = Query(None, ge=3, le=50_000, description="Points per series"),
+    fmt: str = Query("json", alias="format", enum=FORMATS),
+):
+    sel = select_overlay(x, y, start_date, end_date, points)
+    if "error" in sel:
+        return sel
+    xs, ys = zip(*(sel["series"][p] for p in y))
+    meta = {
+        "x": x, "params": y, "rows": sel["rows"],
+        "stats": sel["stats"],
+        "y_ranges": {p: list(RANGE_LIMITS[p]) for p in y},
+    }
+    return table_response({
+        "series": np.repeat(np.arange(len(y)), [len(v) for v in ys]),
+        "x": np.concatenate(xs),
+        "y": np.concatenate(ys),
+    }, meta, fmt)
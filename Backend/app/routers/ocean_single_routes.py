@@ -1,23 +1,20 @@
 # app/routers/ocean_routes.py
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import Response
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import pandas as pd
 import io
-from app.database import supabase
+from app.services.ocean_service import ocean_index
+from app.services.ocean_timeseries_service import FREQS, ocean_timeseries
+from app.utils.columnar import FORMATS, table_response
+from app.utils.downsample import downsample, target_points
+from app.utils.constants import RANGE_LIMITS, X_OPTIONS, Y_PARAMETERS
+from app.utils.metrics import span
 
 router = APIRouter(prefix="/ocean", tags=["Ocean Visualization"])
 
-
-Y_PARAMETERS = [
-    "dic", "mld", "pco2_original", "chl",
-    "no3", "sss", "sst", "deviant_uncertainty"
-]
-
-X_OPTIONS = ["lat", "lon", "datetime"]
-
 UNITS = {
     "dic": "milimole/m3",
     "mld": "m",
@@ -29,141 +26,214 @@ UNITS = {
     "deviant_uncertainty": "micro atm"
 }
 
-RANGE_LIMITS = {
-    "dic": (1950, 2100),
-    "mld": (0, 100),
-    "pco2_original": (250, 550),
-    "chl": (5e-8, 4e-7),
-    "no3": (0.00, 0.06),
-    "sss": (30, 40),
-    "sst": (20, 35),
-    "deviant_uncertainty": (0, 5)
-}
+
+FIG_WIDTH_IN, FIG_DPI = 12, 180
 
 
 def load_ocean_data():
-    res = supabase.table("ocean_data").select("*").execute()
-    if not res.data:
+    """Whole ocean table from the shared in-memory index, datetimes parsed."""
+    st = ocean_index.state()
+    if st["df"].empty:
         return None
-    df = pd.DataFrame(res.data)
-    if "datetime" in df.columns:
-        df["datetime"] = pd.to_datetime(df["datetime"], errors="coerce")
-    return df
+    return st["df"].assign(datetime=st["times"])
 
 
-@router.get("/plot")
-def generate_plot(
-    plot_type: str = Query(..., enum=["line", "scatter"]),
-    x: str = Query(..., enum=X_OPTIONS),
-    y: str = Query(..., enum=Y_PARAMETERS),
-    start_date: str | None = None,
-    end_date: str | None = None
-):
-    df = load_ocean_data()
+def select_series(plot_type, x, y, start_date=None, end_date=None, points=None):
+    """Filtered selection -> stats over every row plus the downsampled (px, py) to draw."""
+    with span("dataframe_build"):
+        df = load_ocean_data()
     if df is None:
         return {"error": "No ocean data available"}
 
+    with span("compute"):
+        return _select(df, plot_type, x, y, start_date, end_date, points)
+
+
+def _select(df, plot_type, x, y, start_date, end_date, points):
     if x == "datetime":
         if start_date:
             df = df[df["datetime"] >= pd.to_datetime(start_date)]
         if end_date:
             df = df[df["datetime"] <= pd.to_datetime(end_date)]
 
-    df = df[[x, y]].dropna()
-
-    # ===============================
-    # LIMIT: use only first 1000 rows
-    # (no filtering, negatives allowed)
-    # ===============================
-    df = df.head(1000)
+    df = df[[x, y]].copy()
+    numeric = [y] if x == "datetime" else [x, y]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce")
+    df = df.dropna()
 
     if df.empty:
         return {"error": "No data available for this selection"}
 
-    ymin, ymax = RANGE_LIMITS.get(y, (df[y].min(), df[y].max()))
-    unit = UNITS.get(y, "")
-
     # ===========================
-    # Stats including negatives
+    # Visual downsampling: ~1 vertex per pixel for lines (LTTB),
+    # min + max per pixel column for scatter
     # ===========================
-    min_val = df[y].min()
-    max_val = df[y].max()
-    mean_val = df[y].mean()
+    if plot_type == "line":
+        px, py = downsample(df[x], df[y], points or target_points(FIG_WIDTH_IN, FIG_DPI), "lttb")
+    else:
+        px, py = downsample(df[x], df[y], points or target_points(FIG_WIDTH_IN, FIG_DPI, per_pixel=2), "minmax")
 
-    plt.figure(figsize=(12, 6), dpi=180)
-    plt.style.use("seaborn-v0_8")
-    ax = plt.gca()
-    ax.set_facecolor("#f7f9fc")
-    plt.grid(color="#d9d9d9", linestyle="--", linewidth=0.7, alpha=0.7)
+    # Stats including negatives (full selection)
+    return {
+        "px": px, "py": py,
+        "rows": len(df),
+        "min": df[y].min(), "max": df[y].max(), "mean": df[y].mean(),
+        "range": RANGE_LIMITS.get(y, (df[y].min(), df[y].max())),
+    }
 
-    if plot_type == "line":
-        plt.plot(
-            df[x], df[y],
-            linewidth=2.2,
-            color="#2962FF",
-            label=f"{y.upper()} ({unit})"
+
+@router.get("/plot")
+def generate_plot(
+    plot_type: str = Query(..., enum=["line", "scatter"]),
+    x: str = Query(..., enum=X_OPTIONS),
+    y: str = Query(..., enum=Y_PARAMETERS),
+    start_date: str | None = None,
+    end_date: str | None = None
+):
+    sel = select_series(plot_type, x, y, start_date, end_date)
+    if "error" in sel:
+        return sel
+
+    px, py = sel["px"], sel["py"]
+    ymin, ymax = sel["range"]
+    unit = UNITS.get(y, "")
+    min_val, max_val, mean_val = sel["min"], sel["max"], sel["mean"]
+
+    with span("render"):
+        plt.figure(figsize=(FIG_WIDTH_IN, 6), dpi=FIG_DPI)
+        plt.style.use("seaborn-v0_8")
+        ax = plt.gca()
+        ax.set_facecolor("#f7f9fc")
+        plt.grid(color="#d9d9d9", linestyle="--", linewidth=0.7, alpha=0.7)
+
+        if plot_type == "line":
+            plt.plot(
+                px, py,
+                linewidth=2.2,
+                color="#2962FF",
+                label=f"{y.upper()} ({unit})"
+            )
+
+        elif plot_type == "scatter":
+            plt.scatter(
+                px, py,
+                s=45,
+                color="#2962FF",
+                edgecolor="#1a1a1a",
+                alpha=0.85,
+                label=f"{y.upper()} ({unit})"
+            )
+
+        plt.title(
+            f"{plot_type.upper()} Plot of {y.upper()} vs {x.upper()}",
+            fontsize=18,
+            fontweight="bold",
+            pad=20,
+            color="#0a0a0a"
         )
 
-    elif plot_type == "scatter":
-        plt.scatter(
-            df[x], df[y],
-            s=45,
-            color="#2962FF",
-            edgecolor="#1a1a1a",
-            alpha=0.85,
-            label=f"{y.upper()} ({unit})"
+        plt.xlabel(x.upper(), fontsize=14, fontweight="bold")
+        plt.ylabel(f"{y.upper()} ({unit})", fontsize=14, fontweight="bold")
+        plt.ylim(ymin, ymax)
+
+        plt.legend(
+            fontsize=12,
+            loc="upper right",
+            frameon=True,
+            facecolor="#ffffff",
+            edgecolor="#cccccc"
         )
 
-    plt.title(
-        f"{plot_type.upper()} Plot of {y.upper()} vs {x.upper()}",
-        fontsize=18,
-        fontweight="bold",
-        pad=20,
-        color="#0a0a0a"
-    )
-
-    plt.xlabel(x.upper(), fontsize=14, fontweight="bold")
-    plt.ylabel(f"{y.upper()} ({unit})", fontsize=14, fontweight="bold")
-    plt.ylim(ymin, ymax)
-
-    plt.legend(
-        fontsize=12,
-        loc="upper right",
-        frameon=True,
-        facecolor="#ffffff",
-        edgecolor="#cccccc"
-    )
+        # ===========================
+        # Stats box (negatives included)
+        # ===========================
+        plt.text(
+            0.01, 0.98,
+            f"Min: {min_val:.4f}\nMax: {max_val:.4f}\nAvg: {mean_val:.4f}",
+            transform=plt.gca().transAxes,
+            ha="left",
+            va="top",
+            fontsize=11,
+            color="#000",
+            bbox=dict(boxstyle="round,pad=0.3", facecolor="#ffffff", edgecolor="#bbbbbb")
+        )
 
-    # ===========================
-    # Stats box (negatives included)
-    # ===========================
-    plt.text(
-        0.01, 0.98,
-        f"Min: {min_val:.4f}\nMax: {max_val:.4f}\nAvg: {mean_val:.4f}",
-        transform=plt.gca().transAxes,
-        ha="left",
-        va="top",
-        fontsize=11,
-        color="#000",
-        bbox=dict(boxstyle="round,pad=0.3", facecolor="#ffffff", edgecolor="#bbbbbb")
-    )
-
-    plt.text(
-        0.99, 0.01,
-        "Generated by CMFRI Ocean Analytics",
-        fontsize=10,
-        color="#777777",
-        ha="right",
-        va="bottom",
-        alpha=0.8,
-        transform=plt.gca().transAxes
-    )
-
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", dpi=180)
-    plt.close()
-    buf.seek(0)
+        plt.text(
+            0.99, 0.01,
+            "Generated by CMFRI Ocean Analytics",
+            fontsize=10,
+            color="#777777",
+            ha="right",
+            va="bottom",
+            alpha=0.8,
+            transform=plt.gca().transAxes
+        )
+
+        plt.tight_layout()
+
+    with span("encode"):
+        buf = io.BytesIO()
+        plt.savefig(buf, format="png", dpi=FIG_DPI)
+        plt.close()
 
     return Response(content=buf.getvalue(), media_type="image/png")
+
+
+# Same selection as /plot, as data for client-side rendering
+@router.get("/plot/data")
+def plot_data(
+    plot_type: str = Query(..., enum=["line", "scatter"]),
+    x: str = Query(..., enum=X_OPTIONS),
+    y: str = Query(..., enum=Y_PARAMETERS),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    points: int = Query(None, ge=3, le=50_000, description="Point budget; defaults to the PNG's pixel width"),
+    fmt: str = Query("json", alias="format", enum=FORMATS),
+):
+    sel = select_series(plot_type, x, y, start_date, end_date, points)
+    if "error" in sel:
+        return sel
+    meta = {
+        "plot_type": plot_type, "x": x, "y": y, "unit": UNITS.get(y, ""),
+        "rows": sel["rows"], "points": len(sel["py"]),
+        "stats": {"min": sel["min"], "max": sel["max"], "mean": sel["mean"]},
+        "y_range": list(sel["range"]),
+    }
+    return table_response({"x": sel["px"], "y": sel["py"]}, meta, fmt)
+
+
+# Resampled series + monthly climatology / anomalies, per region or station
+@router.get("/timeseries")
+def ocean_timeseries_data(
+    param: str = Query(..., enum=Y_PARAMETERS),
+    freq: str = Query("month", enum=FREQS),
+    lat_min: float = Query(None, ge=-90, le=90),
+    lat_max: float = Query(None, ge=-90, le=90),
+    lon_min: float = Query(None, ge=-180, le=360),
+    lon_max: float = Query(None, ge=-180, le=360),
+    station_id: str | None = None,
+    radius_km: float = Query(None, gt=0, le=2000, description="With station_id: all rows within this distance"),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    fmt: str = Query("json", alias="format", enum=FORMATS),
+):
+    if radius_km is not None and station_id is None:
+        raise HTTPException(400, "radius_km needs a station_id")
+    ts = ocean_timeseries.series(param, freq, lat_min, lat_max, lon_min, lon_max,
+                                 station_id, radius_km, start_date, end_date)
+    if ts is None:
+        return {"error": "No data available for this selection"}
+
+    clim = ts["climatology"]
+    meta = {
+        "param": param, "freq": freq, "unit": UNITS.get(param, ""), "rows": ts["rows"],
+        "climatology": {
+            "month": clim["month"].tolist(),
+            "mean": clim["mean"].tolist(),
+            "std": clim["std"].tolist(),
+            "years": clim["years"].tolist(),
+        },
+    }
+    b = ts["bins"]
+    return table_response({k: b[k] for k in
+                           ("time", "count", "mean", "std", "min", "max", "climatology", "anomaly")}, meta, fmt)
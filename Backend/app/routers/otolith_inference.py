@@ -1,28 +1,90 @@
-from fastapi import APIRouter, File, UploadFile, requests
-from app.models.inference_retrieval import inference_retrieval
-import shutil, uuid, os
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+import io
+from app.core.dependencies import admin_required
+from app.models.inference_with_meta import classify_images
+from app.services.otolith_service import predict_from_bytes, cache_stats
+from app.services.otolith_index_service import indexer, sync_from_storage
 
 router = APIRouter()
-BASE_DIR = os.path.dirname(__file__)  # directory where inference file lives
-UPLOAD_DIR = os.path.join(BASE_DIR, "temp_otolith_inputs")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @router.post("/otolith/predict")
-async def predict_otolith(file: UploadFile = File(...)):
+async def predict_otolith(
+    file: UploadFile = File(...),
+    topk: int = Query(5, gt=0, le=100),
+    family: str | None = None,
+    locality: str | None = None,
+    water_body: str | None = None,
+    min_depth: float | None = Query(None, description="Collection depth lower bound (m)"),
+    max_depth: float | None = Query(None, description="Collection depth upper bound (m)")
+):
 
     if not file.filename.lower().endswith((".png", ".jpg", ".jpeg")):
-        raise requests(status_code=400, detail="File must be an image")
+        raise HTTPException(status_code=400, detail="File must be an image")
 
-    saved_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}.jpg")
-    with open(saved_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    content = await file.read()
+    filters = {
+        "family": family,
+        "locality": locality,
+        "water_body": water_body,
+        "min_depth": min_depth,
+        "max_depth": max_depth,
+    }
 
     try:
-        result = inference_retrieval(saved_path)
+        result = await run_in_threadpool(predict_from_bytes, content, file.filename, topk, filters)
     except Exception as e:
-        raise requests(status_code=500, detail=str(e))
-
-    os.remove(saved_path)
+        raise HTTPException(status_code=500, detail=str(e))
 
     return {"prediction": result}
+
+
+@router.post("/otolith/classify")
+async def classify_otoliths(
+    files: list[UploadFile] = File(...),
+    topk: int = Query(3, gt=0, le=20)
+):
+    """Species classification (fine-tuned checkpoint) for one or more otolith images in one batch."""
+    images, names = [], []
+    for f in files:
+        if not f.filename.lower().endswith((".png", ".jpg", ".jpeg")):
+            raise HTTPException(status_code=400, detail=f"{f.filename} is not an image")
+        try:
+            img = Image.open(io.BytesIO(await f.read()))
+            img.load()
+        except (UnidentifiedImageError, OSError):
+            raise HTTPException(status_code=400, detail=f"{f.filename} is not a readable image")
+        images.append(img)
+        names.append(f.filename)
+
+    try:
+        preds = await run_in_threadpool(classify_images, images, topk=topk)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "count": len(names),
+        "results": [{"input_image": n, "predictions": p} for n, p in zip(names, preds)]
+    }
+
+
+@router.get("/otolith/predict/cache")
+def predict_cache_stats():
+    """Hit-rate / size metrics of the embedding + prediction caches."""
+    return cache_stats()
+
+
+@router.get("/otolith/index/status")
+def index_status():
+    """Progress of the background indexer that appends uploaded otoliths to the retrieval index."""
+    return indexer.status()
+
+
+@router.post("/otolith/index/sync", dependencies=[Depends(admin_required())])
+def index_sync(limit: int = Query(10000, gt=0, le=100000)):
+    """Queue stored otolith images that are not searchable yet (e.g. after a restart). Admin only."""
+    return {"status": "ok", "queued": sync_from_storage(limit)}
@@ -1,7 +1,7 @@
 # THIS FILE HAS OTOLITH ENDPOINTS WHICH IS IMPORTED IN MAIN.PY
 
 from fastapi import APIRouter, requests, Query
-from app.database import supabase
+from app.repositories.async_tables import otolith_repo
 
 router = APIRouter(prefix="/otolith", tags=["Otolith"])
 
@@ -11,9 +11,9 @@ router = APIRouter(prefix="/otolith", tags=["Otolith"])
 # ---------------------------------------------------------
 
 @router.get("/list")
-def list_otoliths(limit: int = Query(1000, gt=0, le=10000), offset: int = 0):
-    res = supabase.table("otolith_data").select("*").range(offset, offset + limit - 1).execute()
-    return {"count": len(res.data or []), "data": res.data}
+async def list_otoliths(limit: int = Query(1000, gt=0, le=10000), offset: int = 0):
+    rows = await otolith_repo.page(offset, limit)
+    return {"count": len(rows), "data": rows}
 
 
 # ---------------------------------------------------------
@@ -21,9 +21,9 @@ def list_otoliths(limit: int = Query(1000, gt=0, le=10000), offset: int = 0):
 # ---------------------------------------------------------
 
 @router.get("/unlabeled")
-def unlabeled(limit: int = Query(1000, gt=0, le=10000)):
-    res = supabase.table("otolith_data").select("*").is_("label", None).limit(limit).execute()
-    return {"count": len(res.data or []), "data": res.data}
+async def unlabeled(limit: int = Query(1000, gt=0, le=10000)):
+    rows = await otolith_repo.unlabeled(limit)
+    return {"count": len(rows), "data": rows}
 
 
 # ---------------------------------------------------------
@@ -31,11 +31,10 @@ def unlabeled(limit: int = Query(1000, gt=0, le=10000)):
 # ---------------------------------------------------------
 
 @router.post("/label")
-def add_label(id: str = Query(...), label: str = Query(...)):
-    check = supabase.table("otolith_data").select("id").eq("id", id).execute()
-    if not check.data:
+async def add_label(id: str = Query(...), label: str = Query(...)):
+    if not await otolith_repo.first("id", id=id):
         raise requests.get(status_code=404, detail="Otolith record not found")
-    supabase.table("otolith_data").update({"label": label}).eq("id", id).execute()
+    await otolith_repo.update({"label": label}, id=id)
     return {"status": "ok", "id": id, "label": label}
 
 
@@ -44,20 +43,15 @@ def add_label(id: str = Query(...), label: str = Query(...)):
 # ---------------------------------------------------------
 
 @router.get("/by-otolithid")
-def get_by_otolith_id(oid: str = Query(..., description="Original otolithID like CMLRE/OTL/00001")):
+async def get_by_otolith_id(oid: str = Query(..., description="Original otolithID like CMLRE/OTL/00001")):
     """
     Fetch otolith record using the original dataset otolithID.
     Example:
     /otolith/by-otolithid?oid=CMLRE/OTL/00001
     """
-    res = (
-        supabase.table("otolith_data")
-        .select("*")
-        .eq("otolith_id", oid)
-        .execute()
-    )
-
-    if not res.data:
+    row = await otolith_repo.first(otolith_id=oid)
+
+    if not row:
         raise requests.get(status_code=404, detail="Otolith ID not found")
 
-    return res.data[0]
+    return row
@@ -0,0 +1,65 @@
+# app/routers/profiler_routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.core.dependencies import admin_required
+from app.utils.profiler import MAX_REQUESTS, MAX_SECONDS, profiler
+
+router = APIRouter(prefix="/admin/profiler", tags=["Admin Profiler"], dependencies=[Depends(admin_required())])
+
+
+@router.post("/sample")
+def start_sampling(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    include_idle: bool = False
+):
+    """Sample every thread's stack for `seconds`."""
+    try:
+        return profiler.sample(seconds, include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/capture")
+def start_capture(
+    request: Request,
+    route: str = Query(..., description="Route template, e.g. /ocean-dist/plot"),
+    requests: int = Query(5, gt=0, le=MAX_REQUESTS),
+    method: str = Query("GET")
+):
+    """Profile the next `requests` calls of one route (stack samples + cProfile)."""
+    try:
+        return profiler.capture(request.app, route, requests, method.upper())
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/status")
+def profiler_status():
+    return profiler.status() or {"status": "idle"}
+
+
+@router.post("/stop")
+def stop_profiling():
+    return profiler.stop() or {"status": "idle"}
+
+
+@router.get("/result/{session_id}")
+def profiling_result(
+    session_id: str,
+    kind: str = Query("collapsed", enum=["collapsed", "pstats", "top"])
+):
+    """collapsed: flamegraph input; pstats: cProfile dump (pstats.Stats / snakeviz); top: text summary."""
+    if kind == "top":
+        text = profiler.top(session_id)
+        if text is None:
+            raise HTTPException(status_code=404, detail="No cProfile stats for this session")
+        return PlainTextResponse(text)
+
+    path = profiler.result_path(session_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Result not found (session still running?)")
+    media = "text/plain" if kind == "collapsed" else "application/octet-stream"
+    return FileResponse(path, media_type=media, filename=f"profile-{session_id}.{kind}")
@@ -1,28 +1,25 @@
 # app/routers/taxonomy_routes.py
-from fastapi import APIRouter, Query, requests
-from app.database import supabase
+from fastapi import APIRouter, HTTPException, Query
+from app.repositories.async_tables import taxonomy_repo
+from app.utils.concurrency import run_blocking
 import plotly.express as px
+import pandas as pd
 from fastapi.responses import HTMLResponse
 
 router = APIRouter(prefix="/taxonomy", tags=["Taxonomy"])
 
 
 # ---------------------------------------------------------
-# 1) LIST TAXONOMY (uses Supabase directly)
+# 1) LIST TAXONOMY
 # ---------------------------------------------------------
 
 @router.get("/list")
-def list_species(limit: int = Query(1000, gt=1, le=10000), offset: int = 0):
-    res = (
-        supabase.table("taxonomy_data")
-        .select("*")
-        .range(offset, offset + limit - 1)
-        .execute()
-    )
+async def list_species(limit: int = Query(1000, gt=1, le=10000), offset: int = 0):
+    rows = await taxonomy_repo.page(offset, limit)
 
     return {
-        "count": len(res.data or []),
-        "data": res.data or []
+        "count": len(rows),
+        "data": rows
     }
 
 
@@ -30,44 +27,39 @@ def list_species(limit: int = Query(1000, gt=1, le=10000), offset: int = 0):
 # 2) GET SPECIES DETAILS (case-insensitive)
 # ---------------------------------------------------------
 @router.get("/species/{name}")
-def species_info(name: str):
+async def species_info(name: str):
 
     # Query in lowercase for case-insensitive matching
-    res = (
-        supabase.table("taxonomy_data")
-        .select("*")
-        .execute()
-    )
+    rows = await taxonomy_repo.all()
 
-    if not res.data:
-        raise requests.get(status_code=404, detail="No taxonomy data uploaded")
+    if not rows:
+        raise HTTPException(status_code=404, detail="No taxonomy data uploaded")
 
     # Manual filtering (Supabase does not support ILIKE on JSON columns)
     name_lower = name.lower()
 
-    for row in res.data:
+    for row in rows:
         sci = row.get("scientific_name")
         if sci and sci.lower() == name_lower:
             return row
 
-    raise requests.get(status_code=404, detail="Species not found")
+    raise HTTPException(status_code=404, detail="Species not found")
 
 
 # ---------------------------------------------------------
 # 3) FILTER TAXONOMY BY FAMILY, GENUS, ORDER
 # ---------------------------------------------------------
 @router.get("/filter")
-def filter_taxonomy(
+async def filter_taxonomy(
     family: str | None = None,
     genus: str | None = None,
     order: str | None = None
 ):
     # Load all rows (efficient for filtering)
-    res = supabase.table("taxonomy_data").select("*").execute()
-    if not res.data:
+    rows = await taxonomy_repo.all()
+    if not rows:
         return []
 
-    rows = res.data
     filtered = []
 
     # Normalize request filters
@@ -92,36 +84,10 @@ def filter_taxonomy(
     return filtered
 
 
-@router.get("/map", response_class=HTMLResponse)
-def taxonomy_species_map(family: str = Query(..., description="Exact family name")):
-    
-    # ------------------------------------
-    # 1. Fetch points by FAMILY
-    # ------------------------------------
-    res = (
-        supabase.table("taxonomy_data")
-        .select(
-            "lat, lon, family, genus, kingdom, phylum, scientific_name, species", "locality"
-        )
-        .eq("family", family)
-        .execute()
-    )
-
-    if not res.data:
-        return HTMLResponse(f"<h3>No records found for family: {family}</h3>", status_code=404)
-
-    # ------------------------------------
-    # 2. Filter valid lat/lon entries
-    # ------------------------------------
-    data = [row for row in res.data if row.get("lat") and row.get("lon")]
-
-    if not data:
-        return HTMLResponse(f"<h3>No valid lat/lon entries for family: {family}</h3>", status_code=404)
-
+def _family_map_html(data, family: str) -> str:
     # ------------------------------------
     # 3. Bubble Map
     # ------------------------------------
-    import pandas as pd
     df = pd.DataFrame(data)
 
     fig = px.scatter_geo(
@@ -157,4 +123,30 @@ def taxonomy_species_map(family: str = Query(..., description="Exact family name
         margin={"r":10, "t":40, "l":10, "b":10}
     )
 
-    return HTMLResponse(fig.to_html(full_html=True))
\ No newline at end of file
+    return fig.to_html(full_html=True)
+
+
+@router.get("/map", response_class=HTMLResponse)
+async def taxonomy_species_map(family: str = Query(..., description="Exact family name")):
+    
+    # ------------------------------------
+    # 1. Fetch points by FAMILY
+    # ------------------------------------
+    rows = await taxonomy_repo.find(
+        "lat, lon, family, genus, kingdom, phylum, scientific_name, species, locality",
+        family=family,
+    )
+
+    if not rows:
+        return HTMLResponse(f"<h3>No records found for family: {family}</h3>", status_code=404)
+
+    # ------------------------------------
+    # 2. Filter valid lat/lon entries
+    # ------------------------------------
+    data = [row for row in rows if row.get("lat") and row.get("lon")]
+
+    if not data:
+        return HTMLResponse(f"<h3>No valid lat/lon entries for family: {family}</h3>", status_code=404)
+
+    # plotly figure building is CPU work, keep it off the event loop
+    return HTMLResponse(await run_blocking(_family_map_html, data, family))
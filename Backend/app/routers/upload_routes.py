@@ -1,9 +1,17 @@
 # UPLOAD ROUTE FOR OCEAN , TAXONOMY & OTOLITH
-from fastapi import APIRouter, UploadFile, File,Query
+from fastapi import APIRouter, UploadFile, File,Query, BackgroundTasks
 from app.services.metadata_service import extract_metadata, save_metadata
 from app.utils.column_standardizer import standardize_df
 from app.utils.taxonomy_cleaner import clean_taxonomy_df
-from app.database import supabase
+from app.services.otolith_index_service import indexer as otolith_indexer
+from app.services.ocean_service import ocean_index
+from app.services.ocean_pyramid_service import ocean_pyramid
+from app.services.ocean_stats_service import ocean_stats
+from app.services import species_profile_service
+from app.services.biodiversity_service import biodiversity_engine
+from app.repositories.async_tables import repo_for
+from app.utils.concurrency import run_blocking
+from app.utils import http
 import pandas as pd
 import io
 import os
@@ -14,16 +22,17 @@ from datetime import datetime
 router = APIRouter(prefix="/upload", tags=["Dataset Upload"])
 
 # helper: chunk insert
-def chunked_insert(table_name, rows, chunk_size=2000):
+async def chunked_insert(table_name, rows, chunk_size=2000):
     for i in range(0, len(rows), chunk_size):
         chunk = rows[i:i+chunk_size]
-        supabase.table(table_name).insert(chunk).execute()
+        await repo_for(table_name).insert(chunk)
 
 # helper: upload file bytes to Supabase storage (otolith images)
 def upload_image_to_supabase(bucket_name, path, content_bytes):
     # supabase-python storage upload API differs by versions. Common usage:
     # supabase.storage.from_(bucket_name).upload(path, content_bytes)
     # Use the client you have in app.database — adapt if method differs.
+    from app.database import supabase   # object storage stays on Supabase whatever DATA_BACKEND is
     try:
         res = supabase.storage.from_(bucket_name).upload(path, content_bytes)
         return res
@@ -36,7 +45,11 @@ def upload_image_to_supabase(bucket_name, path, content_bytes):
             raise
 
 @router.post("/")
-async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | otolith"), file: UploadFile = File(...)):
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    dtype: str = Query(..., description="ocean | taxonomy | otolith"),
+    file: UploadFile = File(...)
+):
     if dtype not in ["ocean", "taxonomy", "otolith"]:
         raise requests.get(status_code=400, detail="dtype must be ocean, taxonomy, or otolith")
 
@@ -45,7 +58,8 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
 
     file_bytes = await file.read()
     try:
-        df = pd.read_csv(io.BytesIO(file_bytes)) if file.filename.endswith(".csv") else pd.read_excel(io.BytesIO(file_bytes))
+        reader = pd.read_csv if file.filename.endswith(".csv") else pd.read_excel
+        df = await run_blocking(reader, io.BytesIO(file_bytes))
     except Exception as e:
         return {"status": "error", "detail": f"Could not parse file: {e}"}
 
@@ -60,7 +74,7 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
 
     # ---- SAVE METADATA ----
     meta = extract_metadata(df, dtype)
-    save_metadata(meta)
+    await run_blocking(save_metadata, meta)
     # ------------------------
 
 
@@ -143,7 +157,12 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
 
         # ------------ INSERT INTO SUPABASE -----------------
         if rows:
-            chunked_insert("ocean_data", rows)
+            await chunked_insert("ocean_data", rows)
+            await run_blocking(ocean_index.add_rows, rows)
+            background_tasks.add_task(ocean_pyramid.add_rows, rows)
+            background_tasks.add_task(ocean_stats.add_rows, rows)
+            # species whose occurrences sit near the new points get fresh env means
+            background_tasks.add_task(species_profile_service.refresh_near, rows)
 
         return {"status": "ok", "saved_rows": len(rows)}
 
@@ -162,7 +181,11 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
         rows = cleaned_df.where(pd.notnull(cleaned_df), None).to_dict(orient="records")
 
         if rows:
-            chunked_insert("taxonomy_data", rows)
+            await chunked_insert("taxonomy_data", rows)
+            background_tasks.add_task(
+                species_profile_service.refresh_species,
+                {r.get("scientific_name") for r in rows}
+            )
 
         return {"status": "ok", "saved_rows": len(rows)}
 
@@ -170,6 +193,7 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
     else :  
         bucket = os.getenv("SUPABASE_BUCKET_OTOLITH", "Otolith")
         rows = []
+        index_rows = []
 
         for _, r in df.iterrows():
 
@@ -253,7 +277,7 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
 
             if img_url:
                 try:
-                    resp = requests.get(img_url, timeout=12)
+                    resp = await http.request("GET", img_url, timeout=12)
                     if resp.status_code == 200:
 
                         # extension
@@ -269,7 +293,9 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
                         storage_key = f"{safe_oid}{ext}"
 
                         # Upload
-                        supabase.storage.from_(bucket).upload(
+                        from app.database import supabase
+                        await run_blocking(
+                            supabase.storage.from_(bucket).upload,
                             storage_key,
                             resp.content,
                         )
@@ -284,12 +310,22 @@ async def upload_file(dtype: str = Query(..., description="ocean | taxonomy | ot
                     row["storage_path"] = None
 
             rows.append(row)
+            if row["storage_path"]:
+                index_rows.append({**row, "detail_url": val("detail_url")})
 
         # -------------------------
         # BULK INSERT INTO SUPABASE
         # -------------------------
         if rows:
-            chunked_insert("otolith_data", rows)
+            await chunked_insert("otolith_data", rows)
+            await run_blocking(biodiversity_engine.add_rows, rows)
+            background_tasks.add_task(
+                species_profile_service.refresh_species,
+                {r.get("scientific_name") for r in rows}
+            )
 
-        return {"status": "ok", "saved_rows": len(rows)}
+        # stored images become searchable by /otolith/predict in the background
+        queued = otolith_indexer.enqueue(index_rows)
+
+        return {"status": "ok", "saved_rows": len(rows), "queued_for_index": queued}
 
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class GeoPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class OceanNearestBatch(BaseModel):
+    points: List[GeoPoint]
+    k: int = Field(1, gt=0, le=100)
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    max_km: Optional[float] = Field(None, gt=0)
+
+
+class IntegrationBatchRequest(BaseModel):
+    scientific_names: List[str] = []
+    otolith_ids: List[str] = []
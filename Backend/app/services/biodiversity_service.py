@@ -0,0 +1,150 @@
+# app/services/biodiversity_service.py
+import os
+import math
+import time
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.utils.helpers import fetch_all
+
+# uploads reach only the worker that served them; others reload after this long
+REFRESH_S = float(os.getenv("BIODIVERSITY_REFRESH_S", "600"))
+
+
+def _nlogn(n: int) -> float:
+    return n * math.log(n) if n > 0 else 0.0
+
+
+class BiodiversityEngine:
+    """
+    Running per-(locality, species) abundance counts. Each locality keeps
+    N, S, sum(n ln n) and sum(n^2), so Shannon H' = ln N - sum(n ln n)/N,
+    Simpson D = sum(n^2)/N^2 and evenness J = H'/ln S are O(#localities).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(dict)  # locality -> species -> n
+        self.species_totals: Dict[str, int] = defaultdict(int)
+        self.loc_n: Dict[str, int] = defaultdict(int)
+        self.loc_nlogn: Dict[str, float] = defaultdict(float)
+        self.loc_n2: Dict[str, int] = defaultdict(int)
+        # georeferenced occurrences for spatial gridding (species as dense codes)
+        self.species_codes: Dict[str, int] = {}
+        self.occ_lat: List[float] = []
+        self.occ_lon: List[float] = []
+        self.occ_species: List[int] = []
+
+    # ---------- state ----------
+
+    def _add_point(self, lat, lon, species):
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return
+        if lat != lat or lon != lon:
+            return
+        code = self.species_codes.setdefault(species, len(self.species_codes))
+        self.occ_lat.append(lat)
+        self.occ_lon.append(lon)
+        self.occ_species.append(code)
+
+    def _add(self, locality, species, lat=None, lon=None):
+        if species and lat is not None and lon is not None:
+            self._add_point(lat, lon, species)
+        if not locality or not species:
+            return
+        per_loc = self.counts[locality]
+        n = per_loc.get(species, 0)
+        per_loc[species] = n + 1
+        self.species_totals[species] += 1
+        self.loc_n[locality] += 1
+        self.loc_nlogn[locality] += _nlogn(n + 1) - _nlogn(n)
+        self.loc_n2[locality] += 2 * n + 1
+
+    def load(self, rows: List[Dict[str, Any]] = None):
+        rows = rows if rows is not None else fetch_all("otolith_data", "scientific_name,locality,lat,lon")
+        with self._lock:
+            self._reset()
+            for r in rows:
+                self._add(r.get("locality"), r.get("scientific_name"), r.get("lat"), r.get("lon"))
+            self._loaded_at = time.monotonic()
+            self.version += 1
+
+    def ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_S:
+            self.load()
+
+    def add_rows(self, rows: List[Dict[str, Any]]):
+        """Fold freshly uploaded otolith rows into the counts (no-op before the first load)."""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for r in rows:
+                self._add(r.get("locality"), r.get("scientific_name"), r.get("lat"), r.get("lon"))
+            self.version += 1
+
+    # ---------- derived metrics ----------
+
+    def indices(self) -> pd.DataFrame:
+        """One row per locality: abundance, richness, shannon, simpson, evenness."""
+        self.ensure_loaded()
+        with self._lock:
+            locs = list(self.counts.keys())
+            n = np.array([self.loc_n[l] for l in locs], dtype=np.float64)
+            s = np.array([len(self.counts[l]) for l in locs], dtype=np.float64)
+            nlogn = np.array([self.loc_nlogn[l] for l in locs], dtype=np.float64)
+            n2 = np.array([self.loc_n2[l] for l in locs], dtype=np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shannon = np.log(n) - nlogn / n
+            shannon = np.where(np.abs(shannon) < 1e-12, 0.0, shannon)
+            simpson = n2 / n ** 2
+            evenness = shannon / np.log(s)
+
+        return pd.DataFrame({
+            "abundance": n.astype(int),
+            "richness": s.astype(int),
+            "shannon": shannon,
+            "simpson": simpson,
+            "evenness": evenness,
+        }, index=pd.Index(locs, name="locality"))
+
+    def abundances(self, locality: str) -> np.ndarray:
+        self.ensure_loaded()
+        with self._lock:
+            return np.array(list(self.counts.get(locality, {}).values()), dtype=np.int64)
+
+    def data_version(self) -> int:
+        self.ensure_loaded()
+        return self.version
+
+    def occurrences(self):
+        """(lat, lon, species code) arrays of georeferenced records, plus the data version."""
+        self.ensure_loaded()
+        with self._lock:
+            return (
+                np.array(self.occ_lat, dtype=np.float64),
+                np.array(self.occ_lon, dtype=np.float64),
+                np.array(self.occ_species, dtype=np.int64),
+                self.version,
+            )
+
+    def species_abundance(self) -> pd.Series:
+        """Overall counts per species, most abundant first."""
+        self.ensure_loaded()
+        with self._lock:
+            totals = dict(self.species_totals)
+        return pd.Series(totals, dtype=np.int64).sort_values(ascending=False)
+
+
+biodiversity_engine = BiodiversityEngine()
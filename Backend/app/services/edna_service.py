@@ -8,7 +8,8 @@ from typing import Dict, Any, Optional
 from Bio import Entrez
 from Bio.Blast import NCBIXML
 from dotenv import load_dotenv
-from app.database import supabase
+from app.repositories.tables import edna_repo
+from app.utils.metrics import outbound
 
 # -----------------------------
 # LOGGINGS
@@ -40,17 +41,17 @@ def clean_sequence(seq: str) -> str:
 
 
 def save_record(record: Dict[str, Any], update_id: Optional[str] = None) -> Dict[str, Any]:
-    """Insert or update Supabase row."""
+    """Insert or update an edna_data row."""
     cleaned = {k: (None if (isinstance(v, float) and v != v) else v) for k, v in record.items()}
 
     if update_id:
-        res = supabase.table("edna_data").update(cleaned).eq("id", update_id).execute()
+        rows = edna_repo.update(cleaned, id=update_id)
         logger.info("Updated edna_data id=%s", update_id)
-        return res.data
+        return rows
 
-    res = supabase.table("edna_data").insert(cleaned).execute()
+    rows = edna_repo.insert(cleaned)
     logger.info("Inserted new edna_data record")
-    return res.data
+    return rows
 
 
 # ---------------------------------------------------------
@@ -70,8 +71,9 @@ def submit_blast(sequence: str) -> Optional[str]:
     headers = {"User-Agent": "SIH-EDNA-TOOL/1.0"}
 
     try:
-        resp = requests.post(BLAST_URL, data=data, headers=headers, timeout=30)
-        resp.raise_for_status()
+        with outbound("ncbi"):
+            resp = requests.post(BLAST_URL, data=data, headers=headers, timeout=30)
+            resp.raise_for_status()  # inside, so 4xx/5xx count as errors
         text = resp.text
 
         m = re.search(r"RID = ([A-Z0-9\-]+)", text)
@@ -92,19 +94,20 @@ def submit_blast(sequence: str) -> Optional[str]:
 # BLAST POLLING
 # ---------------------------------------------------------
 
-def poll_blast_for_rid(rid: str) -> Optional[str]:
+def poll_blast_for_rid(rid: str, max_time: float = POLL_MAX_TIME) -> Optional[str]:
     start = time.time()
 
     while True:
-        if time.time() - start > POLL_MAX_TIME:
+        if time.time() - start > max_time:
             logger.error("BLAST TIMEOUT for RID %s", rid)
             return None
 
         params = {"CMD": "Get", "RID": rid, "FORMAT_TYPE": "XML"}
 
         try:
-            resp = requests.get(BLAST_URL, params=params, timeout=30)
-            resp.raise_for_status()
+            with outbound("ncbi"):
+                resp = requests.get(BLAST_URL, params=params, timeout=30)
+                resp.raise_for_status()
             text = resp.text
 
             if "Status=WAITING" in text:
@@ -164,14 +167,16 @@ def parse_blast_xml_for_top_hit(xml_text: str) -> Optional[Dict[str, Any]]:
 
 def fetch_taxonomy_for_name(name: str) -> Optional[Dict[str, Any]]:
     try:
-        search = Entrez.esearch(db="taxonomy", term=name, retmode="xml")
-        rec = Entrez.read(search)
+        with outbound("ncbi"):
+            search = Entrez.esearch(db="taxonomy", term=name, retmode="xml")
+            rec = Entrez.read(search)
         ids = rec.get("IdList", [])
         if not ids:
             return None
 
-        ef = Entrez.efetch(db="taxonomy", id=ids[0], retmode="xml")
-        records = Entrez.read(ef)
+        with outbound("ncbi"):
+            ef = Entrez.efetch(db="taxonomy", id=ids[0], retmode="xml")
+            records = Entrez.read(ef)
 
         lineage = records[0].get("LineageEx", [])
         tax = {item.get("Rank"): item.get("ScientificName")
@@ -270,7 +275,7 @@ def analyze_sequence_and_store(sequence: str) -> Dict[str, Any]:
 # NEW: DIRECT BLAST + PARSE (NO DATABASE)
 # ---------------------------------------------------------
 
-def run_blast_and_parse(sequence: str) -> Optional[Dict[str, Any]]:
+def run_blast_and_parse(sequence: str, max_time: float = POLL_MAX_TIME) -> Optional[Dict[str, Any]]:
     seq = clean_sequence(sequence)
 
     if len(seq) < 50:
@@ -298,7 +303,7 @@ def run_blast_and_parse(sequence: str) -> Optional[Dict[str, Any]]:
         }
 
     # POLL
-    xml = poll_blast_for_rid(rid)
+    xml = poll_blast_for_rid(rid, max_time)
     if not xml:
         return {
             "raw_sequence": seq,
@@ -344,6 +349,6 @@ def run_blast_and_parse(sequence: str) -> Optional[Dict[str, Any]]:
     }
 
 
-def run_blast_direct(sequence: str):
-    result = run_blast_and_parse(sequence)  # your existing BLAST logic
+def run_blast_direct(sequence: str, max_time: float = POLL_MAX_TIME):
+    result = run_blast_and_parse(sequence, max_time)  # your existing BLAST logic
     return result
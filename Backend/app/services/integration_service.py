@@ -1,6 +1,11 @@
 # app/services/integration_service.py
-from typing import Dict, Any, List, Optional
-from app.database import supabase
+import os
+import asyncio
+from typing import Dict, Any, List, Optional, Awaitable, Iterable, Iterator
+from app.repositories import async_tables
+from app.repositories.tables import otolith_repo, repo_for, taxonomy_repo
+from app.services.ocean_service import ocean_index
+from app.utils.concurrency import run_blocking
 
 # ============================
 # TAXONOMY LOOKUP
@@ -10,44 +15,29 @@ def get_taxonomy(scientific_name: str) -> Optional[Dict[str, Any]]:
     if not scientific_name:
         return None
 
-    res = (
-        supabase.table("taxonomy_data")
-        .select("*")
-        .eq("scientific_name", scientific_name)
-        .execute()
-    )
-
-    if not res.data:
-        return None
-
-    return res.data[0]
+    return taxonomy_repo.first(scientific_name=scientific_name)
 
 
 # ============================
 # OCEAN LOOKUP (NEAREST ENV)
 # ============================
 
-def get_ocean_environment(lat: float, lon: float, limit: int = 1) -> List[Dict[str, Any]]:
+def get_ocean_environment(
+    lat: float,
+    lon: float,
+    limit: int = 1,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    max_km: Optional[float] = None,
+) -> List[Dict[str, Any]]:
     """
-    Use simple numeric bounding-box approximation to fetch few nearest rows.
-    FRONTEND will do final nearest distance logic if needed.
+    Nearest ocean grid rows (great-circle distance) from the spatial index,
+    each tagged with `distance_km`.
     """
     if lat is None or lon is None:
         return []
 
-    # fetch small area around given lat/lon
-    res = (
-        supabase.table("ocean_data")
-        .select("*")
-        .gte("lat", lat - 0.5)
-        .lte("lat", lat + 0.5)
-        .gte("lon", lon - 0.5)
-        .lte("lon", lon + 0.5)
-        .limit(limit)
-        .execute()
-    )
-
-    return res.data or []
+    return ocean_index.nearest(float(lat), float(lon), k=limit, start=start_date, end=end_date, max_km=max_km)
 
 
 # ============================
@@ -55,93 +45,135 @@ def get_ocean_environment(lat: float, lon: float, limit: int = 1) -> List[Dict[s
 # ============================
 
 def get_otolith_by_original_id(otolith_id: str) -> List[Dict[str, Any]]:
-    res = (
-        supabase.table("otolith_data")
-        .select("*")
-        .eq("otolith_id", otolith_id)
-        .execute()
-    )
-    return res.data or []
+    return otolith_repo.find(otolith_id=otolith_id)
 
 
 def get_otolith_by_species(scientific_name: str) -> List[Dict[str, Any]]:
-    res = (
-        supabase.table("otolith_data")
-        .select("*")
-        .eq("scientific_name", scientific_name)
-        .execute()
-    )
-    return res.data or []
+    return otolith_repo.find(scientific_name=scientific_name)
+
+
+# ============================
+# SET-BASED LOOKUPS (BATCH)
+# ============================
+
+def select_in(table: str, column: str, values: Iterable[str]) -> List[Dict[str, Any]]:
+    """Rows whose `column` is any of `values` (backends chunk long lists)."""
+    values = sorted({v for v in values if v})
+    if not values:
+        return []
+    return repo_for(table).find_in(column, values)
+
+
+def group_by(rows: List[Dict[str, Any]], key: str) -> Dict[Any, List[Dict[str, Any]]]:
+    out: Dict[Any, List[Dict[str, Any]]] = {}
+    for r in rows:
+        out.setdefault(r.get(key), []).append(r)
+    return out
 
 
 # ============================
 # E-DNA BLAST DIRECT ANALYSIS
 # ============================
-from app.services.edna_service import run_blast_direct
+from app.services.edna_service import POLL_MAX_TIME, run_blast_direct
 
-def run_edna_analysis(sequence: str) -> Dict[str, Any]:
+def run_edna_analysis(sequence: str, max_time: float = POLL_MAX_TIME) -> Dict[str, Any]:
     """Run BLAST → return dict with species, taxonomy, etc."""
-    return run_blast_direct(sequence)
+    return run_blast_direct(sequence, max_time)
 
 
 # ============================
-# CORE INTEGRATION LOGIC
+# ASYNC LOOKUP LAYER
 # ============================
 
-def integrate_by_species(scientific_name: str):
-    sci = scientific_name.strip()
-    taxonomy = get_taxonomy(sci)
-    otoliths = get_otolith_by_species(sci)
+# per-dependency budgets (seconds); a slow source yields a warning, not a failed request
+TIMEOUTS = {
+    "taxonomy": float(os.getenv("INTEGRATION_TAXONOMY_TIMEOUT_S", "5")),
+    "otolith": float(os.getenv("INTEGRATION_OTOLITH_TIMEOUT_S", "5")),
+    "ocean": float(os.getenv("INTEGRATION_OCEAN_TIMEOUT_S", "5")),
+    "edna": float(os.getenv("INTEGRATION_EDNA_TIMEOUT_S", "180")),
+}
 
-    # ocean environment: take one otolith location → fetch ocean data
-    ocean_env = []
-    if otoliths:
-        lat = otoliths[0].get("lat")
-        lon = otoliths[0].get("lon")
-        ocean_env = get_ocean_environment(lat, lon)
 
-    return {
-        "species": sci,
-        "taxonomy": taxonomy,
-        "otolith_records": otoliths,
-        "ocean_environment": ocean_env,
-    }
+async def lookup(name: str, call: Awaitable, default=None, *, warnings: List[str], bounded: bool = True):
+    """
+    Await one source under its timeout; failures become warnings. Database
+    lookups go through the async repositories, so a timeout cancels the
+    query itself. Sources that enforce their own budget pass bounded=False.
+    """
+    timeout = TIMEOUTS.get(name) if bounded else None
+    try:
+        return await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        warnings.append(f"{name} lookup timed out after {timeout:g}s")
+    except Exception as e:
+        warnings.append(f"{name} lookup failed: {e}")
+    return default
 
 
-def integrate_by_otolith_id(oid: str):
-    otos = get_otolith_by_original_id(oid)
-    if not otos:
+async def _taxonomy(scientific_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not scientific_name:
         return None
+    return await async_tables.taxonomy_repo.first(scientific_name=scientific_name)
 
-    rec = otos[0]
-    sci = rec.get("scientific_name")
-    taxonomy = get_taxonomy(sci)
 
-    lat = rec.get("lat")
-    lon = rec.get("lon")
-    ocean_env = get_ocean_environment(lat, lon)
+async def _otoliths(scientific_name: Optional[str]) -> List[Dict[str, Any]]:
+    if not scientific_name:
+        return []
+    return await async_tables.otolith_repo.find(scientific_name=scientific_name)
+
+
+async def _ocean_for(rec: Optional[Dict[str, Any]], warnings: List[str]) -> List[Dict[str, Any]]:
+    if not rec:
+        return []
+    # in-memory index; the shared threadpool only matters while it is first loaded
+    return await lookup("ocean", run_blocking(get_ocean_environment, rec.get("lat"), rec.get("lon")),
+                        default=[], warnings=warnings)
+
+
+# ============================
+# CORE INTEGRATION LOGIC
+# ============================
+
+async def integrate_by_otolith_id(oid: str):
+    warnings: List[str] = []
+    otos = await lookup("otolith", async_tables.otolith_repo.find(otolith_id=oid), warnings=warnings)
+    if otos is not None and not otos:
+        return None
+
+    rec = otos[0] if otos else None
+    sci = rec.get("scientific_name") if rec else None
+
+    # taxonomy and ocean both hang off the otolith record only
+    taxonomy, ocean_env = await asyncio.gather(
+        lookup("taxonomy", _taxonomy(sci), warnings=warnings),
+        _ocean_for(rec, warnings),
+    )
 
     return {
         "species": sci,
         "taxonomy": taxonomy,
         "otolith_record": rec,
         "ocean_environment": ocean_env,
+        "warnings": warnings,
     }
 
 
-def integrate_by_edna(sequence: str):
-    blast = run_edna_analysis(sequence)
+async def integrate_by_edna(sequence: str):
+    warnings: List[str] = []
+    # BLAST polling stops at the budget itself; abandoning it via wait_for would leave the thread polling
+    budget = TIMEOUTS["edna"]
+    blast = await lookup("edna", run_blocking(run_edna_analysis, sequence, budget),
+                         default={}, warnings=warnings, bounded=False)
+    if blast.get("note") == "blast_poll_failed":
+        warnings.append(f"edna lookup got no BLAST result (failed or over {budget:g}s)")
     sci = blast.get("species")
 
-    taxonomy = get_taxonomy(sci)
-    otoliths = get_otolith_by_species(sci)
-
+    taxonomy, otoliths = await asyncio.gather(
+        lookup("taxonomy", _taxonomy(sci), warnings=warnings),
+        lookup("otolith", _otoliths(sci), default=[], warnings=warnings),
+    )
     # ocean environment by using any otolith record
-    ocean_env = []
-    if otoliths:
-        lat = otoliths[0].get("lat")
-        lon = otoliths[0].get("lon")
-        ocean_env = get_ocean_environment(lat, lon)
+    ocean_env = await _ocean_for(otoliths[0] if otoliths else None, warnings)
 
     return {
         "raw_sequence": sequence,
@@ -150,4 +182,69 @@ def integrate_by_edna(sequence: str):
         "taxonomy": taxonomy,
         "otolith_records": otoliths,
         "ocean_environment": ocean_env,
+        "warnings": warnings,
     }
+
+
+# ============================
+# BULK INTEGRATION
+# ============================
+
+BATCH_CHUNK = int(os.getenv("INTEGRATION_BATCH_CHUNK", "200"))
+
+
+def _integrate_chunk(names: List[str], oids: List[str]) -> Iterator[Dict[str, Any]]:
+    by_oid = group_by(select_in("otolith_data", "otolith_id", oids), "otolith_id")
+    species = set(names) | {r[0].get("scientific_name") for r in by_oid.values()}
+
+    by_species = group_by(select_in("otolith_data", "scientific_name", names), "scientific_name")
+    taxonomy = {r.get("scientific_name"): r for r in select_in("taxonomy_data", "scientific_name", species)}
+
+    # one spatial join for every anchor location in the chunk
+    anchors = [by_species[n][0] if by_species.get(n) else None for n in names]
+    anchors += [by_oid[o][0] if by_oid.get(o) else None for o in oids]
+    located = [
+        i for i, a in enumerate(anchors)
+        if a and a.get("lat") is not None and a.get("lon") is not None
+    ]
+    nearest = ocean_index.nearest_batch([(anchors[i]["lat"], anchors[i]["lon"]) for i in located])
+    ocean = dict(zip(located, nearest))
+
+    for i, name in enumerate(names):
+        yield {
+            "type": "species",
+            "species": name,
+            "taxonomy": taxonomy.get(name),
+            "otolith_records": by_species.get(name, []),
+            "ocean_environment": ocean.get(i, []),
+        }
+
+    for j, oid in enumerate(oids, start=len(names)):
+        rec = anchors[j]
+        if rec is None:
+            yield {"type": "otolith", "otolith_id": oid, "error": "Otolith ID not found"}
+            continue
+        sci = rec.get("scientific_name")
+        yield {
+            "type": "otolith",
+            "otolith_id": oid,
+            "species": sci,
+            "taxonomy": taxonomy.get(sci),
+            "otolith_record": rec,
+            "ocean_environment": ocean.get(j, []),
+        }
+
+
+def integrate_batch(scientific_names: List[str], otolith_ids: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Integration for many species / otolith IDs: per chunk, set-based in_()
+    queries plus one batched nearest-ocean join. Results are yielded as soon
+    as each chunk is done, in request order.
+    """
+    names = [n.strip() for n in scientific_names if n and n.strip()]
+    oids = [o.strip() for o in otolith_ids if o and o.strip()]
+
+    for i in range(0, len(names), BATCH_CHUNK):
+        yield from _integrate_chunk(names[i:i + BATCH_CHUNK], [])
+    for i in range(0, len(oids), BATCH_CHUNK):
+        yield from _integrate_chunk([], oids[i:i + BATCH_CHUNK])
@@ -1,5 +1,5 @@
 from datetime import datetime
-from app.database import supabase
+from app.repositories.tables import metadata_repo
 
 def extract_metadata(df, dtype):
     return {
@@ -10,9 +10,9 @@ def extract_metadata(df, dtype):
     }
 
 def save_metadata(meta: dict):
-    supabase.table("dataset_metadata").insert({
+    metadata_repo.insert({
         "version": 1,   # REQUIRED
         "dataset_type": meta["dataset_type"],
         "metadata": meta,
         "created_at": meta["created_at"]
-    }).execute()
+    })
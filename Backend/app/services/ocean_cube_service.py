@@ -0,0 +1,275 @@
+# app/services/ocean_cube_service.py
+"""
+Gridded ocean cube on local disk.
+
+LAS exports such as Datasets/Duplicate/SST.csv hold one variable for one
+date as `DATETIME,TIME,LON,LAT,<VAR>` rows on a regular lat/lon grid. They
+are assembled into one netCDF file per time step:
+
+    <OCEAN_CUBE_DIR>/cube_YYYYMMDD.nc     dims (time=1, lat, lon), one float32
+                                          variable per parameter, zlib, chunked
+
+Reads open the per-step files lazily (no dask), so a grid slice, a point
+series or a regional mean only touch the chunks they need.
+"""
+import os
+import re
+import glob
+import threading
+import argparse
+import logging
+from io import StringIO
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from app.utils.constants import Y_PARAMETERS
+
+logger = logging.getLogger("ocean_cube")
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CUBE_DIR = os.getenv(
+    "OCEAN_CUBE_DIR", os.path.join(BASE_DIR, "models", "saved_artifacts", "ocean_cube")
+)
+
+TIME_ORIGIN = pd.Timestamp("1980-01-24")  # LAS "days since 24-JAN-1980"
+BAD_FLAG = -1e33                           # LAS writes -1.E+34 for missing cells
+CHUNK = 128                                # lat/lon chunk edge in the netCDF files
+COORD_DECIMALS = 5
+
+
+# ============================
+# LAS CSV PARSING
+# ============================
+
+def read_las_csv(path_or_buf) -> pd.DataFrame:
+    """
+    One LAS export -> DataFrame(time, lat, lon, <var>). Handles the optional
+    text preamble before the DATETIME header and the -1e34 bad flag.
+    """
+    if hasattr(path_or_buf, "read"):
+        raw = path_or_buf.read()
+        text = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+    else:
+        with open(path_or_buf, encoding="utf-8", errors="replace") as fh:
+            text = fh.read()
+
+    m = re.search(r"^DATETIME,", text, flags=re.MULTILINE)
+    if m is None:
+        raise ValueError("Not a LAS grid export: no DATETIME header")
+
+    df = pd.read_csv(StringIO(text[m.start():]), skipinitialspace=True)
+    df.columns = [c.strip().lower() for c in df.columns]
+
+    var_cols = [c for c in df.columns if c not in ("datetime", "time", "lon", "lat")]
+    if len(var_cols) != 1:
+        raise ValueError(f"Expected one variable column, found {var_cols}")
+    var = var_cols[0]
+
+    out = pd.DataFrame({
+        "time": TIME_ORIGIN + pd.to_timedelta(pd.to_numeric(df["time"], errors="coerce"), unit="D"),
+        "lat": pd.to_numeric(df["lat"], errors="coerce").round(COORD_DECIMALS),
+        "lon": pd.to_numeric(df["lon"], errors="coerce").round(COORD_DECIMALS),
+        var: pd.to_numeric(df[var], errors="coerce"),
+    })
+    out.loc[out[var] < BAD_FLAG, var] = np.nan
+    return out.dropna(subset=["time", "lat", "lon"])
+
+
+def to_grid(df: pd.DataFrame, var: str) -> xr.Dataset:
+    """Scatter (time, lat, lon, value) rows onto a dense (time, lat, lon) array."""
+    times = np.sort(df["time"].unique())
+    lats = np.sort(df["lat"].unique())
+    lons = np.sort(df["lon"].unique())
+
+    ti = np.searchsorted(times, df["time"].to_numpy())
+    yi = np.searchsorted(lats, df["lat"].to_numpy())
+    xi = np.searchsorted(lons, df["lon"].to_numpy())
+
+    data = np.full((len(times), len(lats), len(lons)), np.nan, dtype=np.float32)
+    data[ti, yi, xi] = df[var].to_numpy(dtype=np.float32)
+
+    return xr.Dataset(
+        {var: (("time", "lat", "lon"), data)},
+        coords={"time": times, "lat": lats, "lon": lons},
+    )
+
+
+# ============================
+# CUBE STORE
+# ============================
+
+class OceanCube:
+
+    def __init__(self, root: str = CUBE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._open: Dict[str, tuple] = {}  # path -> (mtime, Dataset)
+
+    # ---------- layout ----------
+
+    def _path(self, t) -> str:
+        return os.path.join(self.root, f"cube_{pd.Timestamp(t):%Y%m%d}.nc")
+
+    def _files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.root, "cube_*.nc")))
+
+    @staticmethod
+    def _time_of(path: str) -> pd.Timestamp:
+        return pd.Timestamp(os.path.basename(path)[5:13])
+
+    # ---------- writing ----------
+
+    def _write_step(self, step: xr.Dataset):
+        path = self._path(step["time"].values[0])
+        with self._lock:
+            if os.path.exists(path):
+                with xr.open_dataset(path) as old:
+                    step = xr.merge([old.load(), step], join="outer", compat="override")
+                self._close(path)
+
+            enc = {
+                v: {
+                    "zlib": True, "complevel": 4, "dtype": "float32", "_FillValue": np.nan,
+                    "chunksizes": (1, min(CHUNK, step.sizes["lat"]), min(CHUNK, step.sizes["lon"])),
+                }
+                for v in step.data_vars
+            }
+            os.makedirs(self.root, exist_ok=True)
+            tmp = path + ".tmp"
+            step.to_netcdf(tmp, engine="netcdf4", encoding=enc)
+            os.replace(tmp, path)
+
+    def ingest_frame(self, df: pd.DataFrame) -> Dict[str, Any]:
+        var = [c for c in df.columns if c not in ("time", "lat", "lon")][0]
+        cube = to_grid(df, var)
+        for i in range(cube.sizes["time"]):
+            self._write_step(cube.isel(time=slice(i, i + 1)))
+        return {
+            "variable": var,
+            "times": [str(pd.Timestamp(t).date()) for t in cube["time"].values],
+            "shape": [cube.sizes["lat"], cube.sizes["lon"]],
+        }
+
+    def ingest_csv(self, path_or_buf) -> Dict[str, Any]:
+        return self.ingest_frame(read_las_csv(path_or_buf))
+
+    def ingest_dir(self, directory: str) -> List[Dict[str, Any]]:
+        """Ingest every LAS export (*.csv) in a directory; other CSVs are skipped."""
+        done = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+            try:
+                done.append({"file": os.path.basename(path), **self.ingest_csv(path)})
+            except ValueError as e:
+                logger.info("skipping %s: %s", path, e)
+        return done
+
+    # ---------- reading ----------
+
+    def _close(self, path: str):
+        hit = self._open.pop(path, None)
+        if hit is not None:
+            hit[1].close()
+
+    def _dataset(self, path: str) -> xr.Dataset:
+        """Lazily opened step file, reopened when it was rewritten."""
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            hit = self._open.get(path)
+            if hit is None or hit[0] != mtime:
+                self._close(path)
+                hit = (mtime, xr.open_dataset(path, engine="netcdf4"))
+                self._open[path] = hit
+            return hit[1]
+
+    def _steps(self, start=None, end=None) -> List[str]:
+        files = self._files()
+        if start is not None:
+            files = [f for f in files if self._time_of(f) >= pd.Timestamp(start)]
+        if end is not None:
+            files = [f for f in files if self._time_of(f) <= pd.Timestamp(end)]
+        return files
+
+    def catalog(self) -> Dict[str, Any]:
+        files = self._files()
+        if not files:
+            return {"times": [], "variables": []}
+        variables = set()
+        for f in files:
+            variables.update(self._dataset(f).data_vars)
+        ds = self._dataset(files[-1])
+        return {
+            "times": [str(self._time_of(f).date()) for f in files],
+            "variables": sorted(variables, key=lambda v: (v not in Y_PARAMETERS, v)),
+            "lat": [float(ds["lat"].min()), float(ds["lat"].max()), int(ds.sizes["lat"])],
+            "lon": [float(ds["lon"].min()), float(ds["lon"].max()), int(ds.sizes["lon"])],
+        }
+
+    def _var(self, path: str, var: str) -> Optional[xr.DataArray]:
+        ds = self._dataset(path)
+        return ds[var] if var in ds.data_vars else None
+
+    def grid(self, var: str, time, lat_min=None, lat_max=None, lon_min=None, lon_max=None,
+             stride: int = 1) -> Optional[xr.DataArray]:
+        """2-D (lat, lon) slice of one variable at the step nearest to `time`."""
+        files = self._files()
+        if not files:
+            return None
+        target = pd.Timestamp(time)
+        path = min(files, key=lambda f: abs(self._time_of(f) - target))
+        da = self._var(path, var)
+        if da is None:
+            return None
+        da = da.isel(time=0).sel(lat=slice(lat_min, lat_max), lon=slice(lon_min, lon_max))
+        return da.isel(lat=slice(None, None, stride), lon=slice(None, None, stride)).load()
+
+    def point_series(self, var: str, lat: float, lon: float, start=None, end=None) -> pd.Series:
+        """Value at the grid cell nearest to (lat, lon) for every step in the window."""
+        out = {}
+        for path in self._steps(start, end):
+            da = self._var(path, var)
+            if da is not None:
+                out[self._time_of(path)] = float(da.isel(time=0).sel(lat=lat, lon=lon, method="nearest"))
+        return pd.Series(out, dtype=np.float64)
+
+    def regional_mean(self, var: str, lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+                      start=None, end=None) -> pd.DataFrame:
+        """Area-weighted (cos lat) mean, plus cell count, over a lat/lon box per step."""
+        rows = []
+        for path in self._steps(start, end):
+            da = self._var(path, var)
+            if da is None:
+                continue
+            box = da.isel(time=0).sel(lat=slice(lat_min, lat_max), lon=slice(lon_min, lon_max)).values
+            if not box.size:
+                continue
+            lats = da["lat"].sel(lat=slice(lat_min, lat_max)).values
+            w = np.broadcast_to(np.cos(np.radians(lats))[:, None], box.shape)
+            ok = np.isfinite(box)
+            n = int(ok.sum())
+            rows.append({
+                "time": self._time_of(path),
+                "mean": float((box[ok] * w[ok]).sum() / w[ok].sum()) if n else None,
+                "cells": n,
+            })
+        return pd.DataFrame(rows, columns=["time", "mean", "cells"])
+
+
+ocean_cube = OceanCube()
+
+
+def ingest_paths(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    done = []
+    for p in paths:
+        done.extend(ocean_cube.ingest_dir(p) if os.path.isdir(p) else [ocean_cube.ingest_csv(p)])
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest LAS grid CSV exports into the ocean cube")
+    parser.add_argument("paths", nargs="+", help="CSV files or directories of CSVs")
+    args = parser.parse_args()
+    for item in ingest_paths(args.paths):
+        print(item)
@@ -0,0 +1,127 @@
+# app/services/ocean_grid_service.py
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.ocean_service import ocean_index
+from app.services.richness_grid_service import cell_centers, hex_cells
+from app.utils.constants import OCEAN_EXTENT, RANGE_LIMITS
+
+STATS = ("mean", "count", "min", "max", "sum")
+
+
+# ============================
+# COLUMN CLEANING
+# ============================
+
+def flatten_numeric(s: pd.Series) -> np.ndarray:
+    """Numeric column where list/tuple cells collapse to their first element."""
+    out = pd.to_numeric(s, errors="coerce")
+    if s.dtype == object:
+        missing = out.isna() & s.notna()
+        if missing.any():
+            out[missing] = pd.to_numeric(s[missing].str[0], errors="coerce")
+    return out.to_numpy(dtype=np.float64)
+
+
+def ocean_points(param: str, clip: bool = True, start=None, end=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lat, lon, value) arrays for one parameter, NaNs and out-of-range values dropped."""
+    st = ocean_index.state()  # one snapshot, so the frame and times line up
+    df = st["df"]
+    if df.empty or param not in df.columns:
+        empty = np.empty(0)
+        return empty, empty, empty
+
+    lat = flatten_numeric(df["lat"])
+    lon = flatten_numeric(df["lon"])
+    val = flatten_numeric(df[param])
+    ok = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(val)
+    if clip and param in RANGE_LIMITS:
+        low, high = RANGE_LIMITS[param]
+        ok &= (val >= low) & (val <= high)
+    tmask = ocean_index.time_mask(start, end, state=st)
+    if tmask is not None:
+        ok &= tmask
+    return lat[ok], lon[ok], val[ok]
+
+
+# ============================
+# GRIDDING
+# ============================
+
+def grid_edges(cell: float, extent: Optional[Dict[str, float]] = None):
+    """Fixed lat/lon bin edges covering `extent` at `cell` degrees."""
+    e = {**OCEAN_EXTENT, **(extent or {})}
+    n_lat = max(1, int(np.ceil((e["lat_max"] - e["lat_min"]) / cell - 1e-9)))
+    n_lon = max(1, int(np.ceil((e["lon_max"] - e["lon_min"]) / cell - 1e-9)))
+    return (
+        e["lat_min"] + cell * np.arange(n_lat + 1),
+        e["lon_min"] + cell * np.arange(n_lon + 1),
+    )
+
+
+def cell_index(lat, lon, lat_edges, lon_edges) -> np.ndarray:
+    """Flat (row-major lat x lon) cell index per point, -1 outside the grid."""
+    n_lat, n_lon = len(lat_edges) - 1, len(lon_edges) - 1
+    i = np.searchsorted(lat_edges, lat, side="right") - 1
+    j = np.searchsorted(lon_edges, lon, side="right") - 1
+    # the last edge is inclusive, as in np.histogram2d
+    i = np.where(lat == lat_edges[-1], n_lat - 1, i)
+    j = np.where(lon == lon_edges[-1], n_lon - 1, j)
+    inside = (i >= 0) & (i < n_lat) & (j >= 0) & (j < n_lon)
+    return np.where(inside, i * n_lon + j, -1)
+
+
+def merge_cells(flat, count, total, vmin, vmax, n_cells: int) -> Dict[str, np.ndarray]:
+    """
+    Combine partial aggregates (count / sum / min / max per entry) into
+    n_cells dense cells; entries with flat < 0 are ignored.
+    """
+    ok = flat >= 0
+    flat, count, total, vmin, vmax = flat[ok], count[ok], total[ok], vmin[ok], vmax[ok]
+
+    out_count = np.bincount(flat, weights=count, minlength=n_cells).astype(np.int64)
+    out_sum = np.bincount(flat, weights=total, minlength=n_cells)
+
+    out_min = np.full(n_cells, np.nan)
+    out_max = np.full(n_cells, np.nan)
+    if len(flat):
+        order = np.argsort(flat, kind="stable")
+        f = flat[order]
+        starts = np.flatnonzero(np.r_[True, f[1:] != f[:-1]])
+        out_min[f[starts]] = np.minimum.reduceat(vmin[order], starts)
+        out_max[f[starts]] = np.maximum.reduceat(vmax[order], starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(out_count > 0, out_sum / out_count, np.nan)
+    return {"count": out_count, "sum": out_sum, "min": out_min, "max": out_max, "mean": mean}
+
+
+def reduce_cells(flat: np.ndarray, values: np.ndarray, n_cells: int) -> Dict[str, np.ndarray]:
+    """count / sum / min / max / mean of raw values per flat cell index."""
+    return merge_cells(flat, np.ones(len(values)), values, values, values, n_cells)
+
+
+def grid_stats(lat, lon, values, lat_edges, lon_edges) -> Dict[str, np.ndarray]:
+    """Per-cell aggregates as (n_lat, n_lon) arrays; empty cells are NaN (count 0)."""
+    shape = (len(lat_edges) - 1, len(lon_edges) - 1)
+    flat = cell_index(np.asarray(lat), np.asarray(lon), lat_edges, lon_edges)
+    out = reduce_cells(flat, np.asarray(values, dtype=np.float64), shape[0] * shape[1])
+    return {k: v.reshape(shape) for k, v in out.items()}
+
+
+def grid_merge(lat, lon, parts: Dict[str, np.ndarray], lat_edges, lon_edges) -> Dict[str, np.ndarray]:
+    """grid_stats for pre-aggregated cells located at (lat, lon), e.g. pyramid cell centres."""
+    shape = (len(lat_edges) - 1, len(lon_edges) - 1)
+    flat = cell_index(np.asarray(lat), np.asarray(lon), lat_edges, lon_edges)
+    out = merge_cells(flat, parts["count"], parts["sum"], parts["min"], parts["max"], shape[0] * shape[1])
+    return {k: v.reshape(shape) for k, v in out.items()}
+
+
+def hex_merge(parts: Dict[str, np.ndarray], size: float) -> Dict[str, np.ndarray]:
+    """Re-bin pre-aggregated cells (lat/lon centres) into hexagons of circumradius `size`."""
+    hex_ids, inv = np.unique(hex_cells(parts["lat"], parts["lon"], size), return_inverse=True)
+    out = merge_cells(inv, parts["count"], parts["sum"], parts["min"], parts["max"], len(hex_ids))
+    out["lat"], out["lon"] = cell_centers("hex", hex_ids, size)
+    return out
@@ -0,0 +1,267 @@
+# app/services/ocean_pyramid_service.py
+"""
+Multi-resolution ocean grid pyramid.
+
+For each parameter in Y_PARAMETERS and each level (cell size in degrees)
+the pyramid keeps sparse per-(month, cell) aggregates: count, sum, min and
+max of the in-range values. Levels share the OCEAN_EXTENT origin, so any
+request is answered from the coarsest level that is at least as fine as
+the requested cell, instead of re-aggregating raw ocean_data points.
+
+Files: <OCEAN_PYRAMID_DIR>/<param>_<cell>.npz with sorted int64 `key`
+(month * n_cells + cell), int32 `count`, float64 `sum`, float32 `min`/`max`.
+"""
+import os
+import tempfile
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.ocean_service import ocean_index
+from app.services.ocean_grid_service import (
+    cell_index, flatten_numeric, grid_edges, merge_cells,
+)
+from app.utils.concurrency import file_lock, file_stamp
+from app.utils.constants import OCEAN_EXTENT, RANGE_LIMITS, Y_PARAMETERS
+
+logger = logging.getLogger("ocean_pyramid")
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PYRAMID_DIR = os.getenv(
+    "OCEAN_PYRAMID_DIR", os.path.join(BASE_DIR, "models", "saved_artifacts", "ocean_pyramid")
+)
+
+NATIVE_CELL = float(os.getenv("OCEAN_NATIVE_CELL_DEG", str(1 / 12)))  # source grid spacing
+LEVELS = [2.0, 1.0, 0.25, NATIVE_CELL]
+
+EPOCH = np.datetime64("1970-01", "M")
+
+
+def month_index(times: np.ndarray) -> np.ndarray:
+    """Months since 1970-01, plus one; 0 marks rows without a datetime."""
+    t = np.asarray(times, dtype="datetime64[ns]")
+    m = (t.astype("datetime64[M]") - EPOCH).astype(np.int64) + 1
+    return np.where(np.isnat(t), 0, m)
+
+
+def row_times(df: pd.DataFrame) -> np.ndarray:
+    """datetime64[ns] per row of an ocean frame (NaT when missing or unparseable)."""
+    if "datetime" not in df.columns:
+        return np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+    return pd.to_datetime(df["datetime"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def month_of(value) -> int:
+    return int(month_index(np.array([pd.Timestamp(value)], dtype="datetime64[ns]"))[0])
+
+
+def month_window(start=None, end=None):
+    """start/end widened to whole months, the way cells() reads them (end=YYYY-MM includes that month)."""
+    lo = pd.Timestamp(start).to_period("M").start_time if start is not None else None
+    hi = pd.Timestamp(end).to_period("M").end_time if end is not None else None
+    return lo, hi
+
+
+# ============================
+# SPARSE LEVEL ARRAYS
+# ============================
+
+def _empty():
+    return {
+        "key": np.empty(0, dtype=np.int64),
+        "count": np.empty(0, dtype=np.int32),
+        "sum": np.empty(0, dtype=np.float64),
+        "min": np.empty(0, dtype=np.float32),
+        "max": np.empty(0, dtype=np.float32),
+    }
+
+
+def _reduce(key, count, total, vmin, vmax):
+    """Collapse duplicate keys; output sorted by key."""
+    if not len(key):
+        return _empty()
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return {
+        "key": key[starts],
+        "count": np.add.reduceat(count[order], starts).astype(np.int32),
+        "sum": np.add.reduceat(total[order], starts),
+        "min": np.minimum.reduceat(vmin[order], starts).astype(np.float32),
+        "max": np.maximum.reduceat(vmax[order], starts).astype(np.float32),
+    }
+
+
+def _whole(x: float) -> bool:
+    return abs(x - round(x)) < 1e-6
+
+
+def _merge(a, b):
+    return _reduce(*(np.concatenate([a[k], b[k]]) for k in ("key", "count", "sum", "min", "max")))
+
+
+class OceanPyramid:
+
+    def __init__(self, root: str = PYRAMID_DIR, levels: List[float] = LEVELS):
+        self.root = root
+        self.levels = sorted(levels, reverse=True)  # coarse -> fine
+        self._lock = threading.Lock()
+        self._arrays: Dict[tuple, Dict[str, np.ndarray]] = {}
+        self._mtimes: Dict[tuple, tuple] = {}
+        self._edges = {cell: grid_edges(cell) for cell in self.levels}
+
+    # ---------- layout ----------
+
+    def _path(self, param: str, cell: float) -> str:
+        return os.path.join(self.root, f"{param}_{cell:.6g}.npz")
+
+    def _n_cells(self, cell: float) -> int:
+        lat_e, lon_e = self._edges[cell]
+        return (len(lat_e) - 1) * (len(lon_e) - 1)
+
+    def level_for(self, cell: float) -> Optional[float]:
+        """Coarsest level at least as fine as `cell`; None if finer than native."""
+        fits = [lv for lv in self.levels if lv <= cell * (1 + 1e-9)]
+        return fits[0] if fits else None
+
+    def tiling_level(self, cell: float, lat_min: float, lon_min: float) -> Optional[float]:
+        """
+        Coarsest level whose cells tile a `cell`-degree grid starting at
+        (lat_min, lon_min) exactly: `cell` is a whole multiple of the level and
+        the origin lies on its edges. None when no level does.
+        """
+        for lv in self.levels:
+            if (lv <= cell * (1 + 1e-9) and _whole(cell / lv)
+                    and _whole((lat_min - OCEAN_EXTENT["lat_min"]) / lv)
+                    and _whole((lon_min - OCEAN_EXTENT["lon_min"]) / lv)):
+                return lv
+        return None
+
+    # ---------- building ----------
+
+    def _aggregate(self, df: pd.DataFrame, lat, lon, months, param: str, cell: float):
+        if param not in df.columns:
+            return _empty()
+        val = flatten_numeric(df[param])
+
+        ok = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(val)
+        low, high = RANGE_LIMITS[param]
+        ok &= (val >= low) & (val <= high)
+
+        lat_e, lon_e = self._edges[cell]
+        flat = cell_index(lat[ok], lon[ok], lat_e, lon_e)
+        inside = flat >= 0
+        key = months[ok][inside] * self._n_cells(cell) + flat[inside]
+        v = val[ok][inside]
+        return _reduce(key, np.ones(len(v), dtype=np.int64), v, v, v)
+
+    def _save(self, param: str, cell: float, arrays: Dict[str, np.ndarray]):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(param, cell)
+        # unique temp name: several workers may save the same level at once
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._arrays[(param, cell)] = arrays
+        self._mtimes[(param, cell)] = file_stamp(path)
+
+    def build(self, df: Optional[pd.DataFrame] = None, times: Optional[np.ndarray] = None) -> int:
+        """Rebuild every level from the full ocean table (default: the spatial index frame)."""
+        if df is None:
+            st = ocean_index.state()
+            df, times = st["df"], st["times"]
+        months = month_index(times if times is not None else row_times(df))
+        lat, lon = flatten_numeric(df["lat"]), flatten_numeric(df["lon"])
+        with self._lock, file_lock(self.root):
+            for param in Y_PARAMETERS:
+                for cell in self.levels:
+                    self._save(param, cell, self._aggregate(df, lat, lon, months, param, cell))
+        logger.info("ocean pyramid built from %d rows", len(df))
+        return len(df)
+
+    def add_rows(self, rows: List[Dict[str, Any]]):
+        """Fold freshly uploaded rows into every level; no-op until the pyramid exists."""
+        if not rows or not os.path.exists(self._path(Y_PARAMETERS[0], self.levels[0])):
+            return
+        df = pd.DataFrame(rows)
+        if "lat" not in df.columns or "lon" not in df.columns:
+            return
+        months = month_index(row_times(df))
+        lat, lon = flatten_numeric(df["lat"]), flatten_numeric(df["lon"])
+        # other workers fold their uploads into the same files: read-merge-write under one lock
+        with self._lock, file_lock(self.root):
+            for param in Y_PARAMETERS:
+                for cell in self.levels:
+                    delta = self._aggregate(df, lat, lon, months, param, cell)
+                    if len(delta["key"]):
+                        self._save(param, cell, _merge(self._load(param, cell), delta))
+
+    # ---------- reading ----------
+
+    def _load(self, param: str, cell: float) -> Dict[str, np.ndarray]:
+        """Cached level arrays, re-read when another worker rewrote the file."""
+        path = self._path(param, cell)
+        try:
+            stamp = file_stamp(path)
+        except FileNotFoundError:
+            return _empty()
+        k = (param, cell)
+        if self._mtimes.get(k) != stamp:
+            with np.load(path) as z:
+                self._arrays[k] = {name: z[name] for name in z.files}
+            self._mtimes[k] = stamp
+        return self._arrays[k]
+
+    def ensure_built(self):
+        if not os.path.exists(self._path(Y_PARAMETERS[0], self.levels[0])):
+            self.build()
+
+    def cells(self, param: str, cell: float, start=None, end=None,
+              origin: Optional[tuple] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Per-cell aggregates (months collapsed) of the level matching `cell`:
+        dict of lat/lon centres plus count/sum/min/max, or None when the
+        request is finer than the native level. With `origin` (lat_min,
+        lon_min) the level must tile that grid exactly (see tiling_level).
+        """
+        level = self.level_for(cell) if origin is None else self.tiling_level(cell, *origin)
+        if level is None:
+            return None
+        self.ensure_built()
+        arr = self._load(param, level)
+
+        n_cells = self._n_cells(level)
+        month, flat = np.divmod(arr["key"], n_cells)
+        keep = np.ones(len(flat), dtype=bool)
+        if start is not None:
+            keep &= month >= month_of(start)
+        if end is not None:
+            keep &= (month <= month_of(end)) & (month > 0)
+
+        uniq, inv = np.unique(flat[keep], return_inverse=True)
+        merged = merge_cells(
+            inv, arr["count"][keep].astype(np.float64), arr["sum"][keep],
+            arr["min"][keep].astype(np.float64), arr["max"][keep].astype(np.float64), len(uniq),
+        )
+
+        lat_e, lon_e = self._edges[level]
+        n_lon = len(lon_e) - 1
+        i, j = np.divmod(uniq, n_lon)
+        return {
+            "level": level,
+            "lat": OCEAN_EXTENT["lat_min"] + (i + 0.5) * level,
+            "lon": OCEAN_EXTENT["lon_min"] + (j + 0.5) * level,
+            **{k: merged[k] for k in ("count", "sum", "min", "max", "mean")},
+        }
+
+
+ocean_pyramid = OceanPyramid()
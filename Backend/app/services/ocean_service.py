@@ -0,0 +1,296 @@
+# app/services/ocean_service.py
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from app.repositories.tables import ocean_repo
+
+EARTH_RADIUS_KM = 6371.0088
+
+# uploaded rows live in a small delta tree until they are folded into the main one
+REBUILD_MIN_DELTA = int(os.getenv("OCEAN_INDEX_REBUILD_MIN", "5000"))
+REBUILD_FRACTION = 0.1
+
+
+def to_xyz(lat, lon) -> np.ndarray:
+    """Lat/lon (degrees) -> unit vectors; chord distance is monotonic in great-circle distance."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _clean(v):
+    if v is None:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and v != v:
+        return None
+    return v
+
+
+# ============================
+# SPATIAL INDEX OVER ocean_data
+# ============================
+
+class OceanSpatialIndex:
+    """
+    Nearest-neighbour index over ocean grid points (KD-tree on unit vectors,
+    haversine distances). Uploaded rows go to a small delta tree that is
+    folded into the main tree once it grows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    # ---------- building ----------
+
+    @staticmethod
+    def _frame(rows) -> pd.DataFrame:
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+        df["lat"] = pd.to_numeric(df.get("lat"), errors="coerce")
+        df["lon"] = pd.to_numeric(df.get("lon"), errors="coerce")
+        return df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+
+    @staticmethod
+    def _times(df: pd.DataFrame) -> np.ndarray:
+        if "datetime" not in df.columns:
+            return np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+        return pd.to_datetime(df["datetime"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+    def _make_state(self, df: pd.DataFrame, times: np.ndarray):
+        xyz = to_xyz(df["lat"].to_numpy(), df["lon"].to_numpy()) if len(df) else np.empty((0, 3))
+        return {
+            "df": df,
+            "xyz": xyz,
+            "times": times,
+            "tree": cKDTree(xyz) if len(xyz) else None,
+            "tree_n": len(xyz),
+            "delta_tree": None,
+        }
+
+    def rebuild(self, rows: Optional[List[Dict[str, Any]]] = None):
+        df = self._frame(rows if rows is not None else ocean_repo.frame())
+        state = self._make_state(df, self._times(df))
+        with self._lock:
+            self._state = state
+        return len(df)
+
+    def state(self):
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    df = self._frame(ocean_repo.frame())
+                    self._state = self._make_state(df, self._times(df))
+        return self._state
+
+    def add_rows(self, rows: List[Dict[str, Any]]):
+        """Append freshly uploaded rows; no-op until the index has been built once."""
+        if self._state is None or not rows:
+            return
+        new = self._frame(rows)
+        if new.empty:
+            return
+        with self._lock:
+            st = self._state
+            df = pd.concat([st["df"], new], ignore_index=True)
+            times = np.concatenate([st["times"], self._times(new)])
+            delta = len(df) - st["tree_n"]
+            if delta >= max(REBUILD_MIN_DELTA, REBUILD_FRACTION * st["tree_n"]):
+                self._state = self._make_state(df, times)
+            else:
+                xyz = np.vstack([st["xyz"], to_xyz(new["lat"].to_numpy(), new["lon"].to_numpy())])
+                self._state = {
+                    **st,
+                    "df": df,
+                    "times": times,
+                    "xyz": xyz,
+                    "delta_tree": cKDTree(xyz[st["tree_n"]:]),
+                }
+
+    # ---------- querying ----------
+
+    def __len__(self):
+        return len(self.state()["df"])
+
+    def time_mask(self, start=None, end=None, state=None) -> Optional[np.ndarray]:
+        """Row mask for a datetime window over state()["df"], None when unbounded."""
+        return self._time_mask((state or self.state())["times"], start, end)
+
+    def frame(self) -> pd.DataFrame:
+        """All indexed ocean_data rows (shared; callers must not mutate it)."""
+        return self.state()["df"]
+
+    @staticmethod
+    def _time_mask(times, start, end):
+        if start is None and end is None:
+            return None
+        m = ~np.isnat(times)
+        if start is not None:
+            m &= times >= np.datetime64(pd.Timestamp(start), "ns")
+        if end is not None:
+            m &= times <= np.datetime64(pd.Timestamp(end), "ns")
+        return m
+
+    @staticmethod
+    def _trees(st):
+        """(tree, first row id, rows) for the main and delta trees."""
+        out = []
+        if st["tree"] is not None:
+            out.append((st["tree"], 0, st["tree_n"]))
+        if st["delta_tree"] is not None:
+            out.append((st["delta_tree"], st["tree_n"], len(st["xyz"]) - st["tree_n"]))
+        return out
+
+    def _knn(self, st, q_xyz, k, tmask):
+        """(chord distances, row ids) of the k nearest rows for each query, inf/-1 padded."""
+        nq = len(q_xyz)
+        cand_d, cand_i = [], []
+        for tree, offset, size in self._trees(st):
+            # over-fetch when a time window will discard candidates
+            kk = min(size, k if tmask is None else max(k * 8, 32))
+            while True:
+                d, i = tree.query(q_xyz, k=kk)
+                d = d.reshape(nq, -1)
+                i = i.reshape(nq, -1)
+                valid = i < size
+                i = np.where(valid, i + offset, -1)
+                if tmask is not None:
+                    valid &= tmask[np.maximum(i, 0)]
+                    if (valid.sum(axis=1) < k).any() and kk < size:
+                        kk = min(size, kk * 4)
+                        continue
+                cand_d.append(np.where(valid, d, np.inf))
+                cand_i.append(i)
+                break
+
+        if not cand_d:
+            return np.full((nq, k), np.inf), np.full((nq, k), -1)
+
+        d = np.concatenate(cand_d, axis=1)
+        i = np.concatenate(cand_i, axis=1)
+        order = np.argsort(d, axis=1)[:, :k]
+        d = np.take_along_axis(d, order, axis=1)
+        i = np.take_along_axis(i, order, axis=1)
+        if d.shape[1] < k:
+            pad = k - d.shape[1]
+            d = np.pad(d, ((0, 0), (0, pad)), constant_values=np.inf)
+            i = np.pad(i, ((0, 0), (0, pad)), constant_values=-1)
+        i = np.where(np.isinf(d), -1, i)
+        return d, i
+
+    def _records(self, st, ids, dists_km) -> List[Dict[str, Any]]:
+        df = st["df"]
+        out = []
+        for i, dkm in zip(ids, dists_km):
+            if i < 0:
+                continue
+            rec = {k: _clean(v) for k, v in df.iloc[int(i)].items()}
+            rec["distance_km"] = round(float(dkm), 3)
+            out.append(rec)
+        return out
+
+    def nearest_batch(
+        self,
+        points: Sequence[Tuple[float, float]],
+        k: int = 1,
+        start=None,
+        end=None,
+        max_km: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        st = self.state()
+        if not len(points):
+            return []
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        d, i = self._knn(st, to_xyz(pts[:, 0], pts[:, 1]), k, self._time_mask(st["times"], start, end))
+        km = chord_to_km(np.where(np.isinf(d), 2, d))
+        if max_km is not None:
+            i = np.where(km <= max_km, i, -1)
+        return [self._records(st, i[r], km[r]) for r in range(len(pts))]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, start=None, end=None, max_km=None):
+        return self.nearest_batch([(lat, lon)], k, start, end, max_km)[0]
+
+    def nearest_cell_batch(
+        self,
+        points: Sequence[Tuple[float, float]],
+        start=None,
+        end=None,
+        max_km: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Every row (all months) at the grid point nearest each query point,
+        so callers can average a cell instead of picking one arbitrary month.
+        """
+        st = self.state()
+        if not len(points):
+            return []
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        tmask = self._time_mask(st["times"], start, end)
+        d, i = self._knn(st, to_xyz(pts[:, 0], pts[:, 1]), 1, tmask)
+        km = chord_to_km(np.where(np.isinf(d[:, 0]), 2, d[:, 0]))
+        anchor = i[:, 0]
+        if max_km is not None:
+            anchor = np.where(km <= max_km, anchor, -1)
+
+        out: List[List[Dict[str, Any]]] = [[] for _ in range(len(pts))]
+        found = np.flatnonzero(anchor >= 0)
+        if not len(found):
+            return out
+
+        # rows of one grid point share its coordinates exactly; the radius only absorbs float noise
+        centers = st["xyz"][anchor[found]]
+        ids: List[List[int]] = [[] for _ in found]
+        for tree, offset, _ in self._trees(st):
+            for j, hits in enumerate(tree.query_ball_point(centers, 1e-9)):
+                ids[j].extend(h + offset for h in hits)
+        for j, q in enumerate(found):
+            rows = np.asarray(sorted(ids[j]), dtype=np.int64)
+            if tmask is not None:
+                rows = rows[tmask[rows]]
+            out[q] = self._records(st, rows, np.full(len(rows), km[q]))
+        return out
+
+    def within(self, lat: float, lon: float, radius_km: float, start=None, end=None, limit: int = 1000):
+        st = self.state()
+        q = to_xyz(lat, lon)
+        r = float(km_to_chord(radius_km))
+        ids = []
+        for tree, offset, _ in self._trees(st):
+            ids.extend(i + offset for i in tree.query_ball_point(q, r))
+        ids = np.asarray(ids, dtype=np.int64)
+
+        tmask = self._time_mask(st["times"], start, end)
+        if tmask is not None and len(ids):
+            ids = ids[tmask[ids]]
+        if not len(ids):
+            return []
+
+        km = chord_to_km(np.linalg.norm(st["xyz"][ids] - q, axis=1))
+        order = np.argsort(km)[:limit]
+        return self._records(st, ids[order], km[order])
+
+
+ocean_index = OceanSpatialIndex()
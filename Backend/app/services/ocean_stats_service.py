@@ -0,0 +1,253 @@
+# app/services/ocean_stats_service.py
+"""
+Ocean statistics catalog, maintained at ingest time.
+
+Per (parameter, region cell, month): moments (count, sum, sum of squares,
+min, max) and a t-digest for quantiles. Per (region cell, month): the
+co-moment matrix of all Y_PARAMETERS over rows where every parameter is
+present, for correlations. All parts are mergeable, so uploads fold into
+the catalog and any region / month selection is a merge of stored pieces.
+
+Values at or below BAD_VALUE (LAS -1e34 fill flags) are excluded; no
+range clipping is applied, so clip thresholds can be read from quantiles.
+"""
+import os
+import tempfile
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.ocean_service import ocean_index
+from app.services.ocean_grid_service import cell_index, flatten_numeric, grid_edges
+from app.services.ocean_pyramid_service import month_index, month_of, row_times
+from app.utils.concurrency import file_lock, file_stamp
+from app.utils.constants import Y_PARAMETERS
+from app.utils import sketches
+
+logger = logging.getLogger("ocean_stats")
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+STATS_PATH = os.getenv(
+    "OCEAN_STATS_PATH", os.path.join(BASE_DIR, "models", "saved_artifacts", "ocean_stats.npz")
+)
+STATS_CELL = float(os.getenv("OCEAN_STATS_CELL_DEG", "2"))
+BAD_VALUE = -1e10
+
+MONTH_SPAN = 1 << 20          # key = (... * MONTH_SPAN) + month
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+PARTS = {
+    "m": ("key", "count", "sum", "sumsq", "min", "max"),
+    "d": ("key", "mean", "weight"),
+    "c": ("key", "n", "mean", "m2"),
+}
+
+
+class OceanStatsCatalog:
+
+    def __init__(self, path: str = STATS_PATH, cell: float = STATS_CELL):
+        self.path = path
+        self.cell = cell
+        self.edges = grid_edges(cell)
+        self.n_cells = (len(self.edges[0]) - 1) * (len(self.edges[1]) - 1)
+        self._lock = threading.Lock()
+        self._state = None
+        self._mtime = None
+        self._memo: Dict[tuple, Any] = {}
+
+    # ---------- keys ----------
+
+    def _key(self, p, cell, month):
+        # cell -1 (outside OCEAN_EXTENT) is kept as its own region
+        return (p * (self.n_cells + 1) + (cell + 1)) * MONTH_SPAN + month
+
+    def _split(self, key):
+        pc, month = np.divmod(key, MONTH_SPAN)
+        p, cell = np.divmod(pc, self.n_cells + 1)
+        return p, cell - 1, month
+
+    # ---------- building ----------
+
+    def _sketch(self, df: pd.DataFrame, times: np.ndarray) -> Dict[str, Dict[str, np.ndarray]]:
+        lat, lon = flatten_numeric(df["lat"]), flatten_numeric(df["lon"])
+        cell = cell_index(lat, lon, *self.edges)
+        month = month_index(times)
+
+        cols = np.column_stack([
+            flatten_numeric(df[p]) if p in df.columns else np.full(len(df), np.nan)
+            for p in Y_PARAMETERS
+        ])
+        valid = np.isfinite(cols) & (cols > BAD_VALUE)
+
+        keys, vals = [], []
+        for p in range(len(Y_PARAMETERS)):
+            ok = valid[:, p]
+            keys.append(self._key(p, cell[ok], month[ok]))
+            vals.append(cols[ok, p])
+        keys, vals = np.concatenate(keys), np.concatenate(vals)
+
+        full = valid.all(axis=1)
+        return {
+            "m": sketches.moments_of(keys, vals),
+            "d": sketches.digest(keys, vals),
+            "c": sketches.comoments_of(self._key(0, cell[full], month[full]), cols[full]),
+        }
+
+    @staticmethod
+    def _merge(a, b):
+        cat = {part: {k: np.concatenate([a[part][k], b[part][k]]) for k in PARTS[part]} for part in PARTS}
+        return {
+            "m": sketches.moments(*(cat["m"][k] for k in PARTS["m"])),
+            "d": sketches.digest(*(cat["d"][k] for k in PARTS["d"])),
+            "c": sketches.comoments(*(cat["c"][k] for k in PARTS["c"])),
+        }
+
+    def _save(self, state):
+        root = os.path.dirname(self.path)
+        os.makedirs(root, exist_ok=True)
+        # unique temp name: several workers may save at once
+        fd, tmp = tempfile.mkstemp(dir=root, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **{f"{part}_{k}": v for part, arrays in state.items() for k, v in arrays.items()})
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._state, self._mtime = state, file_stamp(self.path)
+        self._memo.clear()
+
+    def build(self) -> int:
+        st = ocean_index.state()
+        state = self._sketch(st["df"], st["times"])
+        with self._lock, file_lock(self.path):
+            self._save(state)
+        logger.info("ocean stats catalog built from %d rows", len(st["df"]))
+        return len(st["df"])
+
+    def add_rows(self, rows: List[Dict[str, Any]]):
+        """Merge sketches of freshly uploaded rows; no-op until the catalog exists."""
+        if not rows or not os.path.exists(self.path):
+            return
+        df = pd.DataFrame(rows)
+        if "lat" not in df.columns or "lon" not in df.columns:
+            return
+        delta = self._sketch(df, row_times(df))
+        # other workers fold their uploads into the same file: read-merge-write under one lock
+        with self._lock, file_lock(self.path):
+            self._save(self._merge(self.state(), delta))
+
+    # ---------- reading ----------
+
+    def state(self):
+        """Catalog arrays, built on first use and re-read when another worker rewrote them."""
+        if not os.path.exists(self.path):
+            self.build()
+        mtime = file_stamp(self.path)
+        if self._mtime != mtime:
+            with np.load(self.path) as z:
+                state = {part: {k: z[f"{part}_{k}"] for k in PARTS[part]} for part in PARTS}
+            self._state, self._mtime = state, mtime
+            self._memo.clear()
+        return self._state
+
+    def _select(self, key, p=None, cells=None, start=None, end=None) -> np.ndarray:
+        kp, kc, km = self._split(key)
+        m = np.ones(len(key), dtype=bool)
+        if p is not None:
+            m &= kp == p
+        if cells is not None:
+            m &= np.isin(kc, cells)
+        if start is not None:
+            m &= km >= month_of(start)
+        if end is not None:
+            m &= (km <= month_of(end)) & (km > 0)
+        return m
+
+    def cells_in(self, lat_min=None, lat_max=None, lon_min=None, lon_max=None) -> Optional[np.ndarray]:
+        """Region cells whose centre lies in the box; None = no spatial filter."""
+        if all(v is None for v in (lat_min, lat_max, lon_min, lon_max)):
+            return None
+        lat_e, lon_e = self.edges
+        clat = (lat_e[:-1] + lat_e[1:]) / 2
+        clon = (lon_e[:-1] + lon_e[1:]) / 2
+        i = np.flatnonzero((clat >= (lat_min if lat_min is not None else -90))
+                           & (clat <= (lat_max if lat_max is not None else 90)))
+        j = np.flatnonzero((clon >= (lon_min if lon_min is not None else -180))
+                           & (clon <= (lon_max if lon_max is not None else 360)))
+        return (i[:, None] * len(clon) + j[None, :]).ravel()
+
+    def _memoized(self, name, args, fn):
+        self.state()
+        key = (name,) + tuple(tuple(a) if isinstance(a, (list, np.ndarray)) else a for a in args)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._memo[key] = fn()
+        return hit
+
+    def summary(self, param: str, cells=None, start=None, end=None) -> Dict[str, Any]:
+        """count / mean / std / min / max and QUANTILES for one parameter."""
+        def compute():
+            st = self.state()
+            p = Y_PARAMETERS.index(param)
+            mm = self._select(st["m"]["key"], p, cells, start, end)
+            n = int(st["m"]["count"][mm].sum())
+            if not n:
+                return {"param": param, "count": 0}
+            total, sumsq = st["m"]["sum"][mm].sum(), st["m"]["sumsq"][mm].sum()
+            vmin, vmax = float(st["m"]["min"][mm].min()), float(st["m"]["max"][mm].max())
+
+            dm = self._select(st["d"]["key"], p, cells, start, end)
+            d = sketches.digest(np.zeros(int(dm.sum()), dtype=np.int64), st["d"]["mean"][dm], st["d"]["weight"][dm])
+            qs = sketches.digest_quantiles(d["mean"], d["weight"], QUANTILES, vmin, vmax)
+
+            mean = total / n
+            return {
+                "param": param,
+                "count": n,
+                "mean": float(mean),
+                "std": float(np.sqrt(max(sumsq / n - mean * mean, 0.0))),
+                "min": vmin,
+                "max": vmax,
+                "quantiles": {f"{q:g}": float(v) for q, v in zip(QUANTILES, qs)},
+                "_digest": d,
+            }
+        return self._memoized("summary", (param, cells, start, end), compute)
+
+    def clip_range(self, param: str) -> Optional[tuple]:
+        """(1%, 99%) quantiles used to trim outliers before plotting; None without data."""
+        s = self.summary(param)
+        if not s["count"]:
+            return None
+        qs = s["quantiles"]
+        return qs["0.01"], qs["0.99"]
+
+    def density(self, param: str, points: int = 200, bandwidth: int = 5):
+        """(coords, density) between the clip thresholds, from the digest CDF (for violins)."""
+        s = self.summary(param)
+        lo, hi = self.clip_range(param)
+        coords = np.linspace(lo, hi, points + 1)
+        cdf = sketches.digest_cdf(s["_digest"]["mean"], s["_digest"]["weight"], coords, s["min"], s["max"])
+        dens = np.diff(cdf) / np.diff(coords)
+        kernel = np.exp(-0.5 * (np.arange(-3 * bandwidth, 3 * bandwidth + 1) / bandwidth) ** 2)
+        dens = np.convolve(dens, kernel / kernel.sum(), mode="same")
+        return (coords[:-1] + coords[1:]) / 2, dens
+
+    def correlation(self, cells=None, start=None, end=None) -> pd.DataFrame:
+        """Pearson correlation of Y_PARAMETERS over rows where all are present."""
+        def compute():
+            st = self.state()
+            m = self._select(st["c"]["key"], None, cells, start, end)
+            if not m.any():
+                return pd.DataFrame(np.nan, index=Y_PARAMETERS, columns=Y_PARAMETERS)
+            tot = sketches.comoments(np.zeros(int(m.sum()), dtype=np.int64),
+                                     st["c"]["n"][m], st["c"]["mean"][m], st["c"]["m2"][m])
+            return pd.DataFrame(sketches.correlation(tot["m2"][0]), index=Y_PARAMETERS, columns=Y_PARAMETERS)
+        return self._memoized("corr", (cells, start, end), compute)
+
+
+ocean_stats = OceanStatsCatalog()
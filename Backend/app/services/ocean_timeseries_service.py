@@ -0,0 +1,153 @@
+# app/services/ocean_timeseries_service.py
+"""
+Resampled ocean time series with monthly climatology and anomalies.
+
+Rows come from the shared ocean index, selected by an optional lat/lon
+box and/or station (its own rows, or everything within radius_km of the
+station's mean position). Values are binned to day / week / month with
+one vectorized reduction; the climatology is the mean of monthly means
+per calendar month (so well-sampled years do not dominate), and each
+bin's anomaly is its mean minus the climatology averaged over its rows.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.ocean_service import ocean_index, haversine_km
+from app.services.ocean_grid_service import flatten_numeric
+from app.utils import sketches
+
+BAD_VALUE = -1e10
+FREQS = ["day", "week", "month"]
+CACHE_SIZE = 64
+
+
+def bin_starts(times: np.ndarray, freq: str) -> np.ndarray:
+    """Start of the day / ISO week (Monday) / month containing each time."""
+    days = times.astype("datetime64[D]")
+    if freq == "day":
+        return days
+    if freq == "week":
+        d = days.astype(np.int64)
+        return ((d + 3) // 7 * 7 - 3).astype("datetime64[D]")   # 1970-01-01 was a Thursday
+    return times.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _summarise(key: np.ndarray, values: np.ndarray) -> Dict[str, np.ndarray]:
+    m = sketches.moments_of(key, values)
+    n = m["count"].astype(np.float64)
+    mean = m["sum"] / n
+    var = np.maximum(m["sumsq"] / n - mean * mean, 0.0)
+    return {"key": m["key"], "count": m["count"], "mean": mean, "std": np.sqrt(var),
+            "min": m["min"], "max": m["max"]}
+
+
+class OceanTimeSeries:
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._state = None   # index state the cache was computed from
+        self.size = size
+
+    # ---------- selection ----------
+
+    @staticmethod
+    def _mask(st, lat_min=None, lat_max=None, lon_min=None, lon_max=None,
+              station_id=None, radius_km=None) -> Optional[np.ndarray]:
+        df = st["df"]
+        m = np.ones(len(df), dtype=bool)
+        if any(v is not None for v in (lat_min, lat_max, lon_min, lon_max)):
+            lat, lon = df["lat"].to_numpy(), df["lon"].to_numpy()
+            if lat_min is not None:
+                m &= lat >= lat_min
+            if lat_max is not None:
+                m &= lat <= lat_max
+            if lon_min is not None:
+                m &= lon >= lon_min
+            if lon_max is not None:
+                m &= lon <= lon_max
+        if station_id is not None:
+            if "station_id" not in df.columns:
+                return None
+            at = (df["station_id"].astype(str) == str(station_id)).to_numpy()
+            if not at.any():
+                return None
+            if radius_km is None:
+                m &= at
+            else:
+                lat, lon = df["lat"].to_numpy(), df["lon"].to_numpy()
+                m &= haversine_km(lat[at].mean(), lon[at].mean(), lat, lon) <= radius_km
+        return m
+
+    # ---------- computing ----------
+
+    def _compute(self, st, param, freq, mask, start, end) -> Optional[Dict[str, Any]]:
+        df = st["df"]
+        if param not in df.columns:
+            return None
+        times = st["times"]
+        values = flatten_numeric(df[param])
+        ok = mask & ~np.isnat(times) & np.isfinite(values) & (values > BAD_VALUE)
+        window = ocean_index.time_mask(start, end, state=st)
+        if window is not None:
+            ok &= window
+        if not ok.any():
+            return None
+        t, v = times[ok], values[ok]
+
+        # resampled bins
+        starts = bin_starts(t, freq)
+        bins = _summarise(starts.astype(np.int64), v)
+
+        # climatology: mean of (year, month) means per calendar month
+        ym = t.astype("datetime64[M]").astype(np.int64)        # months since 1970-01
+        monthly = _summarise(ym, v)
+        moy = monthly["key"] % 12                               # 0 = January
+        clim_n = np.bincount(moy, minlength=12)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            clim = np.bincount(moy, weights=monthly["mean"], minlength=12) / clim_n
+            clim_sq = np.bincount(moy, weights=monthly["mean"] ** 2, minlength=12) / clim_n
+        clim_std = np.sqrt(np.maximum(clim_sq - clim * clim, 0.0))
+
+        # per-row climatology averaged within each bin (weeks can straddle two months)
+        row_bin = np.searchsorted(bins["key"], starts.astype(np.int64))
+        row_clim = clim[ym % 12]
+        bins["climatology"] = np.bincount(row_bin, weights=row_clim, minlength=len(bins["key"])) / bins["count"]
+        bins["anomaly"] = bins["mean"] - bins["climatology"]
+        bins["time"] = bins.pop("key").astype("datetime64[D]")
+
+        return {
+            "rows": int(ok.sum()),
+            "bins": bins,
+            "climatology": {"month": np.arange(1, 13), "mean": clim, "std": clim_std, "years": clim_n},
+        }
+
+    def series(self, param: str, freq: str = "month", lat_min=None, lat_max=None, lon_min=None,
+               lon_max=None, station_id=None, radius_km=None, start=None, end=None) -> Optional[Dict[str, Any]]:
+        """Cached per (param, region, frequency, window); recomputed when the index changes."""
+        st = ocean_index.state()
+        key = (param, freq, lat_min, lat_max, lon_min, lon_max, station_id, radius_km, start, end)
+        with self._lock:
+            if self._state is not st:
+                self._cache.clear()
+                self._state = st
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        mask = self._mask(st, lat_min, lat_max, lon_min, lon_max, station_id, radius_km)
+        out = None if mask is None else self._compute(st, param, freq, mask, start, end)
+
+        with self._lock:
+            if self._state is not st:
+                return out
+            self._cache[key] = out
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return out
+
+
+ocean_timeseries = OceanTimeSeries()
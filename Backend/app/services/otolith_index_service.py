@@ -0,0 +1,152 @@
+# app/services/otolith_index_service.py
+import io
+import os
+import queue
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+from PIL import Image
+
+from app.repositories.tables import otolith_repo
+from app.models import inference_retrieval as retrieval
+
+logger = logging.getLogger("otolith_index_service")
+
+BATCH_SIZE = int(os.getenv("OTOLITH_INDEX_BATCH", "16"))
+FLUSH_SECONDS = float(os.getenv("OTOLITH_INDEX_FLUSH_S", "5"))
+
+META_FIELDS = [
+    "otolith_id", "scientific_name", "family", "locality",
+    "water_body", "collection_depth_m", "detail_url",
+]
+
+
+def index_key(row: Dict[str, Any]) -> Optional[str]:
+    """Name stored in meta['image'] — the object key inside the storage bucket."""
+    path = row.get("storage_path")
+    if not path:
+        return None
+    return path.rstrip("/").rsplit("/", 1)[-1]
+
+
+# ============================
+# BACKGROUND INDEXER
+# ============================
+
+class OtolithIndexer:
+    """
+    Collects newly stored otolith images, embeds them in batches on a
+    background thread and appends each batch to the retrieval index as a shard.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_seconds: float = FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.indexed = 0
+        self.failed = 0
+        self.shards: List[str] = []
+        self.last_error: Optional[str] = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="otolith-indexer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> int:
+        """Queue otolith rows that have a `storage_path`; already indexed images are skipped."""
+        known = retrieval.indexed_images()
+        added = 0
+        for row in rows:
+            key = index_key(row)
+            if not key or key in known:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                self._pending.add(key)
+            self._queue.put(row)
+            added += 1
+        if added:
+            self._ensure_worker()
+        return added
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._index_batch(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                self.last_error = str(e)
+                logger.error("Otolith index batch failed: %s", e)
+            finally:
+                with self._lock:
+                    for row in batch:
+                        self._pending.discard(index_key(row))
+
+    def _index_batch(self, batch: List[Dict[str, Any]]):
+        images, metas = [], []
+        for row in batch:
+            try:
+                resp = requests.get(row["storage_path"], timeout=12)
+                resp.raise_for_status()
+                images.append(Image.open(io.BytesIO(resp.content)))
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Could not fetch otolith image %s: %s", row.get("storage_path"), e)
+                continue
+
+            m = {"image": index_key(row)}
+            m.update({k: row.get(k) for k in META_FIELDS})
+            metas.append(m)
+
+        if not images:
+            return
+
+        embs = retrieval.embed_batch(images)
+        name = retrieval.append_shard(embs, metas)
+        self.indexed += len(metas)
+        self.shards.append(name)
+        logger.info("Indexed %d otolith images into %s", len(metas), name)
+
+    def status(self) -> Dict[str, Any]:
+        idx = retrieval.current_index()
+        return {
+            "queued": self._queue.qsize(),
+            "pending": len(self._pending),
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "index_size": idx["rows"],
+            "shards": len(idx["shards"]),
+            "worker_alive": bool(self._thread and self._thread.is_alive()),
+            "last_error": self.last_error,
+        }
+
+
+indexer = OtolithIndexer()
+
+
+def sync_from_storage(limit: int = 10000) -> int:
+    """Queue every stored otolith image that is not searchable yet."""
+    return indexer.enqueue(otolith_repo.with_storage(limit))
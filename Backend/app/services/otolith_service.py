@@ -0,0 +1,133 @@
+# app/services/otolith_service.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.models import inference_retrieval as retrieval
+
+
+# ============================
+# LRU CACHE (VERSIONED)
+# ============================
+
+class LRUCache:
+    """
+    Thread-safe LRU cache. Every entry belongs to one `version`; asking for
+    a different version drops the whole cache, so a new model or reference
+    index can never serve stale results.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str):
+        if version != self.version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version: str):
+        with self._lock:
+            self._check_version(version)
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any, version: str):
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+CACHE_SIZE = int(os.getenv("OTOLITH_CACHE_SIZE", "512"))
+
+# embeddings only depend on the model, predictions also on the reference index
+embedding_cache = LRUCache(CACHE_SIZE)
+prediction_cache = LRUCache(CACHE_SIZE)
+
+
+# ============================
+# RETRIEVAL WITH CACHE
+# ============================
+
+def image_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_embedding(content: bytes, digest: Optional[str] = None):
+    digest = digest or image_digest(content)
+    q = embedding_cache.get(digest, retrieval.MODEL_VERSION)
+    if q is None:
+        q = retrieval.embed_bytes(content)
+        embedding_cache.put(digest, q, retrieval.MODEL_VERSION)
+    return q
+
+
+def predict_from_bytes(
+    content: bytes,
+    filename: str,
+    topk: int = 5,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Retrieval prediction for raw image bytes; duplicate uploads skip the forward pass."""
+    digest = image_digest(content)
+    index_version = f"{retrieval.MODEL_VERSION}|{retrieval.index_version()}"
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+    key = (digest, topk, tuple(sorted(filters.items())))
+
+    results = prediction_cache.get(key, index_version)
+    cached = results is not None
+    if not cached:
+        q = get_embedding(content, digest)
+        results = retrieval.search_embedding(q, topk, filters)
+        prediction_cache.put(key, results, index_version)
+
+    return {
+        "query_image": filename,
+        "image_sha256": digest,
+        "filters": filters,
+        "cached": cached,
+        "results": [dict(r) for r in results],
+    }
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "prediction_cache": prediction_cache.stats(),
+    }
@@ -0,0 +1,153 @@
+# app/services/rarefaction_service.py
+from typing import Any, Dict, Optional
+
+import numpy as np
+from scipy.special import gammaln
+
+from app.services.biodiversity_service import biodiversity_engine
+
+DEFAULT_POINTS = 40
+DEFAULT_BOOT = 1000
+
+
+def _counts(abundances) -> np.ndarray:
+    a = np.asarray(abundances, dtype=np.int64)
+    return a[a > 0]
+
+
+# ============================
+# RAREFACTION (ANALYTICAL)
+# ============================
+
+def rarefaction_curve(abundances, sizes=None, points: int = DEFAULT_POINTS):
+    """
+    Expected richness E[S_n] = sum_i 1 - C(N - N_i, n) / C(N, n) (hypergeometric),
+    evaluated for all sample sizes n at once. Returns (sizes, expected_richness).
+    """
+    a = _counts(abundances)
+    N = int(a.sum())
+    if N == 0:
+        return np.array([], dtype=np.int64), np.array([])
+
+    if sizes is None:
+        sizes = np.unique(np.linspace(1, N, min(points, N)).round().astype(np.int64))
+    n = np.asarray(sizes, dtype=np.int64)[:, None]  # (sizes, 1)
+    rest = (N - a)[None, :]                          # (1, species)
+
+    # log C(N - N_i, n) - log C(N, n); species with N - N_i < n are certain to be seen
+    with np.errstate(invalid="ignore"):
+        log_q = (
+            gammaln(rest + 1) - gammaln(np.maximum(rest - n, 0) + 1)
+            - gammaln(N + 1) + gammaln(N - n + 1)
+        )
+    q = np.where(rest >= n, np.exp(log_q), 0.0)      # P(species i absent from n draws)
+    expected = (1 - q).sum(axis=1)
+
+    return n[:, 0], expected
+
+
+# ============================
+# RICHNESS ESTIMATOR
+# ============================
+
+def chao1(abundances) -> float:
+    """Bias-corrected Chao1: S_obs + (N - 1) / N * f1 (f1 - 1) / (2 (f2 + 1))."""
+    a = _counts(abundances)
+    n = int(a.sum())
+    if not n:
+        return 0.0
+    f1 = int((a == 1).sum())
+    f2 = int((a == 2).sum())
+    return float(len(a) + (n - 1) / n * f1 * (f1 - 1) / (2 * (f2 + 1)))
+
+
+def _chao1_rows(samples: np.ndarray) -> np.ndarray:
+    s_obs = (samples > 0).sum(axis=1)
+    n = samples.sum(axis=1)
+    f1 = (samples == 1).sum(axis=1)
+    f2 = (samples == 2).sum(axis=1)
+    return s_obs + (n - 1) / np.maximum(n, 1) * f1 * (f1 - 1) / (2 * (f2 + 1))
+
+
+# ============================
+# BOOTSTRAP CONFIDENCE INTERVALS
+# ============================
+
+def bootstrap_ci(abundances, n_boot: int = DEFAULT_BOOT, ci: float = 0.95, seed: Optional[int] = 0):
+    """
+    Percentile CIs for Shannon, Simpson, richness and Chao1. All replicates
+    are drawn in one multinomial call and the metrics are computed row-wise.
+    """
+    a = _counts(abundances)
+    N = int(a.sum())
+    if N == 0:
+        return {}
+
+    rng = np.random.default_rng(seed)
+    samples = rng.multinomial(N, a / N, size=n_boot)   # (n_boot, species)
+
+    p = samples / N
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plogp = np.where(p > 0, p * np.log(p), 0.0)
+    boot = {
+        "shannon": -plogp.sum(axis=1),
+        "simpson": (p ** 2).sum(axis=1),
+        "richness": (samples > 0).sum(axis=1).astype(np.float64),
+        "chao1": _chao1_rows(samples),
+    }
+
+    p0 = a / N
+    point = {
+        "shannon": float(-(p0 * np.log(p0)).sum()),
+        "simpson": float((p0 ** 2).sum()),
+        "richness": float(len(a)),
+        "chao1": chao1(a),
+    }
+
+    lo, hi = (1 - ci) / 2 * 100, (1 + ci) / 2 * 100
+    out = {}
+    for k, vals in boot.items():
+        low, high = np.percentile(vals, [lo, hi])
+        out[k] = {"estimate": point[k], "low": float(low), "high": float(high)}
+    return out
+
+
+# ============================
+# PER-LOCALITY REPORT
+# ============================
+
+def diversity_report(
+    locality: Optional[str] = None,
+    points: int = DEFAULT_POINTS,
+    n_boot: int = DEFAULT_BOOT,
+    ci: float = 0.95,
+) -> Dict[str, Any]:
+    """Rarefaction curves, Chao1 and bootstrap CIs for one or all localities."""
+    idx = biodiversity_engine.indices()
+    locs = [locality] if locality else list(idx.index)
+    locs = [l for l in locs if l in idx.index]
+    if not locs:
+        return {"localities": []}
+
+    # common depth for comparing localities with unequal sampling effort
+    depth = int(idx.loc[locs, "abundance"].min())
+
+    results = []
+    for loc in locs:
+        a = biodiversity_engine.abundances(loc)
+        sizes, expected = rarefaction_curve(a, points=points)
+        _, at_depth = rarefaction_curve(a, sizes=[depth])
+        results.append({
+            "locality": loc,
+            "abundance": int(a.sum()),
+            "observed_richness": int(len(a)),
+            "chao1": chao1(a),
+            "rarefied_richness": float(at_depth[0]) if len(at_depth) else None,
+            "rarefaction": {
+                "sizes": sizes.tolist(),
+                "expected_richness": expected.round(4).tolist(),
+            },
+            "bootstrap": bootstrap_ci(a, n_boot=n_boot, ci=ci),
+        })
+
+    return {"rarefaction_depth": depth, "confidence": ci, "localities": results}
@@ -0,0 +1,151 @@
+# app/services/richness_grid_service.py
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.biodiversity_service import biodiversity_engine
+
+SQRT3 = np.sqrt(3.0)
+
+# cell ids pack two signed indices into one int64: (i + OFFSET) * STRIDE + (j + OFFSET)
+OFFSET = 1 << 20
+STRIDE = 1 << 21
+
+CACHE_ENTRIES = 32
+
+
+# ============================
+# CELL ENCODING
+# ============================
+
+def _encode(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    return (i.astype(np.int64) + OFFSET) * STRIDE + (j.astype(np.int64) + OFFSET)
+
+
+def _decode(cell_ids: np.ndarray):
+    return cell_ids // STRIDE - OFFSET, cell_ids % STRIDE - OFFSET
+
+
+def square_cells(lat, lon, size: float) -> np.ndarray:
+    """Fixed lat/lon boxes of `size` degrees."""
+    return _encode(np.floor(lat / size), np.floor(lon / size))
+
+
+def hex_cells(lat, lon, size: float) -> np.ndarray:
+    """
+    Pointy-top hexagons of circumradius `size` degrees on the lon/lat plane
+    (axial q, r coordinates with cube rounding).
+    """
+    x = np.asarray(lon, dtype=np.float64) / size
+    y = np.asarray(lat, dtype=np.float64) / size
+    q = SQRT3 / 3 * x - y / 3
+    r = 2.0 / 3 * y
+
+    # cube rounding: round all three, fix the component with the largest error
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return _encode(rq, rr)
+
+
+def cell_centers(grid: str, cell_ids: np.ndarray, size: float):
+    a, b = _decode(cell_ids)
+    if grid == "hex":
+        q, r = a, b
+        return size * 1.5 * r, size * SQRT3 * (q + r / 2)       # lat, lon
+    return (a + 0.5) * size, (b + 0.5) * size
+
+
+def cell_vertices(grid: str, lat: np.ndarray, lon: np.ndarray, size: float) -> np.ndarray:
+    """(cells, corners, 2) polygon vertices as (lon, lat), for a PolyCollection."""
+    if grid == "hex":
+        ang = np.radians(30 + 60 * np.arange(6))
+        dx, dy = size * np.cos(ang), size * np.sin(ang)
+    else:
+        h = size / 2
+        dx, dy = np.array([-h, h, h, -h]), np.array([-h, -h, h, h])
+    return np.stack([lon[:, None] + dx, lat[:, None] + dy], axis=-1)
+
+
+CELL_FUNCS = {"square": square_cells, "hex": hex_cells}
+
+
+# ============================
+# RICHNESS PER CELL
+# ============================
+
+def _grid(grid: str, size: float) -> Dict[str, Any]:
+    lat, lon, species, version = biodiversity_engine.occurrences()
+    if not len(lat):
+        empty = np.empty(0, dtype=np.int64)
+        return {"version": version, "cell_id": empty, "lat": empty, "lon": empty,
+                "richness": empty, "occurrences": empty}
+
+    cells = CELL_FUNCS[grid](lat, lon, size)
+    occ_ids, occurrences = np.unique(cells, return_counts=True)
+
+    # unique (cell, species) pairs -> distinct species per cell
+    n_species = int(species.max()) + 1
+    pairs = np.unique(cells * n_species + species)
+    cell_ids, richness = np.unique(pairs // n_species, return_counts=True)
+
+    c_lat, c_lon = cell_centers(grid, cell_ids, size)
+    return {
+        "version": version,
+        "cell_id": cell_ids,
+        "lat": c_lat,
+        "lon": c_lon,
+        "richness": richness,
+        "occurrences": occurrences[np.searchsorted(occ_ids, cell_ids)],
+    }
+
+
+class RichnessGrid:
+    """Species richness per spatial cell, cached per (grid, cell size) and data version."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.max_entries = max_entries
+
+    def compute(self, grid: str = "square", size: float = 1.0) -> Dict[str, Any]:
+        if grid not in CELL_FUNCS:
+            raise ValueError(f"Unknown grid type: {grid}")
+        key = (grid, float(size))
+        version = biodiversity_engine.data_version()
+
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit["version"] == version:
+                self._cache.move_to_end(key)
+                return hit
+
+        result = _grid(grid, size)
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def records(self, grid: str = "square", size: float = 1.0):
+        g = self.compute(grid, size)
+        return [
+            {
+                "cell_id": int(cid),
+                "lat": round(float(la), 6),
+                "lon": round(float(lo), 6),
+                "richness": int(s),
+                "occurrences": int(n),
+            }
+            for cid, la, lo, s, n in zip(g["cell_id"], g["lat"], g["lon"], g["richness"], g["occurrences"])
+        ]
+
+
+richness_grid = RichnessGrid()
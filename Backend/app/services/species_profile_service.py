@@ -0,0 +1,311 @@
+# app/services/species_profile_service.py
+"""
+Materialized per-species profiles (taxonomy + otolith occurrences + ocean
+context at the occurrence points). Profiles are rebuilt only for species
+touched by an upload and served by key lookup.
+
+Backing table (Supabase):
+
+    create table species_profile (
+        scientific_name text primary key,
+        family text,
+        occurrence_count int,
+        localities jsonb,
+        water_bodies jsonb,
+        depth_min float8, depth_max float8,
+        lat_min float8, lat_max float8, lon_min float8, lon_max float8,
+        env_means jsonb,
+        env_points int,
+        taxonomy jsonb,
+        updated_at timestamptz
+    );
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.repositories.tables import profile_repo
+from app.services.integration_service import (
+    get_ocean_environment,
+    get_otolith_by_species,
+    group_by,
+    select_in,
+)
+from app.services.ocean_service import ocean_index, EARTH_RADIUS_KM
+from app.utils.constants import Y_PARAMETERS
+from app.utils.helpers import fetch_all
+
+logger = logging.getLogger("species_profile_service")
+
+PROFILE_TABLE = "species_profile"
+# ocean rows farther than this from an occurrence do not describe its environment
+ENV_MAX_KM = float(os.getenv("PROFILE_ENV_MAX_KM", "50"))
+# other workers may refresh the table, so local copies expire
+CACHE_TTL_S = float(os.getenv("PROFILE_CACHE_TTL_S", "300"))
+# LAS -1e34 fill flags
+BAD_VALUE = -1e10
+
+_cache: Dict[str, Any] = {}  # scientific_name -> (stored_at, profile)
+_missing: Dict[str, float] = {}  # scientific_name -> time a lookup found nothing
+_lock = threading.Lock()
+
+
+def _cached(name: str) -> Optional[Dict[str, Any]]:
+    hit = _cache.get(name)
+    if hit and time.monotonic() - hit[0] < CACHE_TTL_S:
+        return hit[1]
+    return None
+
+
+def _remember(profile: Dict[str, Any]):
+    with _lock:
+        _cache[profile["scientific_name"]] = (time.monotonic(), profile)
+        _missing.pop(profile["scientific_name"], None)
+
+
+def _known_missing(name: str) -> bool:
+    seen = _missing.get(name)
+    return seen is not None and time.monotonic() - seen < CACHE_TTL_S
+
+
+def _forget_missing(names: Iterable[str]):
+    """New otolith / taxonomy data for these species: retry them on the next lookup."""
+    with _lock:
+        for n in names:
+            _missing.pop(n, None)
+
+
+def _floats(rows, key) -> np.ndarray:
+    vals = []
+    for r in rows:
+        try:
+            vals.append(float(r.get(key)))
+        except (TypeError, ValueError):
+            continue
+    return np.array(vals, dtype=np.float64)
+
+
+def _bounds(vals: np.ndarray):
+    if not len(vals):
+        return None, None
+    return float(vals.min()), float(vals.max())
+
+
+def _cell_means(rows: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    out = {}
+    for p in Y_PARAMETERS:
+        vals = _floats(rows, p)
+        vals = vals[np.isfinite(vals) & (vals > BAD_VALUE)]
+        out[p] = float(vals.mean()) if len(vals) else None
+    return out
+
+
+def build_profiles(species: Iterable[str]) -> List[Dict[str, Any]]:
+    """Compute profiles for the given species with set-based reads and one spatial join."""
+    names = sorted({s.strip() for s in species if s and s.strip()})
+    if not names:
+        return []
+
+    otoliths = group_by(select_in("otolith_data", "scientific_name", names), "scientific_name")
+    taxonomy = {r.get("scientific_name"): r for r in select_in("taxonomy_data", "scientific_name", names)}
+
+    # nearest ocean grid point for every occurrence of every species
+    points, owner = [], []
+    for name in names:
+        for r in otoliths.get(name, []):
+            if r.get("lat") is not None and r.get("lon") is not None:
+                points.append((float(r["lat"]), float(r["lon"])))
+                owner.append(name)
+    # one environment per occurrence: the mean over every month at its nearest grid point
+    env_rows: Dict[str, List[Dict[str, Any]]] = {}
+    for name, cell in zip(owner, ocean_index.nearest_cell_batch(points, max_km=ENV_MAX_KM)):
+        if cell:
+            env_rows.setdefault(name, []).append(_cell_means(cell))
+
+    now = datetime.utcnow().isoformat()
+    profiles = []
+    for name in names:
+        occ = otoliths.get(name, [])
+        tax = taxonomy.get(name)
+        if not occ and not tax:
+            continue
+
+        env = env_rows.get(name, [])
+        env_means = {}
+        for p in Y_PARAMETERS:
+            vals = [e[p] for e in env if e[p] is not None]
+            env_means[p] = float(np.mean(vals)) if vals else None
+
+        depth_min, depth_max = _bounds(_floats(occ, "collection_depth_m"))
+        lat_min, lat_max = _bounds(_floats(occ, "lat"))
+        lon_min, lon_max = _bounds(_floats(occ, "lon"))
+        family = (tax or {}).get("family") or next((r.get("family") for r in occ if r.get("family")), None)
+
+        profiles.append({
+            "scientific_name": name,
+            "family": family,
+            "occurrence_count": len(occ),
+            "localities": sorted({r["locality"] for r in occ if r.get("locality")}),
+            "water_bodies": sorted({r["water_body"] for r in occ if r.get("water_body")}),
+            "depth_min": depth_min,
+            "depth_max": depth_max,
+            "lat_min": lat_min,
+            "lat_max": lat_max,
+            "lon_min": lon_min,
+            "lon_max": lon_max,
+            "env_means": env_means,
+            "env_points": len(env),
+            "taxonomy": tax,
+            "updated_at": now,
+        })
+    return profiles
+
+
+def _store(profiles: List[Dict[str, Any]]):
+    for p in profiles:
+        _remember(p)
+    if not profiles:
+        return
+    try:
+        profile_repo.upsert(profiles, on_conflict="scientific_name")
+    except Exception as e:
+        logger.warning("Could not persist species profiles: %s", e)
+
+
+def refresh_species(species: Iterable[str]) -> int:
+    """Rebuild and store the profiles of the given species only."""
+    names = list({s for s in species if s})
+    if not names:
+        return 0
+    _forget_missing(names)
+    profiles = build_profiles(names)
+    _store(profiles)
+    return len(profiles)
+
+
+def _touched(profiles: List[Dict[str, Any]], lats: np.ndarray, lons: np.ndarray) -> List[str]:
+    """
+    Profiles whose padded occurrence box contains at least one uploaded point.
+    Points are bucketed into cells of ENV_MAX_KM so each profile is tested with
+    a summed-area lookup instead of against one box around the whole upload.
+    """
+    pad = np.degrees(ENV_MAX_KM / EARTH_RADIUS_KM)
+    lat0, lon0 = lats.min(), lons.min()
+    r = ((lats - lat0) // pad).astype(np.int64)
+    c = ((lons - lon0) // pad).astype(np.int64)
+    occupied = np.zeros((r.max() + 1, c.max() + 1), dtype=np.int64)
+    occupied[r, c] = 1
+    sat = np.pad(occupied.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+
+    def cell(v, origin, n):
+        return int(np.clip(np.floor((v - origin) / pad), -1, n))
+
+    names = []
+    for p in profiles:
+        try:
+            la0, la1 = float(p["lat_min"]), float(p["lat_max"])
+            lo0, lo1 = float(p["lon_min"]), float(p["lon_max"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        lon_pad = pad / max(np.cos(np.radians(min(max(abs(la0), abs(la1)) + pad, 89.9))), 0.01)
+        r0 = max(cell(la0 - pad, lat0, occupied.shape[0]), 0)
+        r1 = min(cell(la1 + pad, lat0, occupied.shape[0]), occupied.shape[0] - 1)
+        c0 = max(cell(lo0 - lon_pad, lon0, occupied.shape[1]), 0)
+        c1 = min(cell(lo1 + lon_pad, lon0, occupied.shape[1]), occupied.shape[1] - 1)
+        if r0 > r1 or c0 > c1:
+            continue
+        if sat[r1 + 1, c1 + 1] - sat[r0, c1 + 1] - sat[r1 + 1, c0] + sat[r0, c0] > 0:
+            names.append(p["scientific_name"])
+    return names
+
+
+def refresh_near(rows: List[Dict[str, Any]]) -> int:
+    """After an ocean upload: rebuild profiles whose occurrence box is within ENV_MAX_KM of a new point."""
+    df = pd.DataFrame(rows)
+    if df.empty or "lat" not in df.columns or "lon" not in df.columns:
+        return 0
+    lats = pd.to_numeric(df["lat"], errors="coerce").to_numpy(dtype=np.float64)
+    lons = pd.to_numeric(df["lon"], errors="coerce").to_numpy(dtype=np.float64)
+    ok = np.isfinite(lats) & np.isfinite(lons)
+    lats, lons = lats[ok], lons[ok]
+    if not len(lats):
+        return 0
+
+    pad = np.degrees(ENV_MAX_KM / EARTH_RADIUS_KM)
+    lon_pad = pad / max(np.cos(np.radians(min(np.abs(lats).max() + pad, 89.9))), 0.01)
+    try:
+        # the upload's overall box only narrows the candidates; _touched decides per cell
+        candidates = profile_repo.overlapping(
+            float(lats.min() - pad), float(lats.max() + pad),
+            float(lons.min() - lon_pad), float(lons.max() + lon_pad),
+        )
+    except Exception as e:
+        logger.warning("Profile table unavailable, falling back to cached profiles: %s", e)
+        candidates = [p for _, p in list(_cache.values())]
+    return refresh_species(_touched(candidates, lats, lons))
+
+
+def get_profile(scientific_name: str) -> Optional[Dict[str, Any]]:
+    """Single key lookup; a species without a stored profile is materialized on first request."""
+    name = scientific_name.strip()
+    hit = _cached(name)
+    if hit is not None:
+        return hit
+    if _known_missing(name):
+        return None
+
+    try:
+        row = profile_repo.first(scientific_name=name)
+        if row:
+            _remember(row)
+            return row
+    except Exception as e:
+        logger.warning("Profile table unavailable: %s", e)
+
+    refresh_species([name])
+    hit = _cached(name)
+    if hit is None:
+        # unknown species: do not rebuild again until its data changes or the entry expires
+        with _lock:
+            _missing[name] = time.monotonic()
+    return hit
+
+
+def integrate_by_species(scientific_name: str) -> Dict[str, Any]:
+    """/integrate/species response: taxonomy from the stored profile plus the occurrence records."""
+    name = scientific_name.strip()
+    warnings: List[str] = []
+    profile = get_profile(name)
+    try:
+        otoliths = get_otolith_by_species(name)
+    except Exception as e:
+        warnings.append(f"otolith lookup failed: {e}")
+        otoliths = []
+
+    anchor = next((r for r in otoliths if r.get("lat") is not None and r.get("lon") is not None), None)
+    ocean_env = get_ocean_environment(anchor["lat"], anchor["lon"]) if anchor else []
+
+    return {
+        "species": name,
+        "taxonomy": (profile or {}).get("taxonomy"),
+        "otolith_records": otoliths,
+        "ocean_environment": ocean_env,
+        "warnings": warnings,
+    }
+
+
+def rebuild_all(chunk: int = 200) -> int:
+    """Full rebuild (initial backfill): every species seen in otolith or taxonomy data."""
+    names = {r.get("scientific_name") for r in fetch_all("otolith_data", "scientific_name")}
+    names |= {r.get("scientific_name") for r in fetch_all("taxonomy_data", "scientific_name")}
+    names = sorted(n for n in names if n)
+    total = 0
+    for i in range(0, len(names), chunk):
+        total += refresh_species(names[i:i + chunk])
+    return total
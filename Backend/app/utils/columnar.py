@@ -0,0 +1,80 @@
+# app/utils/columnar.py
+"""
+Data-only responses for chart endpoints: a dict of equal-length columns
+plus a small metadata dict, sent as JSON or as an Arrow IPC stream.
+
+Floats go out as float32 (NaN -> null in JSON), datetimes as ISO strings
+in JSON and timestamp[ms] in Arrow. Arrow needs pyarrow, which is optional.
+"""
+import json
+from typing import Any, Dict
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+from app.utils.metrics import span
+
+try:
+    import pyarrow as pa
+except Exception:
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# the `format` enum only offers arrow when pyarrow is installed
+FORMATS = ["json", "arrow"] if pa is not None else ["json"]
+
+
+def _compact(a) -> np.ndarray:
+    a = np.asarray(a)
+    if np.issubdtype(a.dtype, np.datetime64):
+        return a.astype("datetime64[ms]")
+    if np.issubdtype(a.dtype, np.floating):
+        return a.astype(np.float32)
+    if np.issubdtype(a.dtype, np.integer) or a.dtype == bool:
+        return a.astype(np.int32)
+    return a
+
+
+def _json_values(a: np.ndarray) -> list:
+    if np.issubdtype(a.dtype, np.datetime64):
+        text = np.datetime_as_string(a, unit="s")
+        return np.where(np.isnat(a), None, text).tolist()
+    if np.issubdtype(a.dtype, np.floating):
+        # 7 significant digits: float32 precision, without float64 noise in the text
+        return [float(f"{v:.7g}") if np.isfinite(v) else None for v in a]
+    return a.tolist()
+
+
+def _json_safe(v):
+    if isinstance(v, dict):
+        return {k: _json_safe(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return [_json_safe(x) for x in v]
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (float, np.floating)):
+        return float(v) if np.isfinite(v) else None
+    return v
+
+
+def table_response(columns: Dict[str, Any], meta: Dict[str, Any], fmt: str = "json"):
+    with span("encode"):
+        return _table_response(columns, meta, fmt)
+
+
+def _table_response(columns: Dict[str, Any], meta: Dict[str, Any], fmt: str):
+    cols = {k: _compact(v) for k, v in columns.items()}
+    meta = _json_safe(meta)
+
+    if fmt == "arrow":
+        if pa is None:
+            raise HTTPException(400, "Arrow output needs pyarrow on the server; use format=json")
+        table = pa.table({k: pa.array(v) for k, v in cols.items()})
+        table = table.replace_schema_metadata({"meta": json.dumps(meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    return JSONResponse({**meta, "columns": {k: _json_values(v) for k, v in cols.items()}})
@@ -0,0 +1,50 @@
+# app/utils/concurrency.py
+import os
+from contextlib import contextmanager
+from typing import Any, Callable
+
+try:
+    import fcntl
+except Exception:  # not available on Windows
+    fcntl = None
+
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+
+# worker threads for sync handlers and run_blocking (anyio's default is 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run sync work (CPU, blocking clients, file I/O) off the event loop."""
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def configure_threadpool(size: int = THREADPOOL_SIZE):
+    """Resize the shared threadpool; call from inside the running loop (app startup)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive inter-process lock on a sidecar `<path>.lock` file, for
+    read-merge-write cycles on files shared by several workers. Without
+    fcntl (Windows) this is a no-op and only the callers' thread locks apply.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def file_stamp(path: str) -> tuple:
+    """File identity for cache checks: os.replace() swaps the inode even within one mtime tick."""
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
@@ -0,0 +1,25 @@
+# app/utils/constants.py
+
+# ocean parameters stored in ocean_data
+Y_PARAMETERS = [
+    "dic", "mld", "pco2_original", "chl",
+    "no3", "sss", "sst", "deviant_uncertainty"
+]
+
+# x axes offered by the ocean plot routes
+X_OPTIONS = ["lat", "lon", "datetime"]
+
+# valid scientific ranges for cleaning
+RANGE_LIMITS = {
+    "dic": (1950, 2100),
+    "mld": (0, 100),
+    "pco2_original": (250, 550),
+    "chl": (5e-8, 4e-7),
+    "no3": (0.00, 0.06),
+    "sss": (30, 40),
+    "sst": (20, 35),
+    "deviant_uncertainty": (0, 5)
+}
+
+# fixed map extent (degrees) for gridded ocean products: Arabian Sea + Bay of Bengal
+OCEAN_EXTENT = {"lat_min": 0.0, "lat_max": 30.0, "lon_min": 60.0, "lon_max": 100.0}
@@ -0,0 +1,93 @@
+# app/utils/downsample.py
+"""
+Visual downsampling for line / scatter plots.
+
+Both reducers return *indices* into the x-sorted input, so callers can pick
+any aligned columns. Target sizes follow the rendered width: there is no
+point drawing more than a couple of vertices per horizontal pixel.
+"""
+import numpy as np
+import pandas as pd
+
+
+def target_points(width_in: float, dpi: int, per_pixel: float = 1.0) -> int:
+    return max(3, int(width_in * dpi * per_pixel))
+
+
+def as_float(x) -> np.ndarray:
+    """Numeric view of an x column; datetimes become ns since epoch."""
+    x = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    return pd.to_numeric(x, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson 2013): keeps the first and
+    last point and, per bucket, the point forming the largest triangle with
+    the previously kept point and the next bucket's centroid. x must be sorted.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)  # n - 2 inner buckets
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+
+    # next-bucket centroids (the last inner bucket looks at the final point)
+    csx = np.r_[0.0, np.cumsum(x)]
+    csy = np.r_[0.0, np.cumsum(y)]
+    nxt_lo = edges[1:]
+    nxt_hi = np.r_[edges[2:], size]
+    cnt = nxt_hi - nxt_lo
+    cx = (csx[nxt_hi] - csx[nxt_lo]) / cnt
+    cy = (csy[nxt_hi] - csy[nxt_lo]) / cnt
+
+    a = 0
+    for b in range(n - 2):
+        lo, hi = edges[b], edges[b + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx[b]) * (ys - y[a]) - (x[a] - xs) * (cy[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Min and max y per equal-width x bucket (n/2 buckets), vectorized. x must be sorted."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+
+    buckets = max(1, n // 2)
+    span = x[-1] - x[0]
+    b = np.zeros(size, dtype=np.int64) if span <= 0 else np.minimum(
+        ((x - x[0]) / span * buckets).astype(np.int64), buckets - 1
+    )
+    # x is sorted, so buckets are contiguous runs
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    run = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, size]))
+
+    picks = []
+    for reduce in (np.minimum, np.maximum):
+        ext = reduce.reduceat(y, starts)[run]
+        hits = np.flatnonzero(y == ext)
+        _, first = np.unique(run[hits], return_index=True)  # first extreme per run
+        picks.append(hits[first])
+    return np.unique(np.concatenate(picks))
+
+
+def downsample(x, y, n: int, method: str = "lttb"):
+    """
+    Drop NaNs, sort by x and reduce to about n points.
+    Returns (x, y) as the original x type (e.g. datetimes) and float y.
+    """
+    df = pd.DataFrame({"x": x, "y": pd.to_numeric(pd.Series(y), errors="coerce")}).dropna()
+    df = df.sort_values("x", kind="stable")
+    xf = as_float(df["x"])
+    yf = df["y"].to_numpy(dtype=np.float64)
+
+    idx = lttb(xf, yf, n) if method == "lttb" else minmax(xf, yf, n)
+    return df["x"].to_numpy()[idx], yf[idx]
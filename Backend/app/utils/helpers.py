@@ -0,0 +1,9 @@
+# app/utils/helpers.py
+from typing import Any, Dict, List
+
+from app.repositories.tables import repo_for
+
+
+def fetch_all(table: str, columns: str = "*") -> List[Dict[str, Any]]:
+    """Read a whole table (the backend pages past the API row limit)."""
+    return repo_for(table).all(columns)
@@ -0,0 +1,98 @@
+# app/utils/http.py
+"""
+Shared async HTTP client.
+
+One httpx.AsyncClient per process: HTTP/2 when h2 is installed,
+keep-alive pooling across requests, per-phase timeouts, and retries with
+exponential backoff and full jitter. Idempotent calls are retried on
+transport errors and 429/502/503/504. Other calls are only retried when
+the request never reached the server (connect / pool errors, 429).
+"""
+import asyncio
+import logging
+import os
+import random
+from typing import Optional
+
+import httpx
+
+from app.utils.metrics import outbound
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except Exception:
+    HTTP2 = False
+
+logger = logging.getLogger("http")
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+BACKOFF_BASE = 0.2    # seconds; attempt n sleeps U(0, min(CAP, BASE * 2**n))
+BACKOFF_CAP = 5.0
+
+RETRY_STATUS = {429, 502, 503, 504}
+IDEMPOTENT = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                max_keepalive_connections=MAX_KEEPALIVE),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _backoff(attempt: int, resp: Optional[httpx.Response] = None) -> float:
+    retry_after = resp.headers.get("retry-after") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def request(method: str, url: str, idempotent: Optional[bool] = None,
+                  retries: int = RETRIES, service: Optional[str] = None, **kwargs) -> httpx.Response:
+    """
+    client.request() with retry. `timeout=` is passed through per call.
+    Returns the last response (callers decide on raise_for_status).
+    Every attempt is counted in the outbound metrics under `service`
+    (default: the URL host).
+    """
+    service = service or httpx.URL(url).host
+    idempotent = method.upper() in IDEMPOTENT if idempotent is None else idempotent
+    client = http_client()
+    for attempt in range(retries + 1):
+        try:
+            with outbound(service):
+                resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == retries or not (idempotent or isinstance(e, UNSENT_ERRORS)):
+                raise
+            logger.warning("%s %s failed (%s), retry %d", method, url, type(e).__name__, attempt + 1)
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        # 429 means the request was refused unprocessed, so any method may retry it
+        if resp.status_code in RETRY_STATUS and (idempotent or resp.status_code == 429) and attempt < retries:
+            logger.warning("%s %s -> %d, retry %d", method, url, resp.status_code, attempt + 1)
+            await asyncio.sleep(_backoff(attempt, resp))
+            continue
+        return resp
+    raise RuntimeError("unreachable")
@@ -0,0 +1,204 @@
+# app/utils/metrics.py
+"""
+Request timing and Prometheus-style metrics, without extra dependencies.
+
+    MetricsMiddleware    times every HTTP request per route and adds a
+                         Server-Timing header with the request's stages
+    span("render")       times a stage of the current request; repeated
+                         spans of one stage add up. A context manager
+                         (also in async code) or a decorator for sync
+                         functions; threadpool calls share the request
+                         context, plain ThreadPoolExecutor workers do not
+    outbound("ncbi")     counts / times one call to an external service
+
+Stage names in use: db_fetch, db_write, dataframe_build, compute,
+render, encode. render() is the text exposition format served at /metrics. Spans outside
+a request (background tasks, startup) are recorded under route
+"background".
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for lv, v in items:
+            yield f"{self.name}{_labels(self.labels, lv)} {v:g}"
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}   # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(label_values)
+            if s is None:
+                s = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((lv, list(s)) for lv, s in self._series.items())
+        names = self.labels + ("le",)
+        for lv, s in items:
+            cum = 0
+            for b, n in zip(self.buckets + (float("inf"),), s):
+                cum += n
+                le = "+Inf" if b == float("inf") else f"{b:g}"
+                yield f"{self.name}_bucket{_labels(names, lv + (le,))} {cum}"
+            yield f"{self.name}_sum{_labels(self.labels, lv)} {s[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, lv)} {s[-1]}"
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+STAGE = Histogram("request_stage_duration_seconds", "Time spent per stage of a request.", ("route", "stage"))
+OUTBOUND = Counter("outbound_requests_total", "Calls to external services.", ("service", "outcome"))
+OUTBOUND_LATENCY = Histogram("outbound_request_duration_seconds", "External call latency.", ("service",))
+
+REGISTRY = [REQUESTS, LATENCY, STAGE, OUTBOUND, OUTBOUND_LATENCY]
+
+
+def render() -> str:
+    return "\n".join(line for m in REGISTRY for line in m.render()) + "\n"
+
+
+# ============================
+# REQUEST CONTEXT / SPANS
+# ============================
+
+class RequestTimings:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.done = False
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> bool:
+        with self._lock:
+            if self.done:
+                return False
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            return True
+
+    def server_timing(self) -> str:
+        with self._lock:
+            parts = [f"{k};dur={v * 1000:.1f}" for k, v in self.stages.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        timings = _current.get()
+        if timings is None or not timings.add(stage, dt):
+            STAGE.observe(dt, "background", stage)
+
+
+@contextmanager
+def outbound(service: str):
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OUTBOUND_LATENCY.observe(time.perf_counter() - t0, service)
+        OUTBOUND.inc(service, outcome)
+
+
+# ============================
+# MIDDLEWARE
+# ============================
+
+class MetricsMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware) so streaming and contextvars are untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        def finish():
+            with timings._lock:
+                timings.done = True
+                stages = dict(timings.stages)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            LATENCY.observe(time.perf_counter() - timings.start, scope["method"], route)
+            REQUESTS.inc(scope["method"], route, str(status))
+            for stage, dt in stages.items():
+                STAGE.observe(dt, route, stage)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not timings.done:
+                finish()
+            _current.reset(token)
@@ -0,0 +1,141 @@
+# app/utils/pairplot.py
+"""
+Pair-plot (scatter matrix) engine for large tables.
+
+Every column is binned once; each off-diagonal panel is then a 2-D
+bincount turned into an RGBA raster, and each diagonal panel a 1-D
+histogram. Panels are computed in a thread pool (numpy releases the GIL)
+and the figure only places finished images, so cost is bounded by
+panels x BINS² rather than by row count. Small tables are drawn as
+plain scatters.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from app.utils.metrics import span
+
+BINS = 128
+POINT_THRESHOLD = 5_000        # rows above this are drawn as density rasters
+PANEL_IN = 2.5                 # inches per panel, as sns.pairplot(height=2.5)
+MAX_SIDE_PX = 3000             # dpi is lowered for big grids to stay under this
+WORKERS = int(os.getenv("PAIRPLOT_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+DENSITY_CMAP = "viridis"
+HIST_COLOR = "#4C72B0"
+
+
+def _bin_index(v: np.ndarray, lo: float, hi: float, bins: int) -> np.ndarray:
+    span = hi - lo if hi > lo else 1.0
+    return np.clip(((v - lo) / span * bins).astype(np.int64), 0, bins - 1)
+
+
+def _density_rgba(counts: np.ndarray, cmap) -> np.ndarray:
+    """Log-scaled counts -> RGBA, empty bins transparent. Rows = y bins, bottom first."""
+    scaled = np.log1p(counts) / max(np.log1p(counts.max()), 1e-12)
+    rgba = cmap(scaled)
+    rgba[counts == 0, 3] = 0.0
+    return rgba
+
+
+def _range(v: np.ndarray):
+    if not len(v):
+        return 0.0, 1.0
+    lo, hi = float(v.min()), float(v.max())
+    return (lo, hi) if hi > lo else (lo - 0.5, hi + 0.5)
+
+
+def pair_panels(df: pd.DataFrame, cols: List[str], bins: int = BINS, joint: bool = True):
+    """
+    Binned panels for every (row, col) pair.
+    Returns (ranges, diag, rasters): ranges[c] = (lo, hi); diag[c] = counts
+    per bin; rasters[(i, j)] = RGBA image of column j (x) against column i (y),
+    empty unless `joint`. NaNs are dropped per panel (pairwise), as
+    sns.pairplot did, so a row missing one column still counts elsewhere.
+    """
+    values = {c: df[c].to_numpy(dtype=np.float64) for c in cols}
+    ok = {c: np.isfinite(v) for c, v in values.items()}
+    ranges = {c: _range(v[ok[c]]) for c, v in values.items()}
+    idx = {}
+    for c in cols:
+        idx[c] = np.full(len(values[c]), -1, dtype=np.int64)
+        idx[c][ok[c]] = _bin_index(values[c][ok[c]], *ranges[c], bins)
+    cmap = plt.get_cmap(DENSITY_CMAP)
+
+    def raster(pair):
+        i, j = pair
+        both = ok[cols[i]] & ok[cols[j]]
+        counts = np.bincount(idx[cols[i]][both] * bins + idx[cols[j]][both], minlength=bins * bins)
+        counts = counts.reshape(bins, bins)   # [y bin, x bin]
+        return {(i, j): _density_rgba(counts, cmap), (j, i): _density_rgba(counts.T, cmap)}
+
+    pairs = [(i, j) for i in range(len(cols)) for j in range(i + 1, len(cols))] if joint else []
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        diag = dict(zip(cols, pool.map(lambda c: np.bincount(idx[c][ok[c]], minlength=bins), cols)))
+        rasters = {}
+        for part in pool.map(raster, pairs):
+            rasters.update(part)
+    return ranges, diag, rasters
+
+
+def pairplot_png(df: pd.DataFrame, cols: Optional[List[str]] = None, dpi: int = 230,
+                 bins: int = BINS, point_threshold: int = POINT_THRESHOLD) -> Optional[bytes]:
+    """Scatter matrix of `cols` as PNG bytes (None when no row has a value); density rasters above point_threshold rows."""
+    cols = list(cols or df.columns)
+    df = df[cols].dropna(how="all")
+    if df.empty:
+        return None
+    k = len(cols)
+    as_points = len(df) <= point_threshold
+    with span("compute"):
+        ranges, diag, rasters = pair_panels(df, cols, bins, joint=not as_points)
+
+    dpi = min(dpi, int(MAX_SIDE_PX / (PANEL_IN * k)))
+
+    with span("render"):
+        fig = _draw(df, cols, ranges, diag, rasters, bins, as_points)
+    with span("encode"):
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi)
+        plt.close(fig)
+    return buf.getvalue()
+
+
+def _draw(df, cols, ranges, diag, rasters, bins, as_points):
+    k = len(cols)
+    fig, axes = plt.subplots(k, k, figsize=(PANEL_IN * k, PANEL_IN * k), squeeze=False)
+    for i, cy in enumerate(cols):
+        for j, cx in enumerate(cols):
+            ax = axes[i, j]
+            (x0, x1), (y0, y1) = ranges[cx], ranges[cy]
+            if i == j:
+                edges = np.linspace(x0, x1 if x1 > x0 else x0 + 1.0, bins + 1)
+                ax.stairs(diag[cx], edges, fill=True, color=HIST_COLOR, alpha=0.8)
+            elif as_points:
+                ax.scatter(df[cx], df[cy], s=6, alpha=0.6, linewidths=0)
+            else:
+                ax.imshow(rasters[(i, j)], origin="lower", aspect="auto",
+                          extent=(x0, x1, y0, y1), interpolation="nearest")
+            ax.set_xlim(x0, x1)
+            if i != j:
+                ax.set_ylim(y0, y1)
+
+            ax.tick_params(labelsize=7)
+            if i == k - 1:
+                ax.set_xlabel(cx)
+            else:
+                ax.set_xticklabels([])
+            if j == 0:
+                ax.set_ylabel(cy)
+            else:
+                ax.set_yticklabels([])
+
+    fig.tight_layout()
+    return fig
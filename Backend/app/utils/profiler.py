@@ -0,0 +1,245 @@
+# app/utils/profiler.py
+"""
+On-demand profiling for a running server (admin routes in
+app/routers/profiler_routes.py).
+
+Two capture modes, one session at a time:
+
+    sample(seconds)        statistical sampler over every thread for N
+                           seconds: sys._current_frames() every
+                           PROFILER_INTERVAL_MS, idle waits dropped
+    capture(route, n)      the next n requests to one route: the sampler
+                           keeps only stacks running that endpoint, and
+                           each call also runs under cProfile (stats are
+                           merged across calls)
+
+Results are written to PROFILER_DIR as <id>.collapsed (one
+"frame;frame;frame count" line per stack, the input of flamegraph.pl /
+speedscope) and, for route captures, <id>.pstats. Sync endpoints are
+profiled completely; an async endpoint's cProfile also sees whatever else
+the event loop ran while it awaited.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("profiler")
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PROFILE_DIR = os.getenv("PROFILER_DIR", os.path.join(BASE_DIR, "models", "saved_artifacts", "profiles"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000.0
+MAX_SECONDS = 300
+MAX_REQUESTS = 200
+
+# leaf frames that mean "thread is parked", not work
+IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker"),
+}
+
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Background thread counting collapsed stacks of the other threads."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, codes=None, include_idle: bool = False):
+        self.interval = interval
+        self.codes = set(codes) if codes else None
+        self.include_idle = include_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.counts
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                leaf = frame.f_code
+                if not self.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                    continue
+                names, hit = [], self.codes is None
+                while frame is not None:
+                    names.append(_frame_name(frame.f_code))
+                    hit = hit or frame.f_code in self.codes
+                    frame = frame.f_back
+                if hit:
+                    self.counts[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+class Profiler:
+
+    def __init__(self, out_dir: str = PROFILE_DIR):
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self.session: Optional[Dict[str, Any]] = None
+        self._sampler: Optional[StackSampler] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._patched: List[Any] = []        # (dependant, original call)
+        self._timer: Optional[threading.Timer] = None
+        self._loop_busy = False              # an async endpoint call is under cProfile
+
+    # ---------- starting ----------
+
+    def _begin(self, mode: str, **info) -> Dict[str, Any]:
+        if self.session and self.session["status"] == "running":
+            raise RuntimeError(f"profiling session {self.session['id']} is still running")
+        self.session = {"id": uuid.uuid4().hex[:12], "mode": mode, "status": "running",
+                        "started": time.time(), "finished": None, "samples": 0, **info}
+        return self.session
+
+    def sample(self, seconds: float, include_idle: bool = False) -> Dict[str, Any]:
+        seconds = min(float(seconds), MAX_SECONDS)
+        with self._lock:
+            session = self._begin("sample", seconds=seconds)
+            self._sampler = StackSampler(include_idle=include_idle).start()
+            self._timer = threading.Timer(seconds, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        return dict(session)
+
+    def capture(self, app, path: str, requests: int, method: str = "GET") -> Dict[str, Any]:
+        """Profile the next `requests` calls of the route registered as `path` (template, e.g. /ocean-dist/plot)."""
+        routes = [r for r in app.routes
+                  if getattr(r, "path", None) == path and method in (getattr(r, "methods", None) or ())
+                  and getattr(r, "dependant", None) is not None]
+        if not routes:
+            raise LookupError(f"No {method} route '{path}'")
+        with self._lock:
+            session = self._begin("capture", route=path, method=method,
+                                  remaining=min(int(requests), MAX_REQUESTS), requests=0)
+            codes = set()
+            for r in routes:
+                original = r.dependant.call
+                codes.add(getattr(original, "__code__", None))
+                self._patched.append((r.dependant, original))
+                r.dependant.call = self._wrap(original)
+            self._stats = None
+            self._sampler = StackSampler(codes=codes - {None}).start()
+        return dict(session)
+
+    def _wrap(self, fn):
+        # keep the endpoint's sync/async kind: FastAPI decided it once at startup
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run(*args, **kwargs):
+                # one profiler per thread: overlapping calls on the loop are only sampled
+                if self._loop_busy:
+                    return await fn(*args, **kwargs)
+                self._loop_busy = True
+                prof = cProfile.Profile()
+                prof.enable()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    prof.disable()
+                    self._loop_busy = False
+                    self._record(prof)
+        else:
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                prof = cProfile.Profile()
+                try:
+                    return prof.runcall(fn, *args, **kwargs)
+                finally:
+                    self._record(prof)
+        return run
+
+    def _record(self, prof: cProfile.Profile):
+        with self._lock:
+            s = self.session
+            if not s or s["status"] != "running" or s["mode"] != "capture":
+                return
+            if self._stats is None:
+                self._stats = pstats.Stats(prof)
+            else:
+                self._stats.add(prof)
+            s["requests"] += 1
+            s["remaining"] -= 1
+            done = s["remaining"] <= 0
+        if done:
+            self.stop()
+
+    # ---------- finishing ----------
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            s = self.session
+            if not s or s["status"] != "running":
+                return dict(s) if s else None
+            s["status"] = "finished"
+            s["finished"] = time.time()
+            for dependant, original in self._patched:
+                dependant.call = original
+            self._patched = []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            sampler, stats = self._sampler, self._stats
+            self._sampler = self._stats = None
+
+        sampler.stop()
+        s["samples"] = sampler.samples
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(self._path(s["id"], "collapsed"), "w") as f:
+            f.write(sampler.collapsed())
+        if stats is not None:
+            stats.dump_stats(self._path(s["id"], "pstats"))
+        logger.info("profiling session %s finished (%d samples)", s["id"], s["samples"])
+        return dict(s)
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return dict(self.session) if self.session else None
+
+    # ---------- results ----------
+
+    def _path(self, session_id: str, kind: str) -> str:
+        return os.path.join(self.out_dir, f"{session_id}.{kind}")
+
+    def result_path(self, session_id: str, kind: str) -> Optional[str]:
+        if not session_id.isalnum():
+            return None
+        path = self._path(session_id, kind)
+        return path if os.path.exists(path) else None
+
+    def top(self, session_id: str, limit: int = 40, sort: str = "cumulative") -> Optional[str]:
+        """cProfile table of the heaviest functions, as text."""
+        path = self.result_path(session_id, "pstats")
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+profiler = Profiler()
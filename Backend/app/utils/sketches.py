@@ -0,0 +1,167 @@
+# app/utils/sketches.py
+"""
+Mergeable summaries, vectorized over many groups at once.
+
+Every function takes a group id per entry (any int64 key) and returns one
+result per distinct key, sorted by key, so "build from raw values" and
+"merge two summaries" are the same operation on concatenated inputs.
+
+- moments:    count, sum, sum of squares, min, max
+- t-digest:   centroids (mean, weight) compressed with the k1 arcsine scale
+- co-moments: n, mean vector and centred cross-product matrix (Chan et al.)
+"""
+import numpy as np
+
+DIGEST_DELTA = 200  # compression; at most DELTA / 2 centroids per digest
+
+
+def _runs(sorted_keys: np.ndarray) -> np.ndarray:
+    """Start offsets of equal-key runs in a sorted key array."""
+    if not len(sorted_keys):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+
+# ============================
+# MOMENTS
+# ============================
+
+def moments(key, count, total, sumsq, vmin, vmax):
+    """Reduce (count, sum, sumsq, min, max) rows by key. Raw values: count=1, sum=v, sumsq=v², min=max=v."""
+    order = np.argsort(key, kind="stable")
+    key = np.asarray(key)[order]
+    s = _runs(key)
+    if not len(s):
+        empty = np.empty(0)
+        return {"key": key, "count": empty.astype(np.int64), "sum": empty,
+                "sumsq": empty, "min": empty, "max": empty}
+    return {
+        "key": key[s],
+        "count": np.add.reduceat(np.asarray(count)[order], s).astype(np.int64),
+        "sum": np.add.reduceat(np.asarray(total, dtype=np.float64)[order], s),
+        "sumsq": np.add.reduceat(np.asarray(sumsq, dtype=np.float64)[order], s),
+        "min": np.minimum.reduceat(np.asarray(vmin, dtype=np.float64)[order], s),
+        "max": np.maximum.reduceat(np.asarray(vmax, dtype=np.float64)[order], s),
+    }
+
+
+def moments_of(key, values):
+    v = np.asarray(values, dtype=np.float64)
+    return moments(key, np.ones(len(v), dtype=np.int64), v, v * v, v, v)
+
+
+# ============================
+# T-DIGEST
+# ============================
+
+def digest(key, means, weights=None, delta: int = DIGEST_DELTA):
+    """
+    Compress (key, mean, weight) centroids into per-key t-digests.
+    Centroids are sorted by (key, mean); within a key each output cluster
+    covers less than one unit of k(q) = delta / (2 pi) * asin(2q - 1).
+    """
+    key = np.asarray(key, dtype=np.int64)
+    means = np.asarray(means, dtype=np.float64)
+    weights = np.ones(len(means)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if not len(key):
+        return {"key": key, "mean": means, "weight": weights}
+
+    order = np.lexsort((means, key))
+    key, means, weights = key[order], means[order], weights[order]
+    starts = _runs(key)
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(key)]))
+
+    # cumulative weight within each key, at centroid midpoints
+    cum = np.cumsum(weights)
+    base = np.r_[0.0, cum[starts[1:] - 1]][group]
+    totals = np.add.reduceat(weights, starts)[group]
+    q = (cum - base - weights / 2) / totals
+    k = np.floor(delta / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)) + delta / 4)
+
+    cluster = group * (delta + 1) + k.astype(np.int64)
+    cs = _runs(cluster)
+    w = np.add.reduceat(weights, cs)
+    return {
+        "key": key[cs],
+        "mean": np.add.reduceat(means * weights, cs) / w,
+        "weight": w,
+    }
+
+
+def digest_quantiles(means, weights, qs, vmin=None, vmax=None) -> np.ndarray:
+    """Quantiles of one digest (centroids sorted by mean), interpolating between centroid midpoints."""
+    means = np.asarray(means, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if not len(means):
+        return np.full(len(np.atleast_1d(qs)), np.nan)
+    total = weights.sum()
+    mid = np.cumsum(weights) - weights / 2
+    lo = means[0] if vmin is None else vmin
+    hi = means[-1] if vmax is None else vmax
+    return np.interp(np.asarray(qs) * total, np.r_[0.0, mid, total], np.r_[lo, means, hi])
+
+
+def digest_cdf(means, weights, x, vmin=None, vmax=None) -> np.ndarray:
+    means = np.asarray(means, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    mid = np.cumsum(weights) - weights / 2
+    lo = means[0] if vmin is None else vmin
+    hi = means[-1] if vmax is None else vmax
+    xs, ix = np.unique(np.r_[lo, means, hi], return_index=True)  # interp needs increasing x
+    return np.interp(x, xs, (np.r_[0.0, mid, total] / total)[ix])
+
+
+# ============================
+# CO-MOMENTS (correlation)
+# ============================
+
+def comoments(key, n, mean, m2):
+    """
+    Reduce (n, mean[K], M2[K, K]) rows by key, where M2 is the centred
+    cross-product sum. Raw rows: n=1, mean=x, M2=0.
+      M2_g = sum_i M2_i + n_i (mean_i - mean_g)(mean_i - mean_g)^T
+    """
+    key = np.asarray(key, dtype=np.int64)
+    order = np.argsort(key, kind="stable")
+    key, n, mean, m2 = key[order], np.asarray(n)[order], np.asarray(mean)[order], np.asarray(m2)[order]
+    s = _runs(key)
+    K = mean.shape[1] if mean.ndim == 2 else 0
+    if not len(s):
+        return {"key": key, "n": np.empty(0, dtype=np.int64),
+                "mean": np.empty((0, K)), "m2": np.empty((0, K, K))}
+
+    g = np.repeat(np.arange(len(s)), np.diff(np.r_[s, len(key)]))
+    n_g = np.add.reduceat(n, s).astype(np.float64)
+    mean_g = np.add.reduceat(mean * n[:, None], s) / n_g[:, None]
+    d = mean - mean_g[g]
+    m2_g = np.add.reduceat(m2 + n[:, None, None] * d[:, :, None] * d[:, None, :], s)
+    return {"key": key[s], "n": n_g.astype(np.int64), "mean": mean_g, "m2": m2_g}
+
+
+def comoments_of(key, X):
+    """comoments() of raw rows, without materialising per-row K x K matrices."""
+    X = np.asarray(X, dtype=np.float64)
+    key = np.asarray(key, dtype=np.int64)
+    K = X.shape[1]
+    order = np.argsort(key, kind="stable")
+    key, X = key[order], X[order]
+    s = _runs(key)
+    if not len(s):
+        return {"key": key, "n": np.empty(0, dtype=np.int64),
+                "mean": np.empty((0, K)), "m2": np.empty((0, K, K))}
+
+    n = np.diff(np.r_[s, len(key)])
+    mean = np.add.reduceat(X, s) / n[:, None]
+    Xc = X - np.repeat(mean, n, axis=0)
+    m2 = np.empty((len(s), K, K))
+    for a in range(K):
+        for b in range(a, K):
+            m2[:, a, b] = m2[:, b, a] = np.add.reduceat(Xc[:, a] * Xc[:, b], s)
+    return {"key": key[s], "n": n.astype(np.int64), "mean": mean, "m2": m2}
+
+
+def correlation(m2: np.ndarray) -> np.ndarray:
+    sd = np.sqrt(np.diag(m2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return m2 / np.outer(sd, sd)
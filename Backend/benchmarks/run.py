@@ -0,0 +1,329 @@
+# benchmarks/run.py
+"""
+API hot-path benchmarks, in-process.
+
+Seeds a SQLite data backend from Datasets/ (benchmarks/seed.py), points
+every artifact path at a scratch directory, then drives the real ASGI app
+through httpx.ASGITransport. No network and no Supabase are involved.
+Per scenario it reports the first (cold) call, throughput, p50/p95/p99 and
+mean latency, errors (5xx, unexpected 4xx and {"error": ...} bodies, with
+a per-status count) and the process peak RSS so far. Results are
+written as JSON so that two releases can be compared with --baseline.
+
+Usage (from Backend/):
+    python benchmarks/run.py --scale 2 --requests 50 --concurrency 4 \
+        --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/run.py --only ocean_ --baseline benchmarks/results/old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# benchmarks/seed.py and app.* are imported inside main(), after the
+# environment points the data backend and artifacts at the workdir.
+
+
+# ============================
+# SCENARIOS
+# ============================
+
+class Scenario:
+    """One endpoint call shape; `build(i)` returns httpx request kwargs for the i-th call."""
+
+    def __init__(self, name: str, method: str, path: str, build: Callable[[int], Dict[str, Any]] = None,
+                 requests: Optional[int] = None, serial: bool = False, ok_status=(200,)):
+        self.name, self.method, self.path = name, method, path
+        self.build = build or (lambda i: {})
+        self.requests = requests   # cap for expensive / state-changing scenarios
+        self.serial = serial       # pyplot keeps global figure state: never run these concurrently
+        self.ok_status = ok_status
+
+
+def scenarios(ctx: Dict[str, Any]) -> List[Scenario]:
+    names, families, oids = ctx["species"], ctx["families"], ctx["otolith_ids"]
+    pick = lambda seq, i: seq[i % len(seq)]
+    points = ctx["points"]
+
+    return [
+        # ---------- uploads (conversion + insert) ----------
+        Scenario("upload_ocean_csv", "POST", "/upload/", lambda i: {
+            "params": {"dtype": "ocean"},
+            "files": {"file": ("ocean.csv", ctx["ocean_csv"], "text/csv")}}, requests=5),
+        Scenario("upload_taxonomy_csv", "POST", "/upload/", lambda i: {
+            "params": {"dtype": "taxonomy"},
+            "files": {"file": ("taxonomy.csv", ctx["taxonomy_csv"], "text/csv")}}, requests=5),
+
+        # ---------- taxonomy / otolith lookups ----------
+        Scenario("taxonomy_list", "GET", "/taxonomy/list", lambda i: {"params": {"limit": 1000}}),
+        Scenario("taxonomy_species", "GET", "/taxonomy/species/{name}",
+                 lambda i: {"path": {"name": pick(names, i)}}, ok_status=(200, 404)),   # misses are part of the mix
+        Scenario("taxonomy_filter", "GET", "/taxonomy/filter", lambda i: {"params": {"family": pick(families, i)}}),
+        Scenario("taxonomy_map", "GET", "/taxonomy/map", lambda i: {"params": {"family": pick(families, i)}},
+                 requests=10),
+        Scenario("otolith_list", "GET", "/otolith/list", lambda i: {"params": {"limit": 1000}}),
+        Scenario("otolith_by_id", "GET", "/otolith/by-otolithid", lambda i: {"params": {"oid": pick(oids, i)}}),
+
+        # ---------- retrieval / integration ----------
+        Scenario("integrate_species", "GET", "/integrate/species", lambda i: {"params": {"name": pick(names, i)}},
+                 ok_status=(200, 404)),
+        Scenario("integrate_otolith", "GET", "/integrate/otolith", lambda i: {"params": {"oid": pick(oids, i)}}),
+        Scenario("ocean_nearest", "GET", "/integrate/ocean/nearest",
+                 lambda i: {"params": {"lat": pick(points, i)[0], "lon": pick(points, i)[1], "k": 5}}),
+        Scenario("ocean_within", "GET", "/integrate/ocean/within",
+                 lambda i: {"params": {"lat": pick(points, i)[0], "lon": pick(points, i)[1], "radius_km": 50}}),
+
+        # ---------- ocean plots / data ----------
+        Scenario("ocean_plot_line", "GET", "/ocean/plot",
+                 lambda i: {"params": {"plot_type": "line", "x": "datetime", "y": "sst"}}, requests=20, serial=True),
+        Scenario("ocean_plot_scatter", "GET", "/ocean/plot",
+                 lambda i: {"params": {"plot_type": "scatter", "x": "lat", "y": "chl"}}, requests=20, serial=True),
+        Scenario("ocean_plot_data", "GET", "/ocean/plot/data",
+                 lambda i: {"params": {"plot_type": "line", "x": "datetime", "y": "sst"}}),
+        Scenario("ocean_timeseries", "GET", "/ocean/timeseries",
+                 lambda i: {"params": {"param": "sst", "freq": ["day", "week", "month"][i % 3]}}),
+        Scenario("ocean_overlay", "GET", "/ocean-overlay/multi",
+                 lambda i: {"params": {"x": "datetime", "y": ["sst", "sss"]}}, requests=20, serial=True),
+        Scenario("ocean_heatmap", "GET", "/ocean-heatmap/plot",
+                 lambda i: {"params": {"param": "sst", "cell": 0.5}}, requests=20, serial=True),
+        Scenario("ocean_heatmap_data", "GET", "/ocean-heatmap/plot/data",
+                 lambda i: {"params": {"param": "sst", "cell": 0.5}}),
+        Scenario("ocean_dist_box", "GET", "/ocean-dist/plot",
+                 lambda i: {"params": {"plot": "box", "y": ["sst"]}}, requests=20, serial=True),
+        Scenario("ocean_dist_violin", "GET", "/ocean-dist/plot",
+                 lambda i: {"params": {"plot": "violin", "y": ["sst"]}}, requests=20, serial=True),
+        Scenario("ocean_scatter_matrix", "GET", "/ocean-dist/plot",
+                 lambda i: {"params": {"plot": "scatter_matrix"}}, requests=10, serial=True),
+        Scenario("ocean_stats", "GET", "/ocean-dist/stats", lambda i: {"params": {"param": "sst"}}),
+
+        # ---------- biodiversity ----------
+        Scenario("richness_grid", "GET", "/biodiversity/richness/grid", lambda i: {"params": {"cell": 1.0}}),
+        Scenario("diversity_indices", "GET", "/biodiversity/indices/data"),
+    ]
+
+
+def workload(db_path: str) -> Dict[str, Any]:
+    """Lookup keys and upload bodies derived from the bundled datasets."""
+    import sqlite3
+    import seed as seeding
+    conn = sqlite3.connect(db_path)
+    families = [r[0] for r in conn.execute(
+        "SELECT family FROM taxonomy_data WHERE family IS NOT NULL GROUP BY family ORDER BY COUNT(*) DESC LIMIT 20")]
+    oids = [r[0] for r in conn.execute("SELECT otolith_id FROM otolith_data WHERE otolith_id IS NOT NULL")]
+    points = conn.execute("SELECT lat, lon FROM ocean_data ORDER BY RANDOM() LIMIT 200").fetchall()
+    conn.close()
+
+    # Life_History species are the lookup mix: some present in taxonomy, many not
+    rng = random.Random(0)
+    species = seeding.life_history_names()
+    rng.shuffle(species)
+
+    ocean = seeding.ocean_frame(1)
+    sample = ocean[ocean["sst"] > -1e30].sample(2000, random_state=0)   # skip LAS fill-value rows
+    sample["datetime"] = sample["datetime"].str.slice(8, 10) + "-" + sample["datetime"].str.slice(5, 7) \
+        + "-" + sample["datetime"].str.slice(0, 4)          # dd-mm-yyyy, as field sheets arrive
+    ocean_csv = sample.rename(columns=str.upper).to_csv(index=False).encode()
+    with open(os.path.join(seeding.DATASETS_DIR, "Taxonomy1.csv"), "rb") as f:
+        taxonomy_csv = f.read()
+
+    return {"species": species, "families": families or ["Scombridae"], "otolith_ids": oids,
+            "points": points, "ocean_csv": ocean_csv, "taxonomy_csv": taxonomy_csv}
+
+
+# ============================
+# DRIVER
+# ============================
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)   # bytes on macOS, KiB on Linux
+
+
+def _pct(lat: np.ndarray, q: float) -> Optional[float]:
+    return round(float(np.percentile(lat, q)), 2) if len(lat) else None
+
+
+async def run_scenario(client, sc: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    n = min(requests, sc.requests or requests)
+
+    statuses: Dict[str, int] = {}
+
+    async def call(i: int):
+        kw = sc.build(i)
+        path = sc.path.format(**kw.pop("path", {}))
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(sc.method, path, **kw)
+            await resp.aread()
+            status = str(resp.status_code)
+            ok = resp.status_code in sc.ok_status and not (
+                resp.headers.get("content-type", "").startswith("application/json") and _is_error(resp))
+        except Exception as e:   # client-side failure; app exceptions arrive as 500s
+            status, ok = type(e).__name__, False
+        statuses[status] = statuses.get(status, 0) + 1
+        return (time.perf_counter() - t0) * 1000.0, ok
+
+    cold_ms, cold_ok = await call(0)
+
+    gate = asyncio.Semaphore(1 if sc.serial else concurrency)
+
+    async def bounded(i):
+        async with gate:
+            return await call(i)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(bounded(i) for i in range(1, n + 1)))
+    wall = time.perf_counter() - t0
+    lat = np.array([r[0] for r in results])
+    return {
+        "requests": n,
+        "concurrency": 1 if sc.serial else concurrency,
+        "errors": sum(not r[1] for r in results) + (not cold_ok),
+        "status": statuses,
+        "cold_ms": round(cold_ms, 2),
+        "throughput_rps": round(n / wall, 2) if wall > 0 else None,
+        "p50_ms": _pct(lat, 50), "p95_ms": _pct(lat, 95), "p99_ms": _pct(lat, 99),
+        "mean_ms": round(float(lat.mean()), 2) if len(lat) else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _is_error(resp) -> bool:
+    # many routes answer 200 with {"error": ...} / {"status": "error"}
+    try:
+        body = resp.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and ("error" in body or body.get("status") == "error")
+
+
+async def drive(app, selected: List[Scenario], requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+    out = {}
+    async with app.router.lifespan_context(app):
+        # a failing route is a 500 in the report, not the end of the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for sc in selected:
+                res = await run_scenario(client, sc, requests, concurrency)
+                out[sc.name] = res
+                print(f"{sc.name:24s} p50 {res['p50_ms']:>9} ms  p95 {res['p95_ms']:>9} ms  "
+                      f"{res['throughput_rps']:>8} req/s  err {res['errors']}  {res['status']}", flush=True)
+    return out
+
+
+# ============================
+# REPORT
+# ============================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as f:
+        base = json.load(f)["results"]
+    print(f"\n{'scenario':24s} {'p50 Δ%':>8} {'p95 Δ%':>8} {'rps Δ%':>8}")
+    for name, cur in current.items():
+        old = base.get(name)
+        if not old:
+            continue
+        delta = lambda k: (f"{(cur[k] - old[k]) / old[k] * 100:+.1f}"
+                           if cur.get(k) is not None and old.get(k) else "-")
+        print(f"{name:24s} {delta('p50_ms'):>8} {delta('p95_ms'):>8} {delta('throughput_rps'):>8}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=int, default=1, help="synthetic scale-up factor for seeded tables")
+    ap.add_argument("--ocean-scale", type=int, default=None, help="ocean rows scale (defaults to --scale)")
+    ap.add_argument("--requests", type=int, default=50, help="timed requests per scenario (after one cold call)")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--only", default=None, help="comma-separated scenario name prefixes")
+    ap.add_argument("--workdir", default=None, help="database + artifacts (default: a temp dir)")
+    ap.add_argument("--reuse-db", action="store_true", help="skip seeding if the workdir already has a database")
+    ap.add_argument("--out", default=os.path.join(BACKEND_DIR, "benchmarks", "results", "latest.json"))
+    ap.add_argument("--baseline", default=None, help="earlier JSON result to compare against")
+    args = ap.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-")
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, "bench.sqlite3")
+
+    # must be set before app modules read them at import time
+    os.environ.update({
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": db_path,
+        "OCEAN_STATS_PATH": os.path.join(workdir, "ocean_stats.npz"),
+        "OCEAN_PYRAMID_DIR": os.path.join(workdir, "ocean_pyramid"),
+        "OCEAN_CUBE_DIR": os.path.join(workdir, "ocean_cube"),
+        "PROFILER_DIR": os.path.join(workdir, "profiles"),
+        "OTOLITH_INDEX_DIR": os.path.join(workdir, "otolith_index"),
+        "OTOLITH_SHARD_DIR": os.path.join(workdir, "otolith_shards"),
+    })
+    import seed as seeding
+
+    seeded = None
+    if not (args.reuse_db and os.path.exists(db_path)):
+        print(f"seeding {db_path} (scale {args.scale}) ...", flush=True)
+        seeded = seeding.seed(db_path, args.scale, args.ocean_scale)
+        print(seeded, flush=True)
+
+    ctx = workload(db_path)
+    selected = scenarios(ctx)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        selected = [s for s in selected if s.name.startswith(prefixes)]
+
+    t0 = time.perf_counter()
+    from app.main import app
+    import_s = time.perf_counter() - t0
+
+    results = asyncio.run(drive(app, selected, args.requests, args.concurrency))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "ocean_scale": args.ocean_scale or args.scale,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": seeded,
+            "app_import_s": round(import_s, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.out}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
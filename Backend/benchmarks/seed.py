@@ -0,0 +1,180 @@
+# benchmarks/seed.py
+"""
+Seed a local SQLite data backend from the bundled Datasets/ folder.
+
+    ocean_data      Duplicate/*.csv LAS exports (one variable per file, Jan
+                    and Feb 2019), merged on (datetime, lat, lon); scale k
+                    appends k-1 copies shifted by whole years, so time
+                    series and climatologies stay meaningful
+    taxonomy_data   Taxonomy1.csv + Taxonomy2.csv through the upload
+                    cleaner; scale k repeats the occurrence records
+    otolith_data    Otolith.csv mapped like /upload/?dtype=otolith (no
+                    image download); copies get an "-<k>" id suffix
+    Life_History    species names only, used as the lookup workload
+
+Usage (from Backend/):
+    python benchmarks/seed.py --db /tmp/bench.sqlite3 --scale 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "Datasets")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.repositories.sqlite_backend import SQLiteBackend          # noqa: E402
+from app.utils.column_standardizer import standardize_df           # noqa: E402
+from app.utils.taxonomy_cleaner import clean_taxonomy_df           # noqa: E402
+
+CHUNK = 5000
+OCEAN_KEYS = ["datetime", "lat", "lon"]
+
+
+# ============================
+# OCEAN (LAS exports)
+# ============================
+
+def read_las_csv(path: str) -> pd.DataFrame:
+    """One LAS export: skip the text preamble, unquote DATETIME, standard column names."""
+    with open(path, errors="ignore") as f:
+        skip = next(i for i, line in enumerate(f) if line.startswith("DATETIME,"))
+    df = pd.read_csv(path, skiprows=skip, skipinitialspace=True)
+    df = standardize_df(df.drop(columns=["TIME"], errors="ignore"), "ocean")
+    raw = df["datetime"].astype(str).str.strip('" ')
+    # exports use both 29-JAN-2019 and 28-Feb-19
+    dt = pd.to_datetime(raw, format="%d-%b-%Y", errors="coerce")
+    dt = dt.fillna(pd.to_datetime(raw, format="%d-%b-%y", errors="coerce"))
+    df = df[dt.notna()].copy()
+    df["datetime"] = dt[dt.notna()].dt.strftime("%Y-%m-%d")
+    df["lat"] = df["lat"].round(5)
+    df["lon"] = df["lon"].round(5)
+    return df
+
+
+def ocean_frame(scale: int = 1) -> pd.DataFrame:
+    months: Dict[bool, pd.DataFrame] = {}
+    for path in sorted(glob.glob(os.path.join(DATASETS_DIR, "Duplicate", "*.csv"))):
+        df = read_las_csv(path)
+        feb = path.endswith("_Feb.csv")
+        months[feb] = df if feb not in months else months[feb].merge(df, on=OCEAN_KEYS, how="outer")
+    base = pd.concat(months.values(), ignore_index=True)
+
+    parts = [base]
+    day = pd.to_datetime(base["datetime"])
+    for k in range(1, scale):
+        shifted = base.copy()
+        shifted["datetime"] = (day - pd.DateOffset(years=k)).dt.strftime("%Y-%m-%d")
+        parts.append(shifted)
+    return pd.concat(parts, ignore_index=True)
+
+
+# ============================
+# TAXONOMY / OTOLITH
+# ============================
+
+def taxonomy_frame(scale: int = 1) -> pd.DataFrame:
+    t1 = standardize_df(pd.read_csv(os.path.join(DATASETS_DIR, "Taxonomy1.csv")), "taxonomy")
+    t2 = pd.read_csv(os.path.join(DATASETS_DIR, "Taxonomy2.csv"), low_memory=False)
+    df = pd.concat([clean_taxonomy_df(t1), clean_taxonomy_df(t2)], ignore_index=True)
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def _first(r: pd.Series, *cols):
+    for c in cols:
+        if c in r.index:
+            v = r[c]
+            if isinstance(v, pd.Series):
+                v = v.iloc[0]
+            if not pd.isna(v):
+                return v
+    return None
+
+
+def _float(v):
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def otolith_rows(scale: int = 1) -> List[dict]:
+    df = standardize_df(pd.read_csv(os.path.join(DATASETS_DIR, "Otolith.csv")), "otolith")
+    base = []
+    for _, r in df.iterrows():
+        base.append({
+            "otolith_id": _first(r, "otolith_id"),
+            "family": _first(r, "family"),
+            "scientific_name": _first(r, "scientific_name"),
+            "project_code": _first(r, "project_code"),
+            "station_id": _first(r, "station_id"),
+            "locality": _first(r, "locality"),
+            "water_body": _first(r, "water_body"),
+            "original_image_url": _first(r, "original_image_url"),
+            "storage_path": None,
+            "sex": _first(r, "sex", "Sex"),
+            "life_stage": _first(r, "life_stage", "Life stage"),
+            "habitat": _first(r, "habitat", "Habitat"),
+            "platform": _first(r, "platform", "Platform"),
+            "collection_method": _first(r, "collection_method", "Collection Method"),
+            "submitted_by": _first(r, "submitted_by", "submittedBy"),
+            "lat": _float(_first(r, "lat", "decimalLatitude")),
+            "lon": _float(_first(r, "lon", "decimalLongitude")),
+            "collection_depth_m": _float(_first(r, "collection_depth_m", "Collection Depth (in mts)")),
+            "station_depth_m": _float(_first(r, "station_depth_m", "Station Depth (in mts)")),
+        })
+    rows = list(base)
+    for k in range(1, scale):
+        rows.extend({**b, "otolith_id": f"{b['otolith_id']}-{k}"} for b in base)
+    return rows
+
+
+def life_history_names() -> List[str]:
+    df = pd.read_csv(os.path.join(DATASETS_DIR, "Life_History.csv"), usecols=["Species"])
+    return sorted(df["Species"].dropna().astype(str).str.strip().unique())
+
+
+# ============================
+# SEEDING
+# ============================
+
+def _records(df: pd.DataFrame) -> List[dict]:
+    return df.astype(object).where(pd.notnull(df), None).to_dict(orient="records")
+
+
+def _insert(backend: SQLiteBackend, table: str, rows: List[dict]) -> int:
+    for i in range(0, len(rows), CHUNK):
+        backend.insert(table, rows[i:i + CHUNK])
+    return len(rows)
+
+
+def seed(db_path: str, scale: int = 1, ocean_scale: int = None) -> Dict[str, object]:
+    """Fresh database at db_path. Returns row counts and timings."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    backend = SQLiteBackend(db_path)
+    t0 = time.perf_counter()
+    counts = {
+        "ocean_data": _insert(backend, "ocean_data", _records(ocean_frame(ocean_scale or scale))),
+        "taxonomy_data": _insert(backend, "taxonomy_data", _records(taxonomy_frame(scale))),
+        "otolith_data": _insert(backend, "otolith_data", otolith_rows(scale)),
+    }
+    backend.conn.close()
+    return {"rows": counts, "seconds": round(time.perf_counter() - t0, 3), "scale": scale,
+            "ocean_scale": ocean_scale or scale}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--ocean-scale", type=int, default=None, help="defaults to --scale")
+    args = ap.parse_args()
+    print(seed(args.db, args.scale, args.ocean_scale))